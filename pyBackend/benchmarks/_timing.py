@@ -0,0 +1,29 @@
+import statistics
+import time
+from typing import Callable, Dict, Iterable
+
+
+def percentiles(samples_ms) -> Dict[str, float]:
+    """Return p50/p99/mean of a list of latencies in milliseconds."""
+    ordered = sorted(samples_ms)
+    p99_index = min(len(ordered) - 1, int(round(0.99 * (len(ordered) - 1))))
+    return {
+        "p50": statistics.median(ordered),
+        "p99": ordered[p99_index],
+        "mean": statistics.fmean(ordered),
+    }
+
+
+def measure(fn: Callable, args: Iterable, repeat: int = 1) -> Dict[str, float]:
+    """Call fn(arg) for every arg (repeat times) and return latency percentiles in ms."""
+    samples = []
+    for _ in range(repeat):
+        for arg in args:
+            start = time.perf_counter()
+            fn(arg)
+            samples.append((time.perf_counter() - start) * 1000)
+    return percentiles(samples)
+
+
+def report(label: str, stats: Dict[str, float]):
+    print(f"{label:<28} p50={stats['p50']:9.3f} ms  p99={stats['p99']:9.3f} ms  mean={stats['mean']:9.3f} ms")
@@ -0,0 +1,59 @@
+"""
+Compare memory and load time of the raw airports.json list of dicts with the
+columnar, memory-mapped AirportStore.
+
+Run from pyBackend/:  python -m benchmarks.bench_airport_store
+"""
+
+import gc
+import json
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from services.airport_store import AIRPORTS_JSON, AirportStore
+
+
+def _profile(label, load, repeat=10):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        load()
+    elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+
+    # Memory is measured on a separate run, tracemalloc slows allocation down
+    gc.collect()
+    tracemalloc.start()
+    result = load()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<32} load={elapsed_ms:8.2f} ms  retained={current / 1024:9.1f} KiB  peak={peak / 1024:9.1f} KiB")
+    return result
+
+
+def _load_json():
+    with open(AIRPORTS_JSON, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_dir = Path(tmp) / "airports_db"
+        start = time.perf_counter()
+        AirportStore.convert(AIRPORTS_JSON, db_dir)
+        print(f"One-time conversion: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        json_size = AIRPORTS_JSON.stat().st_size
+        store_size = sum(path.stat().st_size for path in db_dir.iterdir())
+        print(f"On disk: airports.json={json_size / 1024:.1f} KiB, store={store_size / 1024:.1f} KiB\n")
+
+        airports = _profile("raw JSON (list of dicts)", _load_json)
+        store = _profile("AirportStore (mmap .npy)", lambda: AirportStore.load(db_dir))
+        assert len(store) == len(airports)
+        # Memory-mapped columns are file-backed pages shared between workers;
+        # tracemalloc only counts the decoded, interned name strings.
+        del store
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Benchmark GET /airports: per-request json.load + linear scan vs. prebuilt AirportIndex.
+
+Run from pyBackend/:  python -m benchmarks.bench_airports
+"""
+
+import json
+import time
+
+from benchmarks._timing import measure, report
+from services.airports import AIRPORTS_JSON, AirportIndex
+
+QUERIES = ["WRO", "war", "chopin", "intl", "a", "london", "frankfurt", "krakow", "zz", "international airport"]
+
+
+def legacy_search(airport_name):
+    """The pre-index implementation: parse the file and scan every record."""
+    with open(AIRPORTS_JSON, "r", encoding="utf-8") as f:
+        airports = json.load(f)
+
+    airport_name_lower = airport_name.lower()
+    return [
+        airport for airport in airports
+        if isinstance(airport.get("name"), str) and airport_name_lower in airport["name"].lower()
+    ]
+
+
+def main():
+    start = time.perf_counter()
+    index = AirportIndex.from_json()
+    print(f"Index build: {(time.perf_counter() - start) * 1000:.1f} ms for {len(index)} airports\n")
+
+    report("before (json.load + scan)", measure(legacy_search, QUERIES, repeat=5))
+    report("after (AirportIndex)", measure(index.search, QUERIES, repeat=200))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compare the TF-IDF matrix scan with the BM25 inverted index on synthetic
+corpora of growing size.
+
+tfidf:          DocumentVectorizer.top_k, scores every chunk
+bm25 maxscore:  BM25Index.top_k, posting lists with MaxScore pruning
+bm25 full:      BM25Index.scores + argpartition, every posting, no pruning
+
+Synthetic chunks are 100 words drawn from the word frequencies of the real
+terms & conditions, so posting list lengths follow a realistic skew.
+
+Run from pyBackend/:  python -m benchmarks.bench_bm25
+"""
+
+import contextlib
+import io
+import time
+from collections import Counter
+
+import numpy as np
+
+from benchmarks._timing import measure, report
+from scripts.vektorizer import DocumentVectorizer
+
+VECTORS_DB_DIR = "scripts/vectors_db"
+SIZES = (10_000, 50_000)
+WORDS_PER_CHUNK = 100
+QUERIES = [
+    "limit bagażu podręcznego",
+    "zwrot pieniędzy za odwołany lot",
+    "przewóz zwierząt w kabinie",
+    "odprawa online i karta pokładowa",
+    "bagaż rejestrowany opłata za nadbagaż",
+]
+
+
+def _synthetic_documents(base: DocumentVectorizer, n_chunks: int, rng):
+    words = Counter(word.lower() for text in base.documents for word in text.split())
+    vocab = np.array(list(words))
+    probs = np.array(list(words.values()), dtype=np.float64)
+    probs /= probs.sum()
+    sampled = rng.choice(len(vocab), size=(n_chunks, WORDS_PER_CHUNK), p=probs)
+    return [" ".join(vocab[row]) for row in sampled]
+
+
+def main():
+    base = DocumentVectorizer()
+    with contextlib.redirect_stdout(io.StringIO()):
+        base.load(VECTORS_DB_DIR)
+
+    rng = np.random.default_rng(0)
+    for n_chunks in SIZES:
+        db = DocumentVectorizer(max_features=5000, ngram_range=(1, 2))
+        db.documents = _synthetic_documents(base, n_chunks, rng)
+        db.metadata = [{"filename": "synthetic.txt", "chunk_id": i, "size": 0} for i in range(n_chunks)]
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            db.vectorize()
+        print(f"\n{n_chunks:,} chunks, {len(db.bm25.postings):,} postings "
+              f"(vectorize + BM25 build {time.perf_counter() - start:.1f} s)")
+
+        def bm25_full(query, k=5):
+            scores = db.bm25.scores(query)
+            return np.argpartition(scores, -k)[-k:]
+
+        # warm-up: normalized matrix and BM25 vocabulary are built on first use
+        db.top_k(QUERIES[0])
+        db.bm25.top_k(QUERIES[0])
+        report("tfidf (matrix scan)", measure(db.top_k, QUERIES, repeat=20))
+        report("bm25 maxscore", measure(db.bm25.top_k, QUERIES, repeat=20))
+        report("bm25 full (no pruning)", measure(bm25_full, QUERIES, repeat=20))
+
+        for query in QUERIES:
+            _, pruned, _ = db.bm25.top_k(query, 5)
+            assert np.allclose(pruned, np.sort(db.bm25.scores(query))[::-1][:len(pruned)])
+
+
+if __name__ == "__main__":
+    main()
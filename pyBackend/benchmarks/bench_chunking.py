@@ -0,0 +1,65 @@
+"""
+Old word-window chunks vs sentence-aware token-budget chunks on the real
+terms & conditions.
+
+For each chunker: number of chunks, stored text (every word is stored twice
+with 100/50 word windows), size of the saved vectors_db, ingest + vectorize
+time and the context the /chat endpoint sends for its top 5 chunks
+(characters and estimated tokens, averaged over QUERIES).
+
+Run from pyBackend/:  python -m benchmarks.bench_chunking
+"""
+
+import contextlib
+import io
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from scripts.chunker import SentenceChunker, WordWindowChunker, count_tokens
+from scripts.vektorizer import DocumentVectorizer
+
+DOCUMENTS_DIR = Path("scripts/termsAndConditionsOfAirLines")
+TOP_K = 5
+QUERIES = [
+    "limit bagażu podręcznego",
+    "zwrot pieniędzy za odwołany lot",
+    "przewóz zwierząt w kabinie",
+    "odprawa online i karta pokładowa",
+    "bagaż rejestrowany opłata za nadbagaż",
+    "broń palna i amunicja w bagażu",
+    "odszkodowanie za zagubiony bagaż",
+    "podróż kobiety w ciąży",
+]
+
+
+def _dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def main():
+    print(f"{'chunker':<28} {'chunks':>7} {'stored chars':>13} {'db size':>9} {'build':>8} "
+          f"{'top-5 context':>15} {'~tokens':>8}")
+    for label, chunker in [("words 100/50", WordWindowChunker()), ("sentence 200/32 tokens", SentenceChunker())]:
+        db = DocumentVectorizer(max_features=5000, ngram_range=(1, 2), chunker=chunker)
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            db.load_documents(DOCUMENTS_DIR)
+            db.vectorize()
+            build = time.perf_counter() - start
+            db.save(tmp)
+            size = _dir_size(Path(tmp))
+
+        contexts = [
+            "".join(db.documents[r["index"]] for r in db.search_records(query, top_k=TOP_K))
+            for query in QUERIES
+        ]
+        stored = sum(len(text) for text in db.documents)
+        print(f"{label:<28} {len(db.documents):>7} {stored:>13,} {size / 1e6:>7.2f}MB {build:>7.2f}s "
+              f"{np.mean([len(c) for c in contexts]):>13.0f}ch {np.mean([count_tokens(c) for c in contexts]):>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Prompt tokens of the /chat knowledge-base context: every top-k chunk
+pasted as is (as chat_proxy used to do) vs merged, deduplicated and packed
+passages (services.context).
+
+Tokens are the local estimate (scripts.chunker.count_tokens), averaged
+over QUERIES, for the saved vectors_db and for a DB built with the old
+100/50 word windows, where neighbouring chunks share half their words.
+
+Run from pyBackend/:  python -m benchmarks.bench_context_packing
+"""
+
+import contextlib
+import io
+import time
+
+import numpy as np
+
+from benchmarks.bench_chunking import DOCUMENTS_DIR, QUERIES
+from scripts.chunker import WordWindowChunker, count_tokens
+from scripts.vektorizer import DocumentVectorizer
+from services.context import merge_chunks, pack_passages
+
+VECTORS_DB_DIR = "scripts/vectors_db"
+TOP_K = (5, 10)
+MAX_TOKENS = 1200
+
+
+def _legacy_context(db: DocumentVectorizer, results) -> str:
+    context = "\n### KNOWLEDGE BASE CHUNKS ###\n"
+    for r in results:
+        context += f"\n[Source: {r['filename']} | chunk {r['chunk_id']}]\n{db.documents[r['index']]}\n"
+    return context
+
+
+def _packed_context(db: DocumentVectorizer, results) -> str:
+    context = "\n### KNOWLEDGE BASE CHUNKS ###\n"
+    for passage in pack_passages(merge_chunks(results, db.documents), MAX_TOKENS):
+        context += f"\n{passage.header}\n{passage.text}\n"
+    return context
+
+
+def main():
+    sentence_db = DocumentVectorizer()
+    words_db = DocumentVectorizer(max_features=5000, ngram_range=(1, 2), chunker=WordWindowChunker())
+    with contextlib.redirect_stdout(io.StringIO()):
+        sentence_db.load(VECTORS_DB_DIR)
+        words_db.load_documents(DOCUMENTS_DIR)
+        words_db.vectorize()
+
+    print(f"{'chunks':<18} {'top_k':>5} {'pasted ~tokens':>15} {'packed ~tokens':>15} {'saved':>7} {'packing':>10}")
+    for label, db in (("sentence (db)", sentence_db), ("words 100/50", words_db)):
+        for top_k in TOP_K:
+            results = [db.search_records(query, top_k=top_k) for query in QUERIES]
+            legacy = [count_tokens(_legacy_context(db, r)) for r in results]
+            start = time.perf_counter()
+            packed = [count_tokens(_packed_context(db, r)) for r in results]
+            packing_ms = (time.perf_counter() - start) * 1000 / len(results)
+            print(f"{label:<18} {top_k:>5} {np.mean(legacy):>15.0f} {np.mean(packed):>15.0f} "
+                  f"{1 - np.sum(packed) / np.sum(legacy):>6.0%} {packing_ms:>8.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
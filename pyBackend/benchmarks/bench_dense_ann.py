@@ -0,0 +1,84 @@
+"""
+Recall@k vs latency of the IVF-PQ dense index against exact search.
+
+Corpora:
+- the real vector DB (LSA embeddings of the terms & conditions chunks)
+- synthetic clustered embeddings (100k x 128, float16 input) to show how
+  the index behaves at a size where exact scanning starts to hurt
+
+Queries are perturbed corpus vectors; recall@k is the overlap of the ANN
+top k with the exact top k.
+
+Run from pyBackend/:  python -m benchmarks.bench_dense_ann
+"""
+
+import contextlib
+import io
+import time
+
+import numpy as np
+
+from benchmarks._timing import measure, report
+from scripts.dense_index import DenseIndex
+from scripts.vektorizer import DocumentVectorizer
+
+VECTORS_DB_DIR = "scripts/vectors_db"
+K = 10
+N_QUERIES = 200
+SETTINGS = [(1, 0), (4, 0), (8, 0), (8, 50), (16, 50), (32, 100)]
+
+
+def _unit(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _exact_top_k(vectors, query, k=K):
+    scores = vectors @ query
+    best = np.argpartition(scores, len(scores) - k)[len(scores) - k:]
+    return best[np.argsort(-scores[best])]
+
+
+def _run(label, index: DenseIndex, vectors, queries):
+    print(f"\n{label}: {len(vectors):,} vectors x {vectors.shape[1]} dims, "
+          f"{len(index.centroids)} lists, {index.codes.shape[1]} B/vector")
+
+    exact = [set(_exact_top_k(vectors, q).tolist()) for q in queries]
+    report("exact (full scan)", measure(lambda q: _exact_top_k(vectors, q), queries))
+
+    for nprobe, rerank in SETTINGS:
+        recall = np.mean([
+            len(exact[i] & set(index.search(q, K, nprobe=nprobe, rerank=rerank)[0].tolist())) / K
+            for i, q in enumerate(queries)
+        ])
+        stats = measure(lambda q: index.search(q, K, nprobe=nprobe, rerank=rerank), queries)
+        report(f"nprobe={nprobe:<3} rerank={rerank:<4} R@{K}={recall:.3f}", stats)
+
+
+def _clustered(n, dim, n_clusters, rng):
+    centers = rng.normal(size=(n_clusters, dim))
+    labels = rng.integers(0, n_clusters, size=n)
+    return _unit(centers[labels] + 0.6 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def main():
+    rng = np.random.default_rng(0)
+
+    db = DocumentVectorizer()
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.load(VECTORS_DB_DIR)
+    vectors = np.asarray(db.dense.vectors, dtype=np.float32)
+    picks = rng.choice(len(vectors), size=N_QUERIES)
+    queries = _unit(vectors[picks] + 0.05 * rng.normal(size=(N_QUERIES, vectors.shape[1]))).astype(np.float32)
+    _run("real vector DB (LSA)", db.dense, vectors, queries)
+
+    vectors = _clustered(100_000, 128, 1000, rng)
+    start = time.perf_counter()
+    index = DenseIndex.build(vectors.astype(np.float16))
+    print(f"\nIVF-PQ build: {time.perf_counter() - start:.1f} s")
+    picks = rng.choice(len(vectors), size=N_QUERIES)
+    queries = _unit(vectors[picks] + 0.05 * rng.normal(size=(N_QUERIES, vectors.shape[1]))).astype(np.float32)
+    _run("synthetic clustered", index, vectors, queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Event-loop lag and /health latency while vector searches are running.
+
+inline:   the search runs synchronously inside the async endpoint, as
+          chat_proxy used to do - every search blocks the loop
+executor: the search goes through RetrievalService (bounded thread pool),
+          the loop keeps serving other requests
+
+A mini FastAPI app with a synthetic index of N_CHUNKS chunks (random
+TF-IDF-like rows over the real vocabulary) serves /search and /health.
+CONCURRENCY clients send searches back to back while /health is probed
+every HEALTH_INTERVAL seconds; LoopLagMonitor samples the loop meanwhile.
+
+Run from pyBackend/:  python -m benchmarks.bench_event_loop_lag
+"""
+
+import asyncio
+import contextlib
+import io
+import time
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+
+from benchmarks._timing import percentiles
+from benchmarks.bench_vector_search import QUERIES, VECTORS_DB_DIR, _synthetic_db
+from scripts.vektorizer import DocumentVectorizer
+from services.loop_lag import LoopLagMonitor
+from services.retrieval import RetrievalService
+
+N_CHUNKS = 300_000
+CONCURRENCY = 8
+DURATION = 5.0
+HEALTH_INTERVAL = 0.01
+
+
+def _app(db: DocumentVectorizer, retrieval: RetrievalService = None) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/search")
+    async def search(q: str):
+        if retrieval is None:
+            results = db.search_records(q, top_k=5)
+        else:
+            results = await retrieval.search(db, "search_records", q, 5)
+        return {"matches": len(results)}
+
+    return app
+
+
+async def _run(app: FastAPI):
+    monitor = LoopLagMonitor(interval=0.005, window=10_000)
+    monitor.start()
+    deadline = time.perf_counter() + DURATION
+    searches = 0
+    health_ms = []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def searcher(offset):
+            nonlocal searches
+            i = offset
+            while time.perf_counter() < deadline:
+                await client.get("/search", params={"q": QUERIES[i % len(QUERIES)]})
+                searches += 1
+                i += 1
+                # A real server reads the next request from a socket; yield like it would
+                await asyncio.sleep(0)
+
+        async def prober():
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                await client.get("/health")
+                health_ms.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(HEALTH_INTERVAL)
+
+        await asyncio.gather(prober(), *(searcher(i) for i in range(CONCURRENCY)))
+
+    monitor.stop()
+    return searches / DURATION, len(health_ms), percentiles(health_ms), monitor.stats()
+
+
+def main():
+    base = DocumentVectorizer()
+    with contextlib.redirect_stdout(io.StringIO()):
+        base.load(VECTORS_DB_DIR)
+    db = _synthetic_db(base, N_CHUNKS, np.random.default_rng(0))
+    db.warm_up()
+    print(f"{N_CHUNKS:,} chunks, {CONCURRENCY} concurrent searchers, {DURATION:.0f} s per mode")
+
+    retrieval = RetrievalService(max_workers=2, max_queue=CONCURRENCY)
+    for label, app in (("inline", _app(db)), ("executor", _app(db, retrieval))):
+        throughput, probes, health, lag = asyncio.run(_run(app))
+        print(f"{label:<10} {throughput:7.1f} searches/s  {probes:4d} /health probes "
+              f"p50={health['p50']:8.2f} ms p99={health['p99']:8.2f} ms  "
+              f"loop lag p50={lag['p50_ms']:7.2f} ms p99={lag['p99_ms']:7.2f} ms max={lag['max_ms']:7.2f} ms")
+    retrieval.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Full rebuild vs incremental update() of the vector DB.
+
+The corpus is the real terms & conditions files copied N_COPIES times
+(each copy gets a distinct suffix so chunks differ). After a full build,
+1, 5 and 25 files are edited and the DB is brought up to date with
+DocumentVectorizer.update(), which appends a segment instead of rewriting
+the base. The last row is compact() merging the segments back.
+
+Run from pyBackend/:  python -m benchmarks.bench_incremental_index
+"""
+
+import contextlib
+import io
+import tempfile
+import time
+from pathlib import Path
+
+from scripts.vektorizer import DocumentVectorizer
+
+DOCUMENTS_DIR = Path("scripts/termsAndConditionsOfAirLines")
+N_COPIES = 25
+CHANGES = (1, 5, 25)
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def _full_build(folder, db_dir):
+    db = DocumentVectorizer(max_features=5000, ngram_range=(1, 2))
+    db.load_documents(folder)
+    db.vectorize()
+    db.save(db_dir)
+    return db
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        folder, db_dir = Path(tmp) / "docs", Path(tmp) / "vectors_db"
+        folder.mkdir()
+        for copy in range(N_COPIES):
+            for source in sorted(DOCUMENTS_DIR.glob("*.txt")):
+                text = source.read_text(encoding="utf-8")
+                (folder / f"{source.stem}_{copy:03d}.txt").write_text(f"{text}\nkopia {copy}", encoding="utf-8")
+        files = sorted(folder.glob("*.txt"))
+
+        db, elapsed = _timed(_full_build, folder, db_dir)
+        print(f"{len(files)} files, {len(db.documents):,} chunks")
+        print(f"{'full rebuild':<28} {elapsed:9.1f} ms")
+
+        edited = 0
+        for n_changed in CHANGES:
+            for path in files[edited:edited + n_changed]:
+                path.write_text(path.read_text(encoding="utf-8") + "\nzmiana", encoding="utf-8")
+            edited += n_changed
+            summary, elapsed = _timed(DocumentVectorizer().update, folder, db_dir)
+            print(f"{f'update, {n_changed} file(s) changed':<28} {elapsed:9.1f} ms  ({summary['chunks']} chunks)")
+
+        _, elapsed = _timed(DocumentVectorizer().load, db_dir)
+        print(f"{f'load with {len(CHANGES)} segments':<28} {elapsed:9.1f} ms")
+        _, elapsed = _timed(DocumentVectorizer().compact, db_dir)
+        print(f"{'compact':<28} {elapsed:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
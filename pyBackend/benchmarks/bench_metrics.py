@@ -0,0 +1,78 @@
+"""
+Overhead of the metrics subsystem (services.metrics).
+
+observe / time(): cost of one histogram update on the request path
+middleware:       GET /health through the app with and without
+                  RequestMetricsMiddleware (httpx ASGITransport, in-process)
+render:           one /metrics scrape with N_SERIES label sets
+
+Run from pyBackend/:  python -m benchmarks.bench_metrics
+"""
+
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks._timing import percentiles, report
+from services.metrics import MetricsRegistry, RequestMetricsMiddleware
+
+N_CALLS = 200_000
+N_REQUESTS = 2_000
+N_SERIES = 200
+
+
+def _per_call_ns(fn, n=N_CALLS) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e9
+
+
+def _app(with_metrics: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    if with_metrics:
+        app.add_middleware(RequestMetricsMiddleware, registry=MetricsRegistry())
+    return app
+
+
+async def _requests(app: FastAPI):
+    samples = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(N_REQUESTS):
+            start = time.perf_counter()
+            await client.get("/health")
+            samples.append((time.perf_counter() - start) * 1000)
+    return percentiles(samples)
+
+
+def main():
+    registry = MetricsRegistry()
+    stages = registry.histogram("bench_stage_seconds", "Benchmark stages", ["stage"])
+
+    def timed():
+        with stages.time(stage="retrieval"):
+            pass
+
+    print(f"{'histogram observe':<28} {_per_call_ns(lambda: stages.observe(0.012, stage='retrieval')):9.0f} ns")
+    print(f"{'histogram time()':<28} {_per_call_ns(timed):9.0f} ns")
+
+    for label, with_metrics in (("GET /health", False), ("GET /health + middleware", True)):
+        report(label, asyncio.run(_requests(_app(with_metrics))))
+
+    for i in range(N_SERIES):
+        stages.observe(0.01 * i, stage=f"stage_{i}")
+    start = time.perf_counter()
+    text = registry.render()
+    print(f"{f'render {N_SERIES} series':<28} {(time.perf_counter() - start) * 1000:9.3f} ms  "
+          f"({len(text.splitlines())} lines)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+MMR re-ranking and per-file filtering of DocumentVectorizer searches.
+
+quality: on the saved vectors_db, for QUERIES - mean pairwise cosine
+         similarity of the top-5 chunks (redundancy), adjacent chunk pairs
+         of one file in the top 5, and the packed /chat context in tokens,
+         plain top_k vs MMR (lambda 0.7).
+latency: on a synthetic index of N_CHUNKS chunks split into N_FILES files,
+         a full scan vs a search restricted to one file (a slice of its
+         row range) vs a metadata scan (np.isin on filenames) for the same
+         filter.
+
+Run from pyBackend/:  python -m benchmarks.bench_mmr_filter
+"""
+
+import contextlib
+import io
+
+import numpy as np
+
+from benchmarks._timing import measure, report
+from benchmarks.bench_chunking import QUERIES
+from benchmarks.bench_vector_search import VECTORS_DB_DIR, _synthetic_db
+from scripts.chunker import count_tokens
+from scripts.vektorizer import DocumentVectorizer
+from services.context import merge_chunks, pack_passages
+
+TOP_K = 5
+MMR_LAMBDA = 0.7
+N_CHUNKS = 1_000_000
+N_FILES = 50
+
+
+def _quality(db: DocumentVectorizer, mmr_lambda):
+    redundancy, adjacent, tokens = [], [], []
+    unit = db._unit_vectors()
+    for query in QUERIES:
+        results = db.search_records(query, TOP_K, mmr_lambda=mmr_lambda)
+        rows = [r["index"] for r in results]
+        similarity = (unit[rows] @ unit[rows].T).toarray()
+        redundancy.append(similarity[np.triu_indices(len(rows), 1)].mean() if len(rows) > 1 else 0.0)
+        chunks = {(r["filename"], r["chunk_id"]) for r in results}
+        adjacent.append(sum((name, chunk_id + 1) in chunks for name, chunk_id in chunks))
+        passages = pack_passages(merge_chunks(results, db.documents), 10_000)
+        tokens.append(sum(count_tokens(p.text) for p in passages))
+    return np.mean(redundancy), np.mean(adjacent), np.mean(tokens)
+
+
+def main():
+    db = DocumentVectorizer()
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.load(VECTORS_DB_DIR)
+
+    print(f"{'top-5':<12} {'redundancy':>11} {'adjacent pairs':>15} {'context ~tokens':>16}")
+    for label, mmr_lambda in (("plain", None), (f"mmr {MMR_LAMBDA}", MMR_LAMBDA)):
+        redundancy, adjacent, tokens = _quality(db, mmr_lambda)
+        print(f"{label:<12} {redundancy:>11.3f} {adjacent:>15.2f} {tokens:>16.0f}")
+
+    big = _synthetic_db(db, N_CHUNKS, np.random.default_rng(0))
+    big.metadata = np.zeros(N_CHUNKS, dtype=[("filename", "<U16"), ("size", np.int64), ("chunk_id", np.int64)])
+    per_file = N_CHUNKS // N_FILES
+    big.metadata["filename"] = np.repeat([f"airline_{i:02d}.txt" for i in range(N_FILES)], per_file)
+    big.metadata["chunk_id"] = np.tile(np.arange(per_file), N_FILES)
+    big.file_ranges()
+    target = ["airline_07.txt"]
+
+    def metadata_scan(query):
+        rows = np.flatnonzero(np.isin(big.metadata["filename"], target))
+        return big._select_top_k(big._unit_vectors()[rows] @ big._query_vector(query), TOP_K)
+
+    print(f"\n{N_CHUNKS:,} chunks in {N_FILES} files")
+    report("full scan", measure(lambda q: big.top_k(q, TOP_K), QUERIES, repeat=5))
+    report("filter: metadata scan", measure(metadata_scan, QUERIES, repeat=5))
+    report("filter: row-range slice", measure(lambda q: big.top_k(q, TOP_K, files=target), QUERIES, repeat=5))
+    report("filter slice + mmr", measure(lambda q: big.mmr_top_k(q, TOP_K, files=target), QUERIES, repeat=5))
+
+
+if __name__ == "__main__":
+    main()
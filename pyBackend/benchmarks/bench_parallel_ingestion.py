@@ -0,0 +1,66 @@
+"""
+Serial vs process-pool ingestion (read + normalize + chunk) and TF-IDF
+vectorization.
+
+The corpus is the real terms & conditions files copied N_COPIES times.
+For every worker count the chunks must match the serial run and the
+vocabulary / idf of the sharded fit must match TfidfVectorizer.fit_transform.
+The speed-up is bounded by the number of CPU cores on the machine.
+
+Run from pyBackend/:  python -m benchmarks.bench_parallel_ingestion
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from scripts.vektorizer import DocumentVectorizer
+
+DOCUMENTS_DIR = Path("scripts/termsAndConditionsOfAirLines")
+N_COPIES = 50
+WORKERS = (1, 2, 4)
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        for copy in range(N_COPIES):
+            for source in sorted(DOCUMENTS_DIR.glob("*.txt")):
+                text = source.read_text(encoding="utf-8")
+                (folder / f"{source.stem}_{copy:03d}.txt").write_text(f"{text}\nkopia {copy}", encoding="utf-8")
+        n_files = len(list(folder.glob("*.txt")))
+        print(f"{n_files} files, {os.cpu_count()} CPU core(s)")
+
+        serial = None
+        for workers in WORKERS:
+            db = DocumentVectorizer(max_features=5000, ngram_range=(1, 2))
+            read = _timed(db.load_documents, folder, workers=workers)
+            db.vectorizer.set_params(vocabulary=None)
+            fit = _timed(db._parallel_fit_transform, workers) if workers > 1 else \
+                _timed(db.vectorizer.fit_transform, db.documents)
+            n_chunks = len(db.documents)
+            print(f"workers={workers}:  ingest {read:6.2f} s ({n_files / read:7.1f} files/s)   "
+                  f"vectorize {fit:6.2f} s ({n_chunks / fit:8.0f} chunks/s)")
+
+            if serial is None:
+                serial = db
+            else:
+                assert db.documents == serial.documents
+                assert db.vectorizer.vocabulary_ == serial.vectorizer.vocabulary_
+                assert np.allclose(db.vectorizer.idf_, serial.vectorizer.idf_)
+
+
+if __name__ == "__main__":
+    main()
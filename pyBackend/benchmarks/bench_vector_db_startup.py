@@ -0,0 +1,101 @@
+"""
+Compare vector DB startup of the legacy format with the current one.
+
+legacy:  unpickle vectors + TfidfVectorizer, read metadata.csv, then
+         re-read and re-chunk the source file of every chunk to recover
+         its text (what startup used to do)
+current: DocumentVectorizer.load(): memory-mapped CSR arrays, vocabulary,
+         idf, typed metadata table and chunks.bin
+
+The legacy files are written to a temporary directory from the current DB.
+
+Run from pyBackend/:  python -m benchmarks.bench_vector_db_startup
+"""
+
+import contextlib
+import io
+import pickle
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from scripts.vektorizer import DocumentVectorizer
+
+SCRIPTS_DIR = Path(__file__).parent.parent / "scripts"
+VECTORS_DB_DIR = SCRIPTS_DIR / "vectors_db"
+
+
+def _write_legacy(db, legacy_dir: Path):
+    with open(legacy_dir / "vectors.pkl", "wb") as f:
+        pickle.dump(db.vectors.copy(), f)
+    with open(legacy_dir / "vectorizer.pkl", "wb") as f:
+        pickle.dump(db.vectorizer, f)
+    pd.DataFrame(db.metadata.tolist(), columns=db.metadata.dtype.names).to_csv(
+        legacy_dir / "metadata.csv", index=False
+    )
+
+
+def _load_legacy(legacy_dir: Path):
+    db = DocumentVectorizer()
+    with open(legacy_dir / "vectors.pkl", "rb") as f:
+        db.vectors = pickle.load(f)
+    with open(legacy_dir / "vectorizer.pkl", "rb") as f:
+        db.vectorizer = pickle.load(f)
+    db.metadata = pd.read_csv(legacy_dir / "metadata.csv").to_dict("records")
+
+    documents = []
+    for meta in db.metadata:
+        try:
+            # metadata paths are relative to scripts/, where the DB was built
+            with open(SCRIPTS_DIR / meta["path"], "r", encoding="utf-8") as f:
+                chunks = db.chunk_text(f.read().strip())
+            documents.append(chunks[meta["chunk_id"]] if meta["chunk_id"] < len(chunks) else "")
+        except OSError:
+            documents.append("")
+    db.documents = documents
+    return db
+
+
+def _load_current():
+    db = DocumentVectorizer()
+    db.load(VECTORS_DB_DIR)
+    return db
+
+
+def _time(label, load, repeat=10):
+    samples = []
+    for _ in range(repeat):
+        # DocumentVectorizer prints progress on every load
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            db = load()
+            samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    print(f"{label:<34} min={samples[0]:8.2f} ms  median={samples[len(samples) // 2]:8.2f} ms")
+    return db
+
+
+def main():
+    print(f"Vector DB: {VECTORS_DB_DIR}\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_dir = Path(tmp)
+        with contextlib.redirect_stdout(io.StringIO()):
+            _write_legacy(_load_current(), legacy_dir)
+
+        legacy = _time("legacy (pickle + re-chunk sources)", lambda: _load_legacy(legacy_dir))
+        current = _time("current (mmap arrays + chunks.bin)", _load_current)
+
+    assert len(legacy.documents) == len(current.documents)
+    mismatched = sum(a != b for a, b in zip(legacy.documents, current.documents))
+    print(f"\n{len(current.documents)} chunks, {mismatched} differ from the re-chunked source files")
+
+    query = "limit bagażu podręcznego"
+    with contextlib.redirect_stdout(io.StringIO()):
+        same = legacy.search(query, top_k=5).equals(current.search(query, top_k=5))
+    print(f"Search results identical: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Micro-benchmark of DocumentVectorizer search on synthetic corpora of
+10k, 100k and 1M chunks.
+
+legacy:  cosine_similarity (re-normalizes every row per query) + full
+         argsort + DataFrame, as search() used to do
+top_k:   one sparse mat-vec over rows normalized once + argpartition
+records: top_k plus metadata dicts (what the /chat retrieval uses)
+batch:   search_batch over BATCH_QUERIES queries, reported per query
+
+Chunks are random TF-IDF-like rows over the real vocabulary, so queries go
+through the real vectorizer.transform.
+
+Run from pyBackend/:  python -m benchmarks.bench_vector_search
+"""
+
+import contextlib
+import io
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+
+from benchmarks._timing import measure, report
+from scripts.vektorizer import DocumentVectorizer
+
+VECTORS_DB_DIR = "scripts/vectors_db"
+SIZES = (10_000, 100_000, 1_000_000)
+TERMS_PER_CHUNK = 40
+QUERIES = [
+    "limit bagażu podręcznego",
+    "zwrot pieniędzy za odwołany lot",
+    "przewóz zwierząt w kabinie",
+    "odprawa online i karta pokładowa",
+    "bagaż rejestrowany opłata za nadbagaż",
+]
+BATCH_QUERIES = QUERIES * 200
+
+
+def _synthetic_db(base: DocumentVectorizer, n_chunks: int, rng) -> DocumentVectorizer:
+    n_terms = len(base.vectorizer.vocabulary_)
+    indptr = np.arange(0, (n_chunks + 1) * TERMS_PER_CHUNK, TERMS_PER_CHUNK, dtype=np.int64)
+    indices = rng.integers(0, n_terms, size=n_chunks * TERMS_PER_CHUNK, dtype=np.int32)
+    data = rng.random(n_chunks * TERMS_PER_CHUNK)
+    vectors = csr_matrix((data, indices, indptr), shape=(n_chunks, n_terms))
+    vectors.sum_duplicates()
+
+    db = DocumentVectorizer()
+    db.vectorizer = base.vectorizer
+    db.vectors = normalize(vectors, norm="l2")
+    db.metadata = np.zeros(n_chunks, dtype=[("filename", "<U16"), ("size", np.int64), ("chunk_id", np.int64)])
+    db.metadata["filename"] = "synthetic.txt"
+    db.metadata["chunk_id"] = np.arange(n_chunks)
+    return db
+
+
+def _legacy_search(db: DocumentVectorizer, query: str, top_k: int = 5) -> pd.DataFrame:
+    similarities = cosine_similarity(db.vectorizer.transform([query]), db.vectors)[0]
+    results = []
+    for idx in np.argsort(similarities)[::-1]:
+        score = similarities[idx]
+        if score < 0.1:
+            continue
+        results.append({
+            "index": int(idx),
+            "filename": db.metadata[idx]["filename"],
+            "chunk_id": db.metadata[idx]["chunk_id"],
+            "similarity_score": float(score),
+            "size": db.metadata[idx]["size"],
+        })
+        if len(results) >= top_k:
+            break
+    return pd.DataFrame(results)
+
+
+def main():
+    base = DocumentVectorizer()
+    with contextlib.redirect_stdout(io.StringIO()):
+        base.load(VECTORS_DB_DIR)
+
+    rng = np.random.default_rng(0)
+    for n_chunks in SIZES:
+        db = _synthetic_db(base, n_chunks, rng)
+        print(f"\n{n_chunks:,} chunks, {db.vectors.nnz:,} non-zeros")
+
+        # first call normalizes once; not part of the per-query latency
+        db.top_k(QUERIES[0])
+        repeat = 20 if n_chunks < 1_000_000 else 3
+
+        report("legacy (cosine+argsort+df)", measure(lambda q: _legacy_search(db, q), QUERIES, repeat))
+        report("top_k (mat-vec+argpartition)", measure(db.top_k, QUERIES, repeat))
+        report("search_records", measure(db.search_records, QUERIES, repeat))
+
+        start = time.perf_counter()
+        batch = db.search_batch(BATCH_QUERIES)
+        per_query_ms = (time.perf_counter() - start) * 1000 / len(BATCH_QUERIES)
+        print(f"{'search_batch':<28} {per_query_ms:9.3f} ms per query ({len(BATCH_QUERIES)} queries)")
+        assert batch[:len(QUERIES)] == [db.search_records(query) for query in QUERIES]
+
+        for query in QUERIES:
+            expected = _legacy_search(db, query)["index"].tolist()
+            assert [r["index"] for r in db.search_records(query)] == expected
+        del db
+
+
+if __name__ == "__main__":
+    main()
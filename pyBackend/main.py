@@ -1,9 +1,34 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from services.http import UpstreamClients
+from services.loop_lag import LoopLagMonitor
+from services.metrics import REGISTRY, RequestMetricsMiddleware
 import os
 import importlib
+import traceback
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled client per upstream for the whole process, shared by all routers
+    app.state.http = UpstreamClients()
+    # How late the event loop wakes up, i.e. how long it is blocked (GET /api/openai/retrieval/stats)
+    app.state.loop_lag = LoopLagMonitor(interval=float(os.getenv("LOOP_LAG_INTERVAL", "0.05")))
+    app.state.loop_lag.start()
+    REGISTRY.callback("event_loop_lag_seconds", "Event loop lag over the recent samples", lambda: [
+        ({"quantile": quantile}, app.state.loop_lag.stats()[key] / 1000)
+        for quantile, key in (("0.5", "p50_ms"), ("0.99", "p99_ms"), ("1", "max_ms"))
+    ])
+    try:
+        yield
+    finally:
+        app.state.loop_lag.stop()
+        await app.state.http.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS
 origins = [o.strip() for o in os.getenv("CORS_ALLOWED_ORIGINS", "http://localhost:3000,http://localhost:5173").split(",") if o.strip()]
@@ -16,6 +41,8 @@ app.add_middleware(
     expose_headers=["*"],
     max_age=3600,
 )
+# Request duration per route, method and status (GET /metrics)
+app.add_middleware(RequestMetricsMiddleware)
 
 
 @app.get("/")
@@ -28,11 +55,18 @@ async def health_check():
     """Simple health endpoint."""
     return {"status": "ok"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Metrics of this worker in the Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # Register routers dynamically to avoid static import issues in some tools
 try:
     openai_module = importlib.import_module("routers.openai")
     openai_router = getattr(openai_module, "router")
     app.include_router(openai_router, prefix="/api/openai")
 except Exception:
-    # In development or static analysis environments this may fail; ignore so tooling doesn't break.
-    pass
+    # In development or static analysis environments this may fail; keep the app importable
+    # for tooling, but say why the /api/openai routes are missing
+    print("⚠️ routers.openai could not be loaded, /api/openai routes are disabled:")
+    traceback.print_exc()
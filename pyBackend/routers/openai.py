@@ -1,15 +1,59 @@
+import asyncio
+import hashlib
+import hmac
 import httpx
 import json
 import os
-import pandas as pd
-import pickle
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pathlib import Path
-from pydantic import BaseModel, Field
-from scripts.vektorizer import DocumentVectorizer
-from typing import List, Optional, Any, Dict
-
-_vector_db = DocumentVectorizer()
+from pydantic import BaseModel, ConfigDict, Field
+from scripts.vektorizer import DocumentVectorizer, index_version
+from services.airports import AirportIndex
+from services.cache import AsyncTTLCache
+from services.context import merge_chunks, pack_passages, trim_history
+from services.flights import FlightService
+from services.http import UpstreamClients, get_upstream_clients
+from services.intent import (KB_HIT_SIMILARITY, LocalIntentRouter, extract_airline_documents,
+                             extract_flight_number, has_flight_context, normalize_flight_number)
+from services.metrics import REGISTRY
+from services.response_cache import ResponseCache, normalize_message
+from services.retrieval import RetrievalOverloaded, RetrievalService
+from services.timing import StageTimer
+from services.vector_index import VectorIndexManager
+from typing import List, Optional, Any, Dict, Tuple
+
+# Retrieval engine: "tfidf" scans the whole TF-IDF matrix, "bm25" uses the inverted index,
+# "dense" searches LSA embeddings with the IVF-PQ index
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "tfidf")
+
+# IVF-PQ recall/latency knobs: lists probed per query, candidates re-scored exactly
+DENSE_NPROBE = int(os.getenv("DENSE_NPROBE", "8"))
+DENSE_RERANK = int(os.getenv("DENSE_RERANK", "50"))
+
+# Similarity thresholds, on the scale of the backend's similarity_score: results kept
+# as chat context, and the best result that the local intent router counts as a
+# knowledge-base hit. Unset: the backend's defaults (MIN_SIMILARITY_BY_BACKEND, KB_HIT_SIMILARITY)
+RETRIEVAL_MIN_SIMILARITY = os.getenv("RETRIEVAL_MIN_SIMILARITY")
+INTENT_MIN_SIMILARITY = os.getenv("INTENT_MIN_SIMILARITY")
+
+# MMR re-ranking of the chat retrieval: weight of relevance vs diversity (1 disables it)
+RETRIEVAL_MMR_LAMBDA = float(os.getenv("RETRIEVAL_MMR_LAMBDA", "0.7"))
+
+# Vector searches run in a dedicated pool ("thread", or "process" for large indexes);
+# at most RETRIEVAL_WORKERS + RETRIEVAL_QUEUE_SIZE searches are admitted, the rest get 503
+RETRIEVAL_EXECUTOR = os.getenv("RETRIEVAL_EXECUTOR", "thread")
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "2"))
+RETRIEVAL_QUEUE_SIZE = int(os.getenv("RETRIEVAL_QUEUE_SIZE", "32"))
+
+# Seconds between checks of vectors_db/manifest.json for a rebuilt index (0 disables the watch)
+VECTOR_DB_WATCH_INTERVAL = float(os.getenv("VECTOR_DB_WATCH_INTERVAL", "10"))
+
+# Token for the admin endpoints (X-Admin-Token header); admin endpoints are disabled when unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+_airport_index: Optional[AirportIndex] = None
+_vector_db_watch: Optional[asyncio.Task] = None
 
 router = APIRouter()
 
@@ -20,73 +64,160 @@ if not OPENAI_API_KEY:
     OPENAI_API_KEY = ""
     XRAPID_KEY = ""
 
+# Local intent decisions below this confidence fall back to the gpt-4o-mini router
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.75"))
+
+# Flight lookups are cached per normalized flight number (seconds / entries)
+FLIGHT_CACHE_TTL = float(os.getenv("FLIGHT_CACHE_TTL", "60"))
+FLIGHT_CACHE_STALE_TTL = float(os.getenv("FLIGHT_CACHE_STALE_TTL", "300"))
+FLIGHT_CACHE_MAX_ENTRIES = int(os.getenv("FLIGHT_CACHE_MAX_ENTRIES", "1024"))
+
+FLIGHT_BATCH_CONCURRENCY = int(os.getenv("FLIGHT_BATCH_CONCURRENCY", "5"))
+
+# Final chat answers are cached per normalized question, context chunks and completion params
+# (seconds, 0 disables; byte budget; minimum TF-IDF cosine for a paraphrase hit, 1 = exact only)
+CHAT_CACHE_TTL = float(os.getenv("CHAT_CACHE_TTL", "3600"))
+CHAT_CACHE_MAX_BYTES = int(os.getenv("CHAT_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+CHAT_CACHE_SIMILARITY = float(os.getenv("CHAT_CACHE_SIMILARITY", "0.9"))
+
+# Prompt budgets (estimated tokens): knowledge-base context in the system prompt, conversation history
+CHAT_CONTEXT_MAX_TOKENS = int(os.getenv("CHAT_CONTEXT_MAX_TOKENS", "1200"))
+CHAT_HISTORY_MAX_TOKENS = int(os.getenv("CHAT_HISTORY_MAX_TOKENS", "2000"))
+
+_response_cache = ResponseCache(ttl=CHAT_CACHE_TTL, max_bytes=CHAT_CACHE_MAX_BYTES, similarity=CHAT_CACHE_SIMILARITY)
+
+_flight_service = FlightService(
+    openai_api_key=OPENAI_API_KEY,
+    rapidapi_key=XRAPID_KEY or "",
+    details_cache=AsyncTTLCache(
+        ttl=FLIGHT_CACHE_TTL, stale_ttl=FLIGHT_CACHE_STALE_TTL, max_entries=FLIGHT_CACHE_MAX_ENTRIES,
+    ),
+    # Empty aerodatabox results (errors, unknown flights) are not cached
+    status_cache=AsyncTTLCache(
+        ttl=FLIGHT_CACHE_TTL, stale_ttl=FLIGHT_CACHE_STALE_TTL,
+        max_entries=FLIGHT_CACHE_MAX_ENTRIES, should_cache=bool,
+    ),
+)
+
 # Vector Database Configuration
 VECTORS_DB_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "scripts", "vectors_db")
-_vectorizer = None
-_vectors = None
-_metadata = None
-_documents = None
 
 
-def _load_vector_db():
-    """Load vector database (vectors, vectorizer, and metadata)."""
-    global _vectorizer, _vectors, _metadata
+class RetrievalIndex:
+    """One loaded vector DB version and the intent router built from its vocabulary."""
 
-    if _vectors is not None:
-        return  # Already loaded
+    def __init__(self, db: DocumentVectorizer, intent_router: LocalIntentRouter):
+        self.db = db
+        self.intent_router = intent_router
 
-    try:
-        vectors_dir = Path(VECTORS_DB_DIR)
-
-        if not vectors_dir.exists():
-            print(f"⚠️ Vector database directory not found: {VECTORS_DB_DIR}")
-            return
 
-        # Load vectors
-        with open(vectors_dir / 'vectors.pkl', 'rb') as f:
-            _vectors = pickle.load(f)
+def _load_retrieval_index() -> Tuple[str, RetrievalIndex]:
+    # Chunk texts are stored in the vector DB, no source files are read here
+    min_similarity = float(RETRIEVAL_MIN_SIMILARITY) if RETRIEVAL_MIN_SIMILARITY else None
+    db = DocumentVectorizer(backend=RETRIEVAL_BACKEND, min_similarity=min_similarity)
+    db.load(VECTORS_DB_DIR)
+    if db.dense is not None:
+        db.dense.nprobe = DENSE_NPROBE
+        db.dense.rerank = DENSE_RERANK
+    # Lazily built structures are built before the version is swapped in, not on its first request
+    db.warm_up()
+    kb_hit = float(INTENT_MIN_SIMILARITY) if INTENT_MIN_SIMILARITY else KB_HIT_SIMILARITY[db.backend]
+    intent_router = LocalIntentRouter(db.vectorizer.vocabulary_, confidence_threshold=INTENT_CONFIDENCE_THRESHOLD,
+                                      min_similarity=kb_hit)
 
-        # Load vectorizer
-        with open(vectors_dir / 'vectorizer.pkl', 'rb') as f:
-            _vectorizer = pickle.load(f)
+    print(f"✅ Vector DB ready: {len(db.documents)} chunks loaded, backend={db.backend}, "
+          f"version={db.index_version}")
+    return db.index_version, RetrievalIndex(db, intent_router)
 
-        # Load metadata
-        _metadata = pd.read_csv(vectors_dir / 'metadata.csv').to_dict('records')
 
-        print(f"✅ Vector database loaded successfully")
-    except Exception as e:
-        print(f"❌ Error loading vector database: {e}")
+_vector_index = VectorIndexManager(_load_retrieval_index, probe=lambda: index_version(VECTORS_DB_DIR))
+# Created on startup and shut down with the app (load_vector_db / stop_vector_db_watch)
+_retrieval: Optional[RetrievalService] = None
 
 
-def _search_vectors(query: str, top_k: int = 5):
-    df = _vector_db.search(query=query, top_k=top_k)
-    return df.to_dict("records")
+# Per-stage latency of the request pipelines (chat stages come from StageTimer)
+STAGE_SECONDS = REGISTRY.histogram(
+    "pipeline_stage_seconds", "Duration of request pipeline stages (intent, retrieval, flight_lookup, completion...)",
+    ["stage"],
+)
 
 
-def _get_document_content(doc_index: int) -> Optional[str]:
-    """
-    Get document content by index (loads from file).
+def _observe_stage(stage: str, ms: float):
+    STAGE_SECONDS.observe(ms / 1000, stage=stage)
 
-    Args:
-        doc_index: Document index
 
-    Returns:
-        Document content as string
-    """
-    if _metadata is None or doc_index >= len(_metadata):
+def _index_metrics():
+    if _vector_index.version is None:
         return None
+    with _vector_index.acquire() as index:
+        db = index.db
+        vectors = db.vectors
+        return {
+            "chunks": len(db.documents),
+            "files": len(db.file_ranges()),
+            "terms": vectors.shape[1],
+            "vector_bytes": vectors.data.nbytes + vectors.indices.nbytes + vectors.indptr.nbytes,
+        }
+
+
+def _cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {
+        "flight_status": _flight_service.status_cache.stats(),
+        "flight_details": _flight_service.details_cache.stats(),
+        "chat_response": _response_cache.stats(),
+    }
 
+
+def _register_metrics():
+    """Gauges read at scrape time from the index, caches and retrieval pool."""
+    def index_samples(key):
+        def samples():
+            values = _index_metrics()
+            return values[key] if values is not None else None
+        return samples
+
+    REGISTRY.callback("vector_index_chunks", "Chunks in the active vector index", index_samples("chunks"))
+    REGISTRY.callback("vector_index_files", "Documents in the active vector index", index_samples("files"))
+    REGISTRY.callback("vector_index_terms", "Vocabulary size of the active vector index", index_samples("terms"))
+    REGISTRY.callback("vector_index_vector_bytes", "Size of the sparse chunk vectors in bytes",
+                      index_samples("vector_bytes"))
+    REGISTRY.callback("vector_index_info", "Active vector index version and backend", lambda: (
+        [({"version": _vector_index.version, "backend": RETRIEVAL_BACKEND}, 1)] if _vector_index.version else None))
+    REGISTRY.callback("vector_index_reloads_total", "Vector index hot reloads",
+                      lambda: _vector_index.reloads, type="counter")
+
+    REGISTRY.callback("cache_lookups_total", "Cache lookups by result", lambda: [
+        ({"cache": name, "result": result}, stats[result])
+        for name, stats in _cache_stats().items()
+        for result in ("hits", "stale_hits", "semantic_hits", "coalesced", "misses") if result in stats
+    ], type="counter")
+    REGISTRY.callback("cache_hit_ratio", "Share of cache lookups served from the cache", lambda: [
+        ({"cache": name}, stats["hit_ratio"]) for name, stats in _cache_stats().items()
+    ])
+    REGISTRY.callback("cache_entries", "Entries held by each cache", lambda: [
+        ({"cache": name}, stats["size"]) for name, stats in _cache_stats().items()
+    ])
+
+    REGISTRY.callback("retrieval_in_flight", "Vector searches running or queued",
+                      lambda: _retrieval.stats()["in_flight"] if _retrieval is not None else None)
+    REGISTRY.callback("retrieval_rejected_total", "Vector searches rejected by backpressure",
+                      lambda: _retrieval.rejected if _retrieval is not None else None, type="counter")
+
+
+_register_metrics()
+
+
+async def _retrieve(db: DocumentVectorizer, method: str, *args):
+    """Run a vector search off the event loop; a full retrieval queue is a 503."""
     try:
-        doc_path = _metadata[doc_index]['path']
-        with open(doc_path, 'r', encoding='utf-8') as f:
-            return f.read()
-    except Exception as e:
-        print(f"❌ Error reading document: {e}")
-        return None
+        return await _retrieval.search(db, method, *args)
+    except RetrievalOverloaded:
+        raise HTTPException(status_code=503, detail="Retrieval is overloaded, retry shortly",
+                            headers={"Retry-After": "1"})
 
 
 class Message(BaseModel):
-    role: str = Field(..., regex="^(user|system|assistant)$")
+    role: str = Field(..., pattern="^(user|system|assistant)$")
     content: str
 
 
@@ -101,13 +232,29 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     reply: str
     raw: Optional[Dict[str, Any]] = None
+    timings: Optional[Dict[str, float]] = None
+    cache: Optional[str] = None
 
 
 class FlightDetailsRequest(BaseModel):
     flight_number: str = Field(..., description="Flight number (e.g., 'LO123', 'FR4567')")
 
 
+class FlightDetailsBatchRequest(BaseModel):
+    flight_numbers: List[str] = Field(..., min_length=1, max_length=50,
+                                      description="Flight numbers to resolve (e.g., ['LO123', 'FR4567'])")
+
+
+class SearchBatchRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=5000,
+                               description="Queries to search the terms & conditions chunks for")
+    top_k: int = Field(5, ge=1, le=50, description="Number of chunks per query")
+    include_content: bool = Field(False, description="Include the chunk texts in the results")
+
+
 class FlightDetailsResponse(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
     flightNumber: str
     airline: str
     flight_from: str = Field(..., alias="from")
@@ -119,69 +266,152 @@ class FlightDetailsResponse(BaseModel):
     status: str
     delayMinutes: Optional[int] = None
 
-    class Config:
-        populate_by_name = True
-
 
 @router.on_event("startup")
-def load_vector_db():
-    _vector_db.load("./scripts/vectors_db")
+async def load_vector_db():
+    global _retrieval
+    _retrieval = RetrievalService(max_workers=RETRIEVAL_WORKERS, max_queue=RETRIEVAL_QUEUE_SIZE,
+                                  executor=RETRIEVAL_EXECUTOR)
+    _vector_index.load()
 
-    documents = []
+    global _vector_db_watch
+    if VECTOR_DB_WATCH_INTERVAL > 0:
+        _vector_db_watch = asyncio.create_task(_vector_index.watch(VECTOR_DB_WATCH_INTERVAL))
 
-    for meta in _vector_db.metadata:
-        try:
-            with open(meta["path"], "r", encoding="utf-8") as f:
-                content = f.read().strip()
-                chunks = _vector_db.chunk_text(content)
 
-                # safety check
-                if meta["chunk_id"] < len(chunks):
-                    documents.append(chunks[meta["chunk_id"]])
-                else:
-                    documents.append("")
-        except Exception as e:
-            print(f"❌ Failed loading chunk: {e}")
-            documents.append("")
+@router.on_event("shutdown")
+async def stop_vector_db_watch():
+    global _retrieval
+    if _vector_db_watch is not None:
+        _vector_db_watch.cancel()
+    if _retrieval is not None:
+        _retrieval.shutdown()
+        _retrieval = None
 
-    _vector_db.documents = documents
 
-    print(f"✅ Vector DB ready: {len(_vector_db.documents)} chunks loaded")
+@router.on_event("startup")
+def load_airport_index():
+    global _airport_index
+    _airport_index = AirportIndex.load(Path(__file__).parent / "airports.json", Path(__file__).parent / "airports_db")
 
+    print(f"✅ Airport index ready: {len(_airport_index)} airports indexed")
 
-@router.post("/chat", response_model=ChatResponse)
-async def chat_proxy(payload: ChatRequest):
-    if not OPENAI_API_KEY:
-        raise HTTPException(status_code=500, detail="OpenAI API key not configured")
 
+class PreparedChat:
+    """Messages for the final completion and what its answer depends on."""
+
+    def __init__(self, messages: List[Dict[str, Any]], sources: List[Dict[str, Any]], index_version: str,
+                 question: str, query_vector: Any, live_data: bool):
+        self.messages = messages
+        self.sources = sources
+        self.index_version = index_version
+        # Normalized last user message and its TF-IDF vector (response cache key)
+        self.question = question
+        self.query_vector = query_vector
+        # Flight data in the context: the answer must not be reused
+        self.live_data = live_data
+
+
+async def _prepare_chat_messages(payload: ChatRequest, http: UpstreamClients, timer: StageTimer) -> PreparedChat:
+    """
+    Route the last user message and build the messages for the final completion
+    (system prompt with retrieved context + conversation), together with the
+    knowledge-base sources that went into the context.
+    """
     user_message = payload.messages[-1].content
+    question = normalize_message(user_message)
+    query_vector = None
+
+    # The index version is leased until the context is built, so a hot reload
+    # cannot swap the chunk texts out from under the search results
+    with _vector_index.acquire() as index:
+        # Start everything that does not depend on the intent right away: the
+        # local retrieval and a lookup of a flight number named in a message
+        # about a flight run while the intent is decided; results it does not
+        # ask for are dropped. A bare code-and-number is left to the intent.
+        speculative_flight = extract_flight_number(user_message) if has_flight_context(user_message) else None
+        # A question naming an airline is answered from that airline's terms only
+        airline_files = extract_airline_documents(user_message) or None
+        mmr_lambda = RETRIEVAL_MMR_LAMBDA if RETRIEVAL_MMR_LAMBDA < 1 else None
+        retrieval_task = asyncio.create_task(timer.timed(
+            "retrieval", _retrieve(index.db, "search_records", user_message, 5, airline_files, mmr_lambda)))
+        flight_task = None
+        if speculative_flight:
+            flight_task = asyncio.create_task(
+                timer.timed("flight_lookup", _flight_service.status(speculative_flight, http.aerodatabox)))
+        # When the local router is unlikely to be sure, ask the router LLM
+        # alongside the retrieval instead of after it
+        intent_task = None
+        if not index.intent_router.likely_confident(user_message):
+            intent_task = asyncio.create_task(timer.timed("intent", classify_user_intent(user_message, http.openai)))
 
-    #ROUTE INTENT
-    intent = await classify_user_intent(user_message)
-
-    context_blocks = []
-
-    #VECTOR SEARCH (if needed)
-    if intent["needs_vector_search"]:
-        results = _search_vectors(user_message, top_k=5)
-        if results:
-            context = "\n### KNOWLEDGE BASE CHUNKS ###\n"
-            for r in results:
-                chunk = _vector_db.documents[r["index"]]
-                context += (
-                    f"\n[Source: {r['filename']} | chunk {r['chunk_id']}]\n"
-                    f"{chunk}\n"
-                )
-            context_blocks.append(context)
-
-    #FLIGHT LOOKUP (if needed)
-    if intent["needs_flight_lookup"] and intent["flight_number"]:
-        flight_data = await get_flight_details_external(intent["flight_number"])
-        if flight_data:
-            context_blocks.append(
-                "\n### FLIGHT INFORMATION ###\n"
-                + json.dumps(flight_data, indent=2, ensure_ascii=False)
-            )
+        try:
+            #ROUTE INTENT (locally when confident, otherwise via the router LLM)
+            results = await retrieval_task
+            top_similarity = results[0]["similarity_score"] if results else 0.0
+            with timer.stage("intent_local"):
+                intent, confidence = index.intent_router.classify(user_message, top_similarity)
+            if index.intent_router.is_confident(confidence):
+                if intent_task is not None:
+                    intent_task.cancel()
+            else:
+                if intent_task is None:
+                    intent_task = asyncio.create_task(
+                        timer.timed("intent", classify_user_intent(user_message, http.openai)))
+                intent = await intent_task
+
+            context_blocks = []
+            sources = []
+            live_data = False
+
+            #VECTOR SEARCH (if needed)
+            if intent["needs_vector_search"]:
+                results = await retrieval_task
+                if results:
+                    # Overlapping neighbours are merged and the passages packed into the token budget
+                    with timer.stage("context"):
+                        passages = pack_passages(merge_chunks(results, index.db.documents), CHAT_CONTEXT_MAX_TOKENS)
+                        used = {(p.filename, chunk_id) for p in passages for chunk_id in p.chunk_ids}
+                        sources = [
+                            {
+                                "filename": r["filename"],
+                                "chunk_id": r["chunk_id"],
+                                "similarity_score": r["similarity_score"],
+                            }
+                            for r in results if (r["filename"], r["chunk_id"]) in used
+                        ]
+                        context = "\n### KNOWLEDGE BASE CHUNKS ###\n"
+                        for passage in passages:
+                            context += f"\n{passage.header}\n{passage.text}\n"
+                    context_blocks.append(context)
+
+            #FLIGHT LOOKUP (if needed)
+            if intent["needs_flight_lookup"] and intent["flight_number"]:
+                flight_number = normalize_flight_number(intent["flight_number"])
+                if flight_task is None or flight_number != speculative_flight:
+                    if flight_task is not None:
+                        flight_task.cancel()
+                    flight_task = asyncio.create_task(
+                        timer.timed("flight_lookup", _flight_service.status(flight_number, http.aerodatabox)))
+                flight_data = await flight_task
+                if flight_data:
+                    live_data = True
+                    context_blocks.append(
+                        "\n### FLIGHT INFORMATION ###\n"
+                        + json.dumps(flight_data, indent=2, ensure_ascii=False)
+                    )
+        finally:
+            for task in (retrieval_task, flight_task, intent_task):
+                if task is not None and not task.done():
+                    task.cancel()
+
+        if CHAT_CACHE_TTL > 0 and CHAT_CACHE_SIMILARITY < 1 and not live_data:
+            query_vector = index.db.vectorizer.transform([question])
+        index_version = index.db.index_version
+
+    history, omitted = trim_history([msg.model_dump() for msg in payload.messages], CHAT_HISTORY_MAX_TOKENS)
+    if omitted:
+        context_blocks.append(f"\n(The {omitted} oldest messages of this conversation were omitted.)")
 
     messages = [{
         "role": "system",
@@ -195,9 +425,39 @@ async def chat_proxy(payload: ChatRequest):
         )
     }]
 
-    messages.extend([msg.dict() for msg in payload.messages])
+    messages.extend(history)
+    return PreparedChat(messages, sources, index_version, question, query_vector, live_data)
 
-    #FINAL CALL (better model)
+
+def _response_cache_scope(payload: ChatRequest, prepared: PreparedChat, body: Dict[str, Any]) -> Optional[Tuple]:
+    """Everything besides the question the answer depends on; None when it must not be cached."""
+    if CHAT_CACHE_TTL <= 0 or prepared.live_data:
+        return None
+    history = json.dumps([msg.model_dump() for msg in payload.messages[:-1]], ensure_ascii=False, sort_keys=True)
+    return (
+        tuple((source["filename"], source["chunk_id"]) for source in prepared.sources),
+        body["model"], body["temperature"], body["max_tokens"],
+        hashlib.sha256(history.encode("utf-8")).hexdigest(),
+    )
+
+
+def _lookup_response(prepared: PreparedChat, scope: Optional[Tuple], timer: StageTimer):
+    if scope is None:
+        return None, None
+    with timer.stage("response_cache"):
+        return _response_cache.lookup(prepared.index_version, scope, prepared.question, prepared.query_vector)
+
+
+def _store_response(prepared: PreparedChat, scope: Optional[Tuple], reply: str, raw: Optional[Dict[str, Any]]):
+    # An answer built on a version that was swapped out meanwhile would clear the new version's entries
+    if scope is None or not reply or prepared.index_version != _vector_index.version:
+        return
+    size = len(reply.encode("utf-8")) + (len(json.dumps(raw, ensure_ascii=False).encode("utf-8")) if raw else 0)
+    _response_cache.store(prepared.index_version, scope, prepared.question, {"reply": reply, "raw": raw},
+                          size, prepared.query_vector)
+
+
+def _completion_request(payload: ChatRequest, messages: List[Dict[str, Any]], stream: bool = False):
     url = "https://api.openai.com/v1/chat/completions"
     headers = {
         "Authorization": f"Bearer {OPENAI_API_KEY}",
@@ -210,18 +470,122 @@ async def chat_proxy(payload: ChatRequest):
         "temperature": payload.temperature,
         "max_tokens": payload.max_tokens,
     }
+    if stream:
+        body["stream"] = True
+
+    return url, headers, body
+
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat_proxy(payload: ChatRequest, http: UpstreamClients = Depends(get_upstream_clients)):
+    if not OPENAI_API_KEY:
+        raise HTTPException(status_code=500, detail="OpenAI API key not configured")
+
+    timer = StageTimer(observer=_observe_stage)
+    prepared = await _prepare_chat_messages(payload, http, timer)
+
+    #FINAL CALL (better model)
+    url, headers, body = _completion_request(payload, prepared.messages)
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        resp = await client.post(url, json=body, headers=headers)
+    scope = _response_cache_scope(payload, prepared, body)
+    cached, cache_kind = _lookup_response(prepared, scope, timer)
+    if cached is not None:
+        return ChatResponse(reply=cached["reply"], raw=cached["raw"], timings=timer.summary(), cache=cache_kind)
+
+    with timer.stage("completion"):
+        resp = await http.openai.post(url, json=body, headers=headers, timeout=30.0)
 
     data = resp.json()
     reply = data["choices"][0]["message"]["content"]
+    if resp.status_code == 200:
+        _store_response(prepared, scope, reply, data)
+
+    return ChatResponse(reply=reply, raw=data, timings=timer.summary())
+
 
-    return ChatResponse(reply=reply, raw=data)
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 
+@router.post("/chat/stream")
+async def chat_stream(payload: ChatRequest, request: Request,
+                      http: UpstreamClients = Depends(get_upstream_clients)):
+    """
+    Streaming variant of /chat (Server-Sent Events).
+
+    Events: `sources` (knowledge-base chunks used, sent first), `token`
+    (one per completion delta, a single one for a cached answer), then
+    `done` with stage timings, or `error`. The upstream completion is closed
+    as soon as the client disconnects.
+    """
+    if not OPENAI_API_KEY:
+        raise HTTPException(status_code=500, detail="OpenAI API key not configured")
+
+    timer = StageTimer(observer=_observe_stage)
+    prepared = await _prepare_chat_messages(payload, http, timer)
+    url, headers, body = _completion_request(payload, prepared.messages, stream=True)
+    scope = _response_cache_scope(payload, prepared, body)
+    cached, cache_kind = _lookup_response(prepared, scope, timer)
 
-async def classify_user_intent(text: str) -> Dict[str, Any]:
+    async def events():
+        yield _sse("sources", {"sources": prepared.sources})
+
+        if cached is not None:
+            yield _sse("token", {"content": cached["reply"]})
+            yield _sse("done", {"timings": timer.summary(), "cache": cache_kind})
+            return
+
+        completion_start = timer.elapsed_ms()
+        reply = []
+        try:
+            async with http.openai.stream("POST", url, json=body, headers=headers, timeout=30.0) as resp:
+                if resp.status_code != 200:
+                    detail = (await resp.aread()).decode("utf-8", errors="replace")
+                    yield _sse("error", {"status_code": resp.status_code, "detail": detail})
+                    return
+
+                async for line in resp.aiter_lines():
+                    if await request.is_disconnected():
+                        return
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+
+                    try:
+                        chunk = json.loads(data)
+                    except ValueError:
+                        # A malformed or partial line must not abort the whole answer
+                        continue
+                    if not isinstance(chunk, dict):
+                        continue
+                    if chunk.get("error"):
+                        yield _sse("error", {"detail": chunk["error"]})
+                        return
+                    choices = chunk.get("choices") or []
+                    delta = choices[0].get("delta", {}).get("content") if choices else None
+                    if delta:
+                        timer.mark("time_to_first_token")
+                        reply.append(delta)
+                        yield _sse("token", {"content": delta})
+        except httpx.HTTPError as e:
+            yield _sse("error", {"detail": f"Error contacting OpenAI: {e}"})
+            return
+
+        timer.record("completion", timer.elapsed_ms() - completion_start)
+        _store_response(prepared, scope, "".join(reply), None)
+        yield _sse("done", {"timings": timer.summary()})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+
+async def classify_user_intent(text: str, client: httpx.AsyncClient) -> Dict[str, Any]:
     """Use a fast LLM to decide what tools are needed."""
     url = "https://api.openai.com/v1/chat/completions"
 
@@ -255,36 +619,11 @@ Respond ONLY with valid JSON in this format:
         "Content-Type": "application/json",
     }
 
-    async with httpx.AsyncClient(timeout=20.0) as client:
-        resp = await client.post(url, json=body, headers=headers)
+    resp = await client.post(url, json=body, headers=headers, timeout=20.0)
 
     data = resp.json()
     return json.loads(data["choices"][0]["message"]["content"])
 
-async def get_flight_details_external(flight_number: str) -> Dict[str, Any]:
-    url = f"https://aerodatabox.p.rapidapi.com/flights/number/{flight_number}"
-
-    headers = {
-        "x-rapidapi-key": XRAPID_KEY,
-        "x-rapidapi-host": "aerodatabox.p.rapidapi.com",
-    }
-
-    params = {
-        "withAircraftImage": False,
-        "withLocation": True,
-        "withFlightPlan": False,
-    }
-
-    async with httpx.AsyncClient(timeout=20.0) as client:
-        resp = await client.get(url, headers=headers, params=params)
-
-    if resp.status_code != 200:
-        return {}
-
-    data = resp.json()
-    return data[0] if data else {}
-
-
 @router.options("/flight-details")
 async def flight_details_options():
     """Handle CORS preflight requests for flight-details endpoint."""
@@ -292,180 +631,153 @@ async def flight_details_options():
 
 
 @router.post("/flight-details", response_model=Dict[str, Any])
-async def get_flight_details(payload: FlightDetailsRequest):
+async def get_flight_details(payload: FlightDetailsRequest, http: UpstreamClients = Depends(get_upstream_clients)):
     """Get flight details using OpenAI API based on flight number."""
     if not OPENAI_API_KEY:
         raise HTTPException(status_code=500, detail="OpenAI API key not configured")
 
-    system_prompt = """
-Jesteś systemem informacji lotniskowej.
-
-Użytkownik podaje numer lotu (np. "LO123", "FR4567").
-Twoim zadaniem jest zwrócić szczegółowe informacje o locie.
-
-ZASADY:
-- Jeśli numer lotu wygląda poprawnie, ZAWSZE zwróć dane
-- Dane mogą być symulowane, ale muszą być realistyczne
-- Odpowiadaj WYŁĄCZNIE w formacie JSON
-- Nie dodawaj żadnego tekstu poza JSON
-
-FORMAT JSON:
-{
-  "flightNumber": string,
-  "airline": string,
-  "from": string,
-  "to": string,
-  "departureTime": string,
-  "arrivalTime": string,
-  "gate": string,
-  "terminal": string,
-  "status": "On Time" | "Delayed" | "Boarding" | "Cancelled",
-  "delayMinutes": number | null
-}
-"""
-
-    url = "https://api.openai.com/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
-    body = {
-        "model": "gpt-4o-mini",
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": payload.flight_number},
-        ],
-        "temperature": 0.7,
-        "max_tokens": 1024,
-    }
-
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            resp = await client.post(url, json=body, headers=headers)
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=502, detail=f"Error contacting OpenAI: {e}")
-
-    if resp.status_code != 200:
-        try:
-            detail = resp.json()
-        except Exception:
-            detail = resp.text
-        raise HTTPException(status_code=502, detail={"openai_error": detail})
-
-    data = resp.json()
-
-    # Extract the assistant reply (first choice)
-    try:
-        reply = data["choices"][0]["message"]["content"]
-        flight_data = json.loads(reply)
-        return flight_data
-    except json.JSONDecodeError as e:
-        raise HTTPException(status_code=502, detail=f"Failed to parse flight data from AI response: {e}")
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Error processing flight details: {e}")
+    with STAGE_SECONDS.time(stage="flight_details"):
+        return await _flight_service.details(payload.flight_number, http.openai)
 
 
 @router.get("/flight-details", response_model=Dict[str, Any])
 async def get_flight_details_query(
-        flight_number: str = Query(..., description="Flight number (e.g., 'LO123', 'FR4567')")):
+        flight_number: str = Query(..., description="Flight number (e.g., 'LO123', 'FR4567')"),
+        http: UpstreamClients = Depends(get_upstream_clients)):
     """Get flight details using OpenAI API - GET variant with query parameter."""
     if not OPENAI_API_KEY:
         raise HTTPException(status_code=500, detail="OpenAI API key not configured")
 
-    system_prompt = """
-Jesteś systemem informacji lotniskowej.
+    with STAGE_SECONDS.time(stage="flight_details"):
+        return await _flight_service.details(flight_number, http.openai)
 
-Użytkownik podaje numer lotu (np. "LO123", "FR4567").
-Twoim zadaniem jest zwrócić szczegółowe informacje o locie.
 
-ZASADY:
-- Jeśli numer lotu wygląda poprawnie, ZAWSZE zwróć dane
-- Dane mogą być symulowane, ale muszą być realistyczne
-- Odpowiadaj WYŁĄCZNIE w formacie JSON
-- Nie dodawaj żadnego tekstu poza JSON
-
-FORMAT JSON:
-{
-  "flightNumber": string,
-  "airline": string,
-  "from": string,
-  "to": string,
-  "departureTime": string,
-  "arrivalTime": string,
-  "gate": string,
-  "terminal": string,
-  "status": "On Time" | "Delayed" | "Boarding" | "Cancelled",
-  "delayMinutes": number | null
-}
-"""
+@router.post("/flight-details/batch", response_model=Dict[str, Any])
+async def get_flight_details_batch(payload: FlightDetailsBatchRequest,
+                                   http: UpstreamClients = Depends(get_upstream_clients)):
+    """Resolve several flight numbers concurrently (bounded by FLIGHT_BATCH_CONCURRENCY)."""
+    if not OPENAI_API_KEY:
+        raise HTTPException(status_code=500, detail="OpenAI API key not configured")
 
-    url = "https://api.openai.com/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
+    with STAGE_SECONDS.time(stage="flight_details_batch"):
+        flights, errors = await _flight_service.details_batch(
+            payload.flight_numbers, http.openai, max_concurrency=FLIGHT_BATCH_CONCURRENCY
+        )
+    return {
+        "flights": flights,
+        "errors": errors,
     }
-    body = {
-        "model": "gpt-4o-mini",
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": flight_number},
+
+
+@router.post("/search/batch", response_model=Dict[str, Any])
+async def search_batch(payload: SearchBatchRequest):
+    """
+    Vector search for many queries in one call (offline evaluation,
+    multi-turn context retrieval). All queries are scored together.
+    """
+    with _vector_index.acquire() as index:
+        with STAGE_SECONDS.time(stage="search_batch"):
+            results = await _retrieve(index.db, "search_batch", payload.queries, payload.top_k)
+
+        if payload.include_content:
+            for matches in results:
+                for match in matches:
+                    match["content"] = index.db.documents[match["index"]]
+
+    return {
+        "results": [
+            {"query": query, "matches": matches}
+            for query, matches in zip(payload.queries, results)
         ],
-        "temperature": 0.7,
-        "max_tokens": 1024,
     }
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            resp = await client.post(url, json=body, headers=headers)
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=502, detail=f"Error contacting OpenAI: {e}")
 
-    if resp.status_code != 200:
-        try:
-            detail = resp.json()
-        except Exception:
-            detail = resp.text
-        raise HTTPException(status_code=502, detail={"openai_error": detail})
+@router.get("/retrieval/stats", response_model=Dict[str, Any])
+async def retrieval_stats(request: Request):
+    """Retrieval pool queueing/latency and the event-loop lag of this worker."""
+    loop_lag = getattr(request.app.state, "loop_lag", None)
+    return {
+        "retrieval": _retrieval.stats() if _retrieval is not None else None,
+        "event_loop_lag": loop_lag.stats() if loop_lag is not None else None,
+    }
+
+
+@router.get("/cache/stats", response_model=Dict[str, Any])
+async def cache_stats():
+    """Hit/miss counters of the flight and chat response caches."""
+    return _cache_stats()
 
-    data = resp.json()
 
-    # Extract the assistant reply (first choice)
+def _require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not hmac.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@router.post("/admin/vector-db/reload", response_model=Dict[str, Any], dependencies=[Depends(_require_admin)])
+async def reload_vector_db(force: bool = Query(False, description="Reload even if the on-disk version is active")):
+    """
+    Load the rebuilt vector DB and swap it in without a restart. Requests
+    already running finish on the previous version.
+    """
     try:
-        reply = data["choices"][0]["message"]["content"]
-        flight_data = json.loads(reply)
-        return flight_data
-    except json.JSONDecodeError as e:
-        raise HTTPException(status_code=502, detail=f"Failed to parse flight data from AI response: {e}")
+        return await asyncio.to_thread(_vector_index.reload, force)
     except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Error processing flight details: {e}")
+        raise HTTPException(status_code=500, detail=f"Vector DB reload failed, active version kept: {e}")
+
+
+@router.get("/admin/vector-db", response_model=Dict[str, Any], dependencies=[Depends(_require_admin)])
+async def vector_db_status():
+    """Active and draining index versions and the version currently on disk."""
+    return {"on_disk_version": index_version(VECTORS_DB_DIR), **_vector_index.stats()}
 
 
 @router.get("/airports", response_model=Dict[str, Any])
-async def testEndpoint(
+async def search_airports(
         airport_name: str = Query(..., description="Input text to search airports in")
 ):
-    file_path = Path(__file__).parent / "airports.json"
+    if _airport_index is None:
+        raise HTTPException(status_code=503, detail="Airport index not loaded")
 
-    with open(file_path, "r", encoding="utf-8") as f:
-        airports = json.load(f)
+    return {
+        "airports": _airport_index.search(airport_name)
+    }
 
-    airport_name_lower = airport_name.lower()
-    airports_to_return = []
 
-    for airport in airports:
-        name = airport.get("name")
+@router.get("/airports/typeahead", response_model=Dict[str, Any])
+async def airports_typeahead(
+        q: str = Query(..., min_length=1, description="Prefix of an airport name, IATA code or ISO country code"),
+        limit: int = Query(10, ge=1, le=50, description="Maximum number of airports to return"),
+        offset: int = Query(0, ge=0, description="Number of ranked results to skip"),
+):
+    if _airport_index is None:
+        raise HTTPException(status_code=503, detail="Airport index not loaded")
 
-        # skip missing or invalid names
-        if not isinstance(name, str):
-            continue
+    airports, total = _airport_index.typeahead(q, limit=limit, offset=offset)
+    return {
+        "airports": airports,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+    }
 
-        airport_name = name.lower()
 
-        if airport_name_lower in airport_name:
-            airports_to_return.append(airport)
+@router.get("/airports/nearby", response_model=Dict[str, Any])
+async def airports_nearby(
+        lat: float = Query(..., ge=-90, le=90, description="Latitude in degrees"),
+        lon: float = Query(..., ge=-180, le=180, description="Longitude in degrees"),
+        radius_km: Optional[float] = Query(None, gt=0, description="Only return airports within this distance"),
+        k: int = Query(10, ge=1, le=100, description="Maximum number of airports to return"),
+):
+    if _airport_index is None:
+        raise HTTPException(status_code=503, detail="Airport index not loaded")
 
     return {
-        "airports": airports_to_return
+        "airports": [
+            {**airport, "distance_km": round(distance, 3)}
+            for airport, distance in _airport_index.nearby(lat, lon, radius_km=radius_km, k=k)
+        ]
     }
 
 
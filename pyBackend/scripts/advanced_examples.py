@@ -80,10 +80,12 @@ def example_batch_search():
 
     print(f"\n🔍 Wyszukiwanie {len(queries)} zapytań...\n")
 
-    for i, query in enumerate(queries, 1):
+    # Jedno wywołanie dla wszystkich zapytań (jedna transformacja i jedno mnożenie macierzy)
+    all_results = vectorizer.search_batch(queries, top_k=2)
+
+    for i, (query, results) in enumerate(zip(queries, all_results), 1):
         print(f"{i}. Zapytanie: '{query}'")
-        results = vectorizer.search(query, top_k=2)
-        for _, row in results.iterrows():
+        for row in results:
             score = row['similarity_score']
             print(f"   → {row['filename']:20} (wynik: {score:.4f})")
         print()
@@ -0,0 +1,212 @@
+"""
+Indeks odwrócony z rankingiem BM25 - alternatywa dla przeszukiwania całej
+macierzy TF-IDF w DocumentVectorizer.
+
+Dla każdego termu trzymana jest lista postingów (numery chunków) z gotowym
+wkładem BM25 (impact) i jego maksimum. Zapytanie odczytuje tylko listy swoich
+termów, a przycinanie MaxScore pomija resztę listy, gdy żaden nowy chunk
+nie może już wejść do top k - koszt rośnie z postingami zapytania, nie z
+liczbą chunków.
+"""
+
+import numpy as np
+from collections import Counter
+from scipy.sparse import csc_matrix
+from sklearn.feature_extraction.text import CountVectorizer
+
+# Domyślne parametry BM25
+K1 = 1.2
+B = 0.75
+
+
+class BM25Index:
+    """
+    Indeks BM25 zbudowany na listach postingów.
+
+    Tablice (wszystkie mogą być mapowane z pliku):
+        term_offsets: początki list postingów termów (T + 1)
+        postings: numery chunków, rosnąco w obrębie termu
+        impacts: wkład BM25 postingu (idf * znormalizowane tf)
+        max_impacts: maksymalny wkład termu (górna granica dla MaxScore)
+    """
+
+    ARRAYS = ('term_offsets', 'postings', 'impacts', 'max_impacts')
+
+    def __init__(self, arrays, terms, n_docs, analyzer, k1=K1, b=B):
+        """
+        Args:
+            arrays: Słownik tablic z ARRAYS
+            terms: Termy w kolejności list postingów (sekwencja tekstów)
+            n_docs: Liczba chunków
+            analyzer: Funkcja dzieląca tekst na termy (jak przy budowie)
+            k1, b: Parametry BM25 użyte przy liczeniu impacts
+        """
+        self.term_offsets = arrays['term_offsets']
+        self.postings = arrays['postings']
+        self.impacts = arrays['impacts']
+        self.max_impacts = arrays['max_impacts']
+        self.terms = terms
+        self.n_docs = n_docs
+        self.analyzer = analyzer
+        self.k1 = k1
+        self.b = b
+        self._vocabulary = None
+
+    @classmethod
+    def build(cls, documents, analyzer, k1=K1, b=B):
+        """
+        Zbuduj indeks z tekstów chunków.
+
+        Args:
+            documents: Teksty chunków
+            analyzer: Funkcja dzieląca tekst na termy
+            k1: Nasycenie częstości termu
+            b: Siła normalizacji długością chunku
+        """
+        counter = CountVectorizer(analyzer=analyzer)
+        counts = counter.fit_transform(documents)
+        terms = counter.get_feature_names_out().tolist()
+
+        doc_len = np.asarray(counts.sum(axis=1), dtype=np.float64).ravel()
+        avg_len = doc_len.mean() if len(doc_len) and doc_len.mean() > 0 else 1.0
+
+        # Kolumny CSC = listy postingów termów, chunki rosnąco
+        by_term = csc_matrix(counts)
+        by_term.sort_indices()
+        postings = by_term.indices.astype(np.int32)
+        tf = by_term.data.astype(np.float64)
+        term_offsets = by_term.indptr.astype(np.int64)
+
+        df = np.diff(term_offsets)
+        n_docs = counts.shape[0]
+        idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+
+        term_of_posting = np.repeat(np.arange(len(terms)), df)
+        norm = k1 * (1.0 - b + b * doc_len[postings] / avg_len)
+        impacts = (idf[term_of_posting] * tf * (k1 + 1.0) / (tf + norm)).astype(np.float32)
+
+        max_impacts = np.zeros(len(terms), dtype=np.float32)
+        np.maximum.at(max_impacts, term_of_posting, impacts)
+
+        arrays = {
+            'term_offsets': term_offsets,
+            'postings': postings,
+            'impacts': impacts,
+            'max_impacts': max_impacts,
+        }
+        return cls(arrays, terms, n_docs, analyzer, k1=k1, b=b)
+
+    def arrays(self):
+        """Tablice indeksu do zapisania (klucze jak w ARRAYS)."""
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    @property
+    def vocabulary(self):
+        # Słownik budowany przy pierwszym zapytaniu, nie przy wczytaniu
+        if self._vocabulary is None:
+            self._vocabulary = {term: idx for idx, term in enumerate(self.terms)}
+        return self._vocabulary
+
+    def _query_terms(self, query):
+        """Numery termów zapytania z ich krotnością, posortowane malejąco po górnej granicy."""
+        counts = Counter(self.analyzer(query))
+        terms = [(self.vocabulary[term], count) for term, count in counts.items() if term in self.vocabulary]
+        terms.sort(key=lambda item: -float(self.max_impacts[item[0]]) * item[1])
+        return terms
+
+    def _posting_list(self, term_id):
+        start, end = int(self.term_offsets[term_id]), int(self.term_offsets[term_id + 1])
+        return self.postings[start:end], self.impacts[start:end]
+
+    def top_k(self, query, top_k=5):
+        """
+        Top k chunków według BM25 z przycinaniem MaxScore.
+
+        Termy są przetwarzane od najważniejszego (najwyższa górna granica).
+        Dopóki nowy chunk może jeszcze wejść do top k, postingi termu są
+        dodawane w całości. Gdy k-ty najlepszy wynik przekroczy sumę górnych
+        granic pozostałych termów, nowe chunki nie są już przyjmowane: dla
+        reszty termów kandydaci są tylko wyszukiwani binarnie w listach
+        postingów, a kandydaci bez szans na top k są odrzucani.
+
+        Returns:
+            (indeksy, wyniki BM25, maksymalny możliwy wynik zapytania)
+        """
+        terms = self._query_terms(query)
+        if not terms or top_k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64), 0.0
+
+        bounds = np.array([float(self.max_impacts[term_id]) * count for term_id, count in terms])
+        # remaining[i] = suma górnych granic termów od i-tego do końca
+        remaining = np.append(np.cumsum(bounds[::-1])[::-1], 0.0)
+
+        docs = np.empty(0, dtype=np.int64)
+        scores = np.empty(0, dtype=np.float64)
+        accepting = True
+
+        for i, (term_id, count) in enumerate(terms):
+            term_docs, term_impacts = self._posting_list(term_id)
+
+            if accepting:
+                # Suma list: kandydaci + wszystkie postingi termu
+                merged = np.concatenate([docs, term_docs])
+                docs, inverse = np.unique(merged, return_inverse=True)
+                gains = np.concatenate([scores, np.asarray(term_impacts, dtype=np.float64) * count])
+                scores = np.bincount(inverse, weights=gains, minlength=len(docs))
+            elif len(docs):
+                # Tylko aktualizacja kandydatów: wyszukiwanie binarne zamiast przeglądania listy
+                pos = np.searchsorted(term_docs, docs)
+                found = pos < len(term_docs)
+                found[found] = term_docs[pos[found]] == docs[found]
+                scores[found] += np.asarray(term_impacts[pos[found]], dtype=np.float64) * count
+
+            rest = remaining[i + 1]
+            if len(docs) >= top_k:
+                threshold = np.partition(scores, len(scores) - top_k)[len(scores) - top_k]
+                if threshold >= rest:
+                    accepting = False
+                if not accepting:
+                    keep = scores + rest >= threshold
+                    docs, scores = docs[keep], scores[keep]
+
+        k = min(top_k, len(docs))
+        best = np.argpartition(scores, len(scores) - k)[len(scores) - k:] if k < len(docs) else np.arange(len(docs))
+        best = best[np.lexsort((docs[best], -scores[best]))]
+        return docs[best], scores[best], float(remaining[0])
+
+    def range_scores(self, query, ranges):
+        """
+        Wyniki BM25 tylko dla chunków z podanych zakresów wierszy.
+
+        Listy postingów są posortowane rosnąco, więc wycinek każdego zakresu
+        znajduje wyszukiwanie binarne - postingi spoza filtra nie są czytane.
+
+        Args:
+            query: Tekst zapytania
+            ranges: Zakresy wierszy [(start, stop), ...]
+
+        Returns:
+            (indeksy chunków z co najmniej jednym termem zapytania, wyniki BM25)
+        """
+        bounds = np.asarray(ranges, dtype=np.int64).reshape(-1, 2)
+        docs, gains = [], []
+        for term_id, count in self._query_terms(query):
+            term_docs, term_impacts = self._posting_list(term_id)
+            starts = np.searchsorted(term_docs, bounds[:, 0])
+            stops = np.searchsorted(term_docs, bounds[:, 1])
+            for lo, hi in zip(starts, stops):
+                if lo < hi:
+                    docs.append(term_docs[lo:hi])
+                    gains.append(np.asarray(term_impacts[lo:hi], dtype=np.float64) * count)
+        if not docs:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        docs, inverse = np.unique(np.concatenate(docs), return_inverse=True)
+        return docs.astype(np.int64), np.bincount(inverse, weights=np.concatenate(gains), minlength=len(docs))
+
+    def scores(self, query):
+        """Pełne wyniki BM25 dla wszystkich chunków (bez przycinania, do porównań)."""
+        totals = np.zeros(self.n_docs, dtype=np.float64)
+        for term_id, count in self._query_terms(query):
+            term_docs, term_impacts = self._posting_list(term_id)
+            totals[term_docs] += np.asarray(term_impacts, dtype=np.float64) * count
+        return totals
@@ -0,0 +1,200 @@
+"""
+Podział tekstu regulaminów na chunki.
+
+- SentenceChunker: chunki złożone z całych zdań, o rozmiarze liczonym
+  w tokenach (budżet max_tokens, zakładka overlap_tokens z ostatnich zdań).
+  Nowy paragraf (§, artykuł, punkt 4.2.1) zaczyna nowy chunk, a koniec
+  akapitu jest preferowanym miejscem podziału. Zdania dłuższe niż budżet
+  są dzielone na okna słów.
+- WordWindowChunker: dawny podział na okna słów (100 słów, zakładka 50) -
+  każde słowo trafia do dwóch chunków.
+
+Oba działają strumieniowo: chunks() przyjmuje tekst albo iterowalne linie
+(np. otwarty plik) i zwraca generator, więc duży plik nie jest dzielony
+w całości na listę słów ani zdań.
+"""
+
+import io
+import re
+
+# Przybliżenie liczby tokenów modelu (BPE) bez tokenizera: ~4 znaki na token
+CHARS_PER_TOKEN = 4
+
+# Domyślny budżet chunku i zakładki (w tokenach)
+MAX_TOKENS = 200
+OVERLAP_TOKENS = 32
+# Chunk krótszy niż tyle tokenów nie jest zamykany na granicy paragrafu (np. sam nagłówek)
+MIN_TOKENS = 64
+# Koniec akapitu zamyka chunk, gdy ten wypełnia co najmniej taką część budżetu
+PARAGRAPH_FILL = 0.75
+
+# Nagłówki paragrafów: "§ 5", "ARTYKUŁ 4", "Art. 2", "4.1 TARYFY", "4.2.1 Należy..."
+SECTION_RE = re.compile(r'^\s*(§\s*\d+|(ARTYKUŁ|Artykuł|artykuł|Art\.)\s*\d+|\d+\.\d+(\.\d+)*\.?\s+\S)')
+# Koniec zdania: kropka / ! / ? (z cudzysłowem lub nawiasem), dalej spacja i wielka litera, cyfra lub §
+SENTENCE_END_RE = re.compile(r'[.!?…]+["”»)]*(?=\s+[„"(\[]?[A-ZĄĆĘŁŃÓŚŹŻ0-9§])')
+# Skróty, po których kropka nie kończy zdania
+ABBREVIATIONS = frozenset({
+    'np', 'm.in', 'tzw', 'tj', 'itp', 'itd', 'ust', 'pkt', 'art', 'zob', 'ok', 'godz', 'nr', 'poz',
+    'r', 'ww', 'dot', 'tel', 'str', 'lit', 'sp', 'z.o.o', 's.a', 'inc', 'e.g', 'i.e', 'no', 'mr', 'mrs', 'dr',
+})
+
+# Znacznik granicy paragrafu w SentenceChunker.sentences()
+SECTION = object()
+
+
+def count_tokens(text):
+    """Przybliżona liczba tokenów tekstu (CHARS_PER_TOKEN znaków na token)."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _lines(source):
+    return io.StringIO(source) if isinstance(source, str) else source
+
+
+def _ends_sentence(text, end):
+    """Czy kropka kończąca się w text[:end] kończy zdanie (a nie skrót lub numer punktu)."""
+    start = end
+    while start > 0 and not text[start - 1].isspace():
+        start -= 1
+    word = text[start:end].rstrip('.!?…"”»)').lower()
+    return not (word in ABBREVIATIONS or word.isdigit() or len(word) == 1)
+
+
+class SentenceChunker:
+    """Chunki z całych zdań, rozmiar i zakładka w tokenach, granice paragrafów i akapitów."""
+
+    def __init__(self, max_tokens=MAX_TOKENS, overlap_tokens=OVERLAP_TOKENS, min_tokens=MIN_TOKENS):
+        """
+        Args:
+            max_tokens: Budżet chunku w tokenach
+            overlap_tokens: Maksymalny rozmiar zakładki (ostatnie zdania poprzedniego chunku)
+            min_tokens: Krótszy chunk nie jest zamykany na granicy paragrafu
+        """
+        if not 0 <= overlap_tokens < max_tokens:
+            raise ValueError("overlap_tokens musi być mniejsze od max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_tokens = min_tokens
+
+    def params(self):
+        """Parametry do zapisania w manifeście bazy (make_chunker odtwarza chunker)."""
+        return {'type': 'sentence', 'max_tokens': self.max_tokens,
+                'overlap_tokens': self.overlap_tokens, 'min_tokens': self.min_tokens}
+
+    def sentences(self, source):
+        """
+        Generator zdań tekstu. Zwraca też znaczniki granic: None po akapicie,
+        SECTION przed nagłówkiem paragrafu.
+        """
+        pending = ''
+        for line in _lines(source):
+            line = ' '.join(line.split())
+            if not line:
+                # Pusta linia w środku zdania to artefakt konwersji PDF, nie koniec akapitu
+                if not pending:
+                    yield None
+                continue
+            if SECTION_RE.match(line):
+                if pending:
+                    yield pending
+                    pending = ''
+                yield SECTION
+            pending = f"{pending} {line}" if pending else line
+
+            start = 0
+            for match in SENTENCE_END_RE.finditer(pending):
+                if _ends_sentence(pending, match.start() + len(match.group().rstrip('"”»)'))):
+                    yield pending[start:match.end()].strip()
+                    start = match.end()
+            pending = pending[start:].strip()
+
+            # Bardzo długi fragment bez końca zdania (tabela, wyliczenie) nie rośnie bez końca
+            if count_tokens(pending) > self.max_tokens:
+                yield pending
+                pending = ''
+        if pending:
+            yield pending
+
+    def _split_long(self, sentence):
+        """Zdanie dłuższe niż budżet - okna słów mieszczące się w max_tokens."""
+        piece = []
+        size = 0
+        for word in sentence.split():
+            cost = count_tokens(word) + 1
+            if piece and size + cost > self.max_tokens:
+                yield ' '.join(piece)
+                piece, size = [], 0
+            piece.append(word)
+            size += cost
+        if piece:
+            yield ' '.join(piece)
+
+    def chunks(self, source):
+        """Generator chunków tekstu (source: tekst albo iterowalne linie)."""
+        current = []       # zdania chunku z ich liczbą tokenów
+        size = 0
+        fresh = 0          # zdania dodane od ostatniego chunku (bez zakładki)
+
+        for sentence in self.sentences(source):
+            if sentence is None or sentence is SECTION:
+                fill = self.max_tokens * PARAGRAPH_FILL if sentence is None else self.min_tokens
+                if fresh and size >= fill:
+                    yield ' '.join(text for text, _ in current)
+                    current, size, fresh = [], 0, 0
+                continue
+
+            for piece in (self._split_long(sentence) if count_tokens(sentence) > self.max_tokens else (sentence,)):
+                tokens = count_tokens(piece) + 1
+                if current and size + tokens > self.max_tokens:
+                    if fresh:
+                        yield ' '.join(text for text, _ in current)
+                    # Zakładka: ostatnie zdania, które razem mieszczą się w overlap_tokens
+                    carried = []
+                    carried_size = 0
+                    if fresh:
+                        for text, cost in reversed(current[1:]):
+                            if carried_size + cost > self.overlap_tokens or carried_size + cost + tokens > self.max_tokens:
+                                break
+                            carried.insert(0, (text, cost))
+                            carried_size += cost
+                    current, size, fresh = carried, carried_size, 0
+                current.append((piece, tokens))
+                size += tokens
+                fresh += 1
+
+        if fresh:
+            yield ' '.join(text for text, _ in current)
+
+
+class WordWindowChunker:
+    """Okna chunk_size słów przesuwane o chunk_size - overlap (dawny podział chunk_text)."""
+
+    def __init__(self, chunk_size=100, overlap=50):
+        if not 0 <= overlap < chunk_size:
+            raise ValueError("overlap musi być mniejsze od chunk_size")
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+
+    def params(self):
+        return {'type': 'words', 'chunk_size': self.chunk_size, 'overlap': self.overlap}
+
+    def chunks(self, source):
+        step = self.chunk_size - self.overlap
+        words = []
+        for line in _lines(source):
+            words.extend(line.split())
+            while len(words) >= self.chunk_size:
+                yield ' '.join(words[:self.chunk_size])
+                del words[:step]
+        while words:
+            yield ' '.join(words[:self.chunk_size])
+            del words[:step]
+
+
+CHUNKERS = {'sentence': SentenceChunker, 'words': WordWindowChunker}
+
+
+def make_chunker(params):
+    """Chunker z parametrów zapisanych przez params()."""
+    params = dict(params)
+    return CHUNKERS[params.pop('type')](**params)
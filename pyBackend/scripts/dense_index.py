@@ -0,0 +1,207 @@
+"""
+Wyszukiwanie po gęstych wektorach (embeddingach) z przybliżonym indeksem
+najbliższych sąsiadów IVF-PQ.
+
+- LsaEmbedder: lokalne embeddingi bez zewnętrznego modelu - rzut macierzy
+  TF-IDF na n_components kierunków SVD (LSA). Łapie słowa występujące w tych
+  samych kontekstach, więc znajduje też parafrazy, których TF-IDF nie widzi.
+- DenseIndex: indeks IVF-PQ dla dowolnych embeddingów float32/float16.
+  Wektory są dzielone na nlist list (k-means), a reszta względem centroidu
+  listy kodowana iloczynem kwantyzatorów (m podprzestrzeni, 1 bajt każda).
+  Zapytanie przegląda tylko nprobe najbliższych list, liczy przybliżone
+  iloczyny skalarne z tablic (ADC), a rerank najlepszych kandydatów
+  przelicza dokładnie na zapisanych wektorach float16.
+
+Pokrętła dokładność/szybkość: nprobe (więcej list = wyższy recall, wolniej)
+i rerank (więcej dokładnie przeliczonych kandydatów).
+"""
+
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.decomposition import TruncatedSVD
+
+# Domyślne parametry indeksu
+N_SUBQUANTIZERS = 32
+N_CENTROIDS = 256
+NPROBE = 8
+RERANK = 50
+# k-means (listy i kody PQ) uczy się na próbce tylu wektorów
+TRAIN_SIZE = 20000
+
+
+def _unit_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class LsaEmbedder:
+    """Embeddingi LSA: wektor TF-IDF razy macierz kierunków SVD, znormalizowany L2."""
+
+    def __init__(self, vectorizer, components):
+        """
+        Args:
+            vectorizer: Dopasowany TfidfVectorizer (ten sam co dla bazy)
+            components: Macierz kierunków SVD (n_components x liczba cech), float32
+        """
+        self.vectorizer = vectorizer
+        self.components = components
+
+    @classmethod
+    def fit(cls, vectorizer, vectors, n_components=128, random_state=0):
+        """Dopasuj kierunki SVD do macierzy TF-IDF dokumentów."""
+        n_components = max(1, min(n_components, vectors.shape[0] - 1, vectors.shape[1] - 1))
+        svd = TruncatedSVD(n_components=n_components, random_state=random_state)
+        svd.fit(vectors)
+        return cls(vectorizer, svd.components_.astype(np.float32))
+
+    def embed_vectors(self, vectors):
+        """Embeddingi dla gotowych wektorów TF-IDF (macierz rzadka)."""
+        return _unit_rows(vectors @ self.components.T)
+
+    def encode(self, texts):
+        """Embeddingi tekstów (lista) - macierz len(texts) x n_components."""
+        return self.embed_vectors(self.vectorizer.transform(texts))
+
+
+class DenseIndex:
+    """
+    Indeks IVF-PQ dla embeddingów ze znormalizowanymi wierszami
+    (podobieństwo = iloczyn skalarny = cosine similarity).
+
+    Tablice (wszystkie mogą być mapowane z pliku):
+        centroids: centroidy list (nlist x d)
+        codebooks: słowniki kodów podprzestrzeni (m x ksub x d/m)
+        list_offsets: początki list w list_ids/codes (nlist + 1)
+        list_ids: numery dokumentów w kolejności list
+        codes: kody PQ reszt w kolejności list (uint8, P x m)
+        vectors: pełne wektory float16 (do rerank), w kolejności dokumentów
+    """
+
+    ARRAYS = ('centroids', 'codebooks', 'list_offsets', 'list_ids', 'codes', 'vectors')
+
+    def __init__(self, arrays, nprobe=NPROBE, rerank=RERANK):
+        self.centroids = arrays['centroids']
+        self.codebooks = arrays['codebooks']
+        self.list_offsets = arrays['list_offsets']
+        self.list_ids = arrays['list_ids']
+        self.codes = arrays['codes']
+        self.vectors = arrays['vectors']
+        self.nprobe = nprobe
+        self.rerank = rerank
+
+    @classmethod
+    def build(cls, embeddings, nlist=None, m=N_SUBQUANTIZERS, nprobe=NPROBE, rerank=RERANK,
+              train_size=TRAIN_SIZE, random_state=0):
+        """
+        Zbuduj indeks z embeddingów dokumentów (float32 lub float16).
+
+        Args:
+            embeddings: Macierz n x d
+            nlist: Liczba list IVF (domyślnie ~sqrt(n))
+            m: Liczba podprzestrzeni PQ (bajtów na wektor); d jest dopełniane zerami do wielokrotności m
+            nprobe, rerank: Domyślne pokrętła wyszukiwania
+            train_size: Liczba wektorów próbki do uczenia k-means
+        """
+        vectors = _unit_rows(embeddings)
+        n, d = vectors.shape
+        m = max(1, min(m, d))
+        padded = vectors
+        if d % m:
+            padded = np.hstack([vectors, np.zeros((n, m - d % m), dtype=np.float32)])
+        sub_dim = padded.shape[1] // m
+
+        rng = np.random.default_rng(random_state)
+        sample = rng.choice(n, size=train_size, replace=False) if n > train_size else np.arange(n)
+
+        nlist = max(1, min(nlist or int(round(np.sqrt(n))), len(sample)))
+        coarse = KMeans(n_clusters=nlist, n_init=1, random_state=random_state).fit(padded[sample])
+        centroids = coarse.cluster_centers_.astype(np.float32)
+        assign = coarse.predict(padded)
+        residuals = padded - centroids[assign]
+
+        ksub = min(N_CENTROIDS, len(sample))
+        codebooks = np.zeros((m, ksub, sub_dim), dtype=np.float32)
+        codes = np.zeros((n, m), dtype=np.uint8)
+        for j in range(m):
+            part = residuals[:, j * sub_dim:(j + 1) * sub_dim]
+            quantizer = KMeans(n_clusters=ksub, n_init=1, max_iter=50, random_state=random_state).fit(part[sample])
+            codebooks[j] = quantizer.cluster_centers_
+            codes[:, j] = quantizer.predict(part)
+
+        order = np.argsort(assign, kind='stable')
+        list_offsets = np.zeros(nlist + 1, dtype=np.int64)
+        list_offsets[1:] = np.cumsum(np.bincount(assign, minlength=nlist))
+
+        arrays = {
+            'centroids': centroids,
+            'codebooks': codebooks,
+            'list_offsets': list_offsets,
+            'list_ids': order.astype(np.int64),
+            'codes': codes[order],
+            'vectors': padded.astype(np.float16),
+        }
+        return cls(arrays, nprobe=nprobe, rerank=rerank)
+
+    def arrays(self):
+        """Tablice indeksu do zapisania (klucze jak w ARRAYS)."""
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    def vector(self, idx):
+        """Zapisany wektor dokumentu (float32)."""
+        return np.asarray(self.vectors[idx], dtype=np.float32)
+
+    def range_scores(self, query_vector, start, stop):
+        """Dokładne podobieństwa zapytania do dokumentów start..stop-1 (wycinek zapisanych wektorów)."""
+        return np.asarray(self.vectors[start:stop], dtype=np.float32) @ self._prepare_query(query_vector)
+
+    def _prepare_query(self, query_vector):
+        query = np.asarray(query_vector, dtype=np.float32).ravel()
+        dim = self.centroids.shape[1]
+        if len(query) < dim:
+            query = np.concatenate([query, np.zeros(dim - len(query), dtype=np.float32)])
+        norm = np.linalg.norm(query)
+        return query / norm if norm > 0 else query
+
+    def search(self, query_vector, top_k=5, nprobe=None, rerank=None):
+        """
+        Przybliżone top k dokumentów dla wektora zapytania.
+
+        Returns:
+            (indeksy, podobieństwa) malejąco
+        """
+        nprobe = self.nprobe if nprobe is None else nprobe
+        rerank = self.rerank if rerank is None else rerank
+        query = self._prepare_query(query_vector)
+        nlist = len(self.centroids)
+
+        # Najbliższe listy
+        coarse_scores = self.centroids @ query
+        nprobe = max(1, min(nprobe, nlist))
+        probe = np.argpartition(coarse_scores, nlist - nprobe)[nlist - nprobe:] if nprobe < nlist else np.arange(nlist)
+
+        # Tablica ADC: iloczyn zapytania z każdym kodem każdej podprzestrzeni.
+        # Iloczyn jest liniowy, więc jedna tablica służy wszystkim listom.
+        m, _, sub_dim = self.codebooks.shape
+        lut = np.einsum('jkd,jd->jk', self.codebooks, query.reshape(m, sub_dim))
+
+        starts, ends = self.list_offsets[probe], self.list_offsets[probe + 1]
+        positions = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+        if not len(positions):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        base = np.repeat(coarse_scores[probe], ends - starts)
+        approx = base + lut[np.arange(m), self.codes[positions]].sum(axis=1)
+        ids = self.list_ids[positions]
+
+        # Kandydaci do dokładnego przeliczenia
+        keep = min(len(ids), max(top_k, rerank))
+        cand = np.argpartition(approx, len(approx) - keep)[len(approx) - keep:] if keep < len(ids) else np.arange(len(ids))
+        cand_ids, cand_scores = ids[cand], approx[cand]
+        if rerank > 0:
+            cand_scores = np.asarray(self.vectors[cand_ids], dtype=np.float32) @ query
+
+        k = min(top_k, len(cand_ids))
+        best = np.argsort(-cand_scores, kind='stable')[:k]
+        return cand_ids[best], cand_scores[best]
@@ -3,13 +3,302 @@ Skrypt do wektoryzacji dokumentów txt i zapisania wektorów do pliku.
 Pozwala na poszukiwanie dokumentów za pomocą cosine similarity.
 """
 
+import argparse
+import hashlib
+import json
+import mmap
 import numpy as np
 import os
 import pandas as pd
-import pickle
+import shutil
+import tempfile
+import time
+import unicodedata
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from numbers import Integral
 from pathlib import Path
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from scipy.sparse import csr_matrix, vstack
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+try:
+    from .bm25_index import BM25Index
+    from .chunker import CHUNKERS, SentenceChunker, WordWindowChunker, make_chunker
+    from .dense_index import DenseIndex, LsaEmbedder
+except ImportError:
+    # Uruchomienie bezpośrednio z katalogu scripts/ (python vektorizer.py)
+    from bm25_index import BM25Index
+    from chunker import CHUNKERS, SentenceChunker, WordWindowChunker, make_chunker
+    from dense_index import DenseIndex, LsaEmbedder
+
+# Minimalne podobieństwo wyniku wyszukiwania (TF-IDF)
+MIN_SIMILARITY = 0.1
+
+# Wyniki silników mają różne skale, więc każdy ma własny próg (DocumentVectorizer.min_similarity)
+# (cosine LSA jest wysoki także dla zapytań spoza tematu: ~0.7 dla pytania o pogodę)
+MIN_SIMILARITY_BY_BACKEND = {'tfidf': MIN_SIMILARITY, 'bm25': 0.35, 'dense': 0.4}
+
+# Wynik BM25 jako similarity_score: wynik / (wynik + BM25_SCORE_HALF) - skala bezwzględna 0-1,
+# 0.5 dla wyniku BM25 równego BM25_SCORE_HALF (trafienie jednego pospolitego termu daje mało)
+BM25_SCORE_HALF = 10.0
+
+# Silniki wyszukiwania: pełne przeszukanie macierzy TF-IDF, indeks odwrócony BM25
+# lub przybliżone wyszukiwanie po gęstych embeddingach (IVF-PQ)
+BACKENDS = ('tfidf', 'bm25', 'dense')
+
+# search_batch liczy podobieństwa dla tylu zapytań naraz (ogranicza pamięć gęstej macierzy wyników)
+BATCH_BLOCK_SIZE = 256
+
+# MMR: pula kandydatów (wielokrotność top_k) i domyślna waga trafności względem różnorodności
+MMR_POOL = 4
+MMR_LAMBDA = 0.7
+
+
+# Wersja formatu bazy wektorów (manifest.json)
+FORMAT_VERSION = 1
+
+# update() łączy segmenty z bazą (compact), gdy jest ich co najmniej tyle
+MAX_SEGMENTS = 8
+
+# Parametry TfidfVectorizer potrzebne do odtworzenia transform() po wczytaniu
+VECTORIZER_PARAMS = ('lowercase', 'ngram_range', 'max_features', 'min_df', 'max_df',
+                     'norm', 'use_idf', 'smooth_idf', 'sublinear_tf')
+
+
+class PackedTexts(Sequence):
+    """
+    Lista tekstów (chunki, słownik) wczytana z pliku mapowanego do pamięci.
+
+    Wszystkie teksty leżą jeden za drugim w pliku .bin (UTF-8), a plik
+    *_offsets.npy trzyma przesunięcia początków (n + 1 liczb).
+    Tekst jest dekodowany dopiero przy odczycie.
+    """
+
+    def __init__(self, blob_path, offsets_path):
+        self.offsets = np.load(offsets_path, mmap_mode='r')
+        with open(blob_path, 'rb') as f:
+            # mmap nie obsługuje pustych plików
+            self._blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(blob_path) else b''
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        start, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+        return self._blob[start:end].decode('utf-8')
+
+    @staticmethod
+    def write(texts, blob_path, offsets_path):
+        """Zapisz teksty w formacie czytanym przez PackedTexts."""
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        with open(blob_path, 'wb') as f:
+            for idx, text in enumerate(texts):
+                data = text.encode('utf-8')
+                f.write(data)
+                offsets[idx + 1] = offsets[idx] + len(data)
+        np.save(offsets_path, offsets, allow_pickle=False)
+
+
+def metadata_table(metadata):
+    """
+    Zamień listę słowników metadanych na tablicę z typowanymi kolumnami
+    (numpy structured array): teksty jako <U, liczby jako int64.
+    Wiersze obsługują ten sam dostęp co słowniki: meta['filename'].
+    """
+    if not metadata:
+        return np.zeros(0, dtype=[('filename', '<U1')])
+
+    fields = []
+    for name in metadata[0]:
+        values = [meta[name] for meta in metadata]
+        if all(isinstance(value, (int, np.integer)) for value in values):
+            fields.append((name, np.int64))
+        else:
+            width = max(1, max(len(str(value)) for value in values))
+            fields.append((name, f'<U{width}'))
+
+    return np.array([tuple(meta[name] for name, _ in fields) for meta in metadata], dtype=fields)
+
+
+class ConcatTexts(Sequence):
+    """Widok kilku list tekstów (baza + segmenty) jako jednej, tylko wybrane wiersze."""
+
+    def __init__(self, parts, part_ids, rows):
+        self.parts = parts
+        self.part_ids = part_ids
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        return self.parts[self.part_ids[idx]][int(self.rows[idx])]
+
+
+def file_digest(path):
+    """SHA-256 zawartości pliku - wykrywa zmienione dokumenty."""
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def concat_tables(tables):
+    """Połącz tabele metadanych (structured arrays) o tych samych kolumnach, ale różnych szerokościach tekstów."""
+    fields = []
+    for name in tables[0].dtype.names:
+        dtypes = [table.dtype[name] for table in tables]
+        fields.append((name, max(dtypes, key=lambda dtype: dtype.itemsize)))
+    combined = np.zeros(sum(len(table) for table in tables), dtype=fields)
+    start = 0
+    for table in tables:
+        for name in table.dtype.names:
+            combined[name][start:start + len(table)] = table[name]
+        start += len(table)
+    return combined
+
+
+def _write_part(path, vectors, metadata, documents):
+    """Zapisz wektory CSR, metadane i teksty chunków (baza lub segment) do katalogu path."""
+    path.mkdir(parents=True, exist_ok=True)
+    vectors = csr_matrix(vectors)
+    for name in ('data', 'indices', 'indptr'):
+        np.save(path / f'vectors_{name}.npy', getattr(vectors, name), allow_pickle=False)
+    table = metadata if isinstance(metadata, np.ndarray) else metadata_table(metadata)
+    np.save(path / 'metadata.npy', table, allow_pickle=False)
+    PackedTexts.write(documents, path / 'chunks.bin', path / 'chunks_offsets.npy')
+
+
+def _read_part(path, shape):
+    """Wczytaj (mmap) część zapisaną przez _write_part."""
+    data, indices, indptr = (
+        np.load(path / f'vectors_{name}.npy', mmap_mode='r', allow_pickle=False)
+        for name in ('data', 'indices', 'indptr')
+    )
+    vectors = csr_matrix((data, indices, indptr), shape=tuple(shape), copy=False)
+    metadata = np.load(path / 'metadata.npy', mmap_mode='r', allow_pickle=False)
+    documents = PackedTexts(path / 'chunks.bin', path / 'chunks_offsets.npy')
+    return vectors, metadata, documents
+
+
+def _write_manifest(path, manifest):
+    """Zapisz manifest atomowo (plik tymczasowy + os.replace)."""
+    tmp_file = path / 'manifest.json.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_file, path / 'manifest.json')
+
+
+def _read_manifest(path):
+    """Wczytaj manifest; zwraca (manifest, wersja indeksu - skrót SHA-256 pliku manifestu)."""
+    manifest_file = path / 'manifest.json'
+    if not manifest_file.exists():
+        raise FileNotFoundError(
+            f"Brak {manifest_file} - baza wektorów jest niekompletna lub w starym formacie (pickle), "
+            f"przebuduj ją skryptem vektorizer.py"
+        )
+    raw = manifest_file.read_bytes()
+    manifest = json.loads(raw)
+    if manifest.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Nieobsługiwana wersja bazy wektorów: {manifest.get('version')}")
+    return manifest, hashlib.sha256(raw).hexdigest()[:16]
+
+
+def index_version(vectors_dir):
+    """
+    Wersja bazy wektorów na dysku (skrót manifestu) albo None, gdy manifestu nie ma.
+
+    Manifest jest zapisywany jako ostatni (save()) lub podmieniany atomowo
+    (update()), więc zmiana wersji oznacza kompletną nową bazę.
+    """
+    try:
+        return hashlib.sha256((Path(vectors_dir) / 'manifest.json').read_bytes()).hexdigest()[:16]
+    except FileNotFoundError:
+        return None
+
+
+def _normalized_lines(file_path, digest):
+    # Linie pliku znormalizowane do NFKC; skrót SHA-256 liczony przy okazji z surowych bajtów
+    with open(file_path, 'rb') as f:
+        for raw in f:
+            digest.update(raw)
+            yield unicodedata.normalize('NFKC', raw.decode('utf-8'))
+
+
+def ingest_file(file_path, chunker=None):
+    """
+    Wczytaj, znormalizuj i podziel jeden plik na chunki.
+
+    Plik jest czytany linia po linii i podawany do chunkera (generatora),
+    a tekst normalizowany do NFKC (ligatury i twarde spacje z konwersji
+    PDF). Funkcja modułu, więc może działać w procesie roboczym.
+
+    Args:
+        file_path: Ścieżka do pliku txt
+        chunker: SentenceChunker (domyślnie) lub WordWindowChunker
+
+    Returns:
+        (teksty chunków, metadane chunków, skrót SHA-256 pliku)
+    """
+    file_path = Path(file_path)
+    chunker = chunker or SentenceChunker()
+    digest = hashlib.sha256()
+    chunks = list(chunker.chunks(_normalized_lines(file_path, digest)))
+    metadata = [{
+        'filename': file_path.name,
+        'path': str(file_path),
+        'size': os.path.getsize(file_path),
+        'chunk_id': idx,
+        'chunk_count': len(chunks)
+    } for idx in range(len(chunks))]
+    return chunks, metadata, digest.hexdigest()
+
+
+def _try_ingest_file(file_path, chunker=None):
+    # Błąd jednego pliku nie przerywa całej puli - zwracany jest jako tekst
+    try:
+        return ingest_file(file_path, chunker), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _shard_term_stats(args):
+    """Termy shardu z liczbą dokumentów (df) i wystąpień (tf) - pierwszy przebieg fit."""
+    documents, params = args
+    counter = CountVectorizer(**params)
+    counts = counter.fit_transform(documents)
+    df = np.bincount(counts.indices, minlength=counts.shape[1])
+    tf = np.asarray(counts.sum(axis=0)).ravel()
+    return counter.get_feature_names_out(), df, tf
+
+
+def _shard_counts(args):
+    """Macierz zliczeń shardu dla ustalonego słownika - bezstanowa transformacja."""
+    documents, params, vocabulary = args
+    return CountVectorizer(**{**params, 'vocabulary': vocabulary}).transform(documents)
+
+
+def parallel_map(fn, items, workers=1):
+    """fn dla każdego elementu (wyniki w kolejności); przy workers > 1 w puli procesów."""
+    items = list(items)
+    if workers <= 1 or len(items) <= 1:
+        return [fn(item) for item in items]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, items, chunksize=max(1, len(items) // (workers * 4))))
+
+
+def _throughput(label, n_files, n_chunks, seconds):
+    seconds = max(seconds, 1e-9)
+    files = f"{n_files} plik(ów), " if n_files is not None else ""
+    rate = f"{n_files / seconds:.1f} plików/s, " if n_files is not None else ""
+    print(f"📈 {label}: {files}{n_chunks} chunk(ów) w {seconds:.2f} s ({rate}{n_chunks / seconds:.0f} chunków/s)")
 
 
 class DocumentVectorizer:
@@ -17,14 +306,26 @@ class DocumentVectorizer:
     Klasa do wektoryzacji dokumentów i przechowywania/przeszukiwania wektorów.
     """
 
-    def __init__(self, max_features=8000, ngram_range=(1, 2)):
+    def __init__(self, max_features=8000, ngram_range=(1, 2), backend='tfidf', chunker=None,
+                 min_similarity=None):
         """
         Inicjalizacja wektoryzatora.
 
         Args:
             max_features: Maksymalna liczba cech do wyodrębnienia
             ngram_range: Zakres n-gramów (1-grams i 2-grams)
+            backend: Silnik wyszukiwania - 'tfidf' (cosine similarity), 'bm25' (indeks odwrócony)
+                lub 'dense' (embeddingi + indeks IVF-PQ)
+            chunker: Podział plików na chunki (chunker.py); domyślnie SentenceChunker().
+                load() przywraca chunker zapisany w bazie, więc update() dzieli pliki tak samo
+            min_similarity: Domyślny próg similarity_score wyników; None - próg silnika
+                z MIN_SIMILARITY_BY_BACKEND
         """
+        if backend not in BACKENDS:
+            raise ValueError(f"Nieznany silnik wyszukiwania: {backend} (dostępne: {', '.join(BACKENDS)})")
+        self.backend = backend
+        self.min_similarity = MIN_SIMILARITY_BY_BACKEND[backend] if min_similarity is None else min_similarity
+        self.chunker = chunker or SentenceChunker()
         self.vectorizer = TfidfVectorizer(
             max_features=max_features,
             ngram_range=ngram_range,
@@ -36,22 +337,42 @@ class DocumentVectorizer:
         self.vectors = None
         self.documents = None
         self.metadata = None
-
-    def load_documents(self, folder_path):
+        # Wiersze self.vectors znormalizowane L2 (liczone raz, patrz _unit_vectors)
+        self._unit = None
+        self._unit_source = None
+        # Transpozycja _unit w CSR dla search_batch (liczona raz, patrz _unit_vectors_t)
+        self._unit_t = None
+        self._unit_t_source = None
+        # Zakresy wierszy plików (liczone raz, patrz file_ranges)
+        self._ranges = None
+        self._ranges_source = None
+        self.bm25 = None
+        # Indeks gęstych wektorów i funkcja liczenia embeddingów zapytań (encode(texts) -> macierz)
+        self.dense = None
+        self.embedder = None
+        # Skróty SHA-256 plików źródłowych (nazwa pliku -> skrót), do indeksowania przyrostowego
+        self.file_hashes = {}
+        # Katalog i wersja wczytanej bazy (skrót manifestu, patrz index_version())
+        self.vectors_dir = None
+        self.index_version = None
+
+    def load_documents(self, folder_path, workers=1):
         """
         Wczytaj wszystkie pliki txt z folderu.
 
         Args:
             folder_path: Ścieżka do folderu z plikami txt
+            workers: Liczba procesów czytających i dzielących pliki (1 = bez puli)
 
         Returns:
             Lista dokumentów i ich metadanych
         """
+        start = time.perf_counter()
         documents = []
         metadata = []
 
         folder = Path(folder_path)
-        txt_files = list(folder.glob("*.txt"))
+        txt_files = sorted(folder.glob("*.txt"))
 
         if not txt_files:
             print(f"⚠️  Nie znaleziono plików txt w {folder_path}")
@@ -59,54 +380,134 @@ class DocumentVectorizer:
 
         print(f"📂 Znalezione {len(txt_files)} pliku(ów) txt")
 
-        for file_path in sorted(txt_files):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-                    if not content:
-                        continue
-
-                    chunks = self.chunk_text(content)
-
-                    for idx, chunk in enumerate(chunks):
-                        documents.append(chunk)
-                        metadata.append({
-                            'filename': file_path.name,
-                            'path': str(file_path),
-                            'size': os.path.getsize(file_path),
-                            'chunk_id': idx,
-                            'chunk_count': len(chunks)
-                        })
-
-                    print(f"✅ {file_path.name}: {len(chunks)} chunk(s)")
-
-            except Exception as e:
-                print(f"❌ Błąd przy wczytywaniu {file_path.name}: {e}")
-
+        file_hashes = {}
+        for file_path, (result, error) in zip(txt_files, parallel_map(partial(_try_ingest_file, chunker=self.chunker), txt_files, workers)):
+            if error is not None:
+                print(f"❌ Błąd przy wczytywaniu {file_path.name}: {error}")
+                continue
+            chunks, chunk_metadata, digest = result
+            file_hashes[file_path.name] = digest
+            documents.extend(chunks)
+            metadata.extend(chunk_metadata)
+            if chunks:
+                print(f"✅ {file_path.name}: {len(chunks)} chunk(s)")
+
+        self.file_hashes = file_hashes
         self.documents = documents
         self.metadata = metadata
+        _throughput("Wczytywanie", len(file_hashes), len(documents), time.perf_counter() - start)
         return documents, metadata
 
-    def vectorize(self):
+    def vectorize(self, workers=1):
         """
         Wektoryzuj załadowane dokumenty.
 
+        Args:
+            workers: Liczba procesów; przy workers > 1 zliczanie termów jest
+                dzielone na shardy dokumentów (patrz _parallel_fit_transform)
+
         Returns:
             Macierz wektorów (sparse matrix)
         """
         if not self.documents:
             raise ValueError("Brak załadowanych dokumentów. Użyj load_documents() najpierw.")
 
+        start = time.perf_counter()
         print(f"\n🔄 Wektoryzuję {len(self.documents)} dokument(ów)...")
-        self.vectors = self.vectorizer.fit_transform(self.documents)
+        # Zawsze nowy słownik (po load() wektoryzator ma słownik ustalony)
+        self.vectorizer.set_params(vocabulary=None)
+        if workers > 1 and len(self.documents) > 1:
+            self.vectors = self._parallel_fit_transform(workers)
+        else:
+            self.vectors = self.vectorizer.fit_transform(self.documents)
         print(f"✅ Wektoryzacja ukończona. Wymiary: {self.vectors.shape}")
+        _throughput("Wektoryzacja", None, len(self.documents), time.perf_counter() - start)
+
+        self.bm25 = BM25Index.build(self.documents, self.vectorizer.build_analyzer())
+        print(f"✅ Indeks BM25 zbudowany: {len(self.bm25.terms)} termów, {len(self.bm25.postings)} postingów")
+
+        self.build_dense_index()
 
         return self.vectors
 
+    def _parallel_fit_transform(self, workers):
+        """
+        fit_transform TF-IDF na shardach dokumentów w puli procesów.
+
+        Przebieg 1: każdy shard zwraca swoje termy z df i tf; po scaleniu
+        słownik jest przycinany tak jak w TfidfVectorizer (max_df, min_df,
+        max_features). Przebieg 2: shardy liczą zliczenia dla ustalonego
+        słownika (bezstanowo), bloki CSR są łączone, a idf liczone raz
+        dla całości - wynik jest taki sam jak fit_transform (z dokładnością
+        do zaokrągleń float).
+        """
+        params = self.vectorizer.get_params()
+        count_params = {name: params[name] for name in CountVectorizer().get_params() if name in params}
+        count_params.update(max_df=1.0, min_df=1, max_features=None, vocabulary=None, dtype=np.float64)
+
+        documents = self.documents
+        n_docs = len(documents)
+        bounds = np.linspace(0, n_docs, min(workers, n_docs) + 1).astype(int)
+        shards = [[documents[i] for i in range(a, b)] for a, b in zip(bounds[:-1], bounds[1:])]
+
+        stats = parallel_map(_shard_term_stats, [(shard, count_params) for shard in shards], workers)
+        terms, inverse = np.unique(np.concatenate([terms for terms, _, _ in stats]), return_inverse=True)
+        dfs = np.bincount(inverse, weights=np.concatenate([df for _, df, _ in stats]))
+        tfs = np.bincount(inverse, weights=np.concatenate([tf for _, _, tf in stats]))
+
+        max_df, min_df, max_features = params['max_df'], params['min_df'], params['max_features']
+        high = max_df if isinstance(max_df, Integral) else max_df * n_docs
+        low = min_df if isinstance(min_df, Integral) else min_df * n_docs
+        mask = (dfs <= high) & (dfs >= low)
+        if max_features is not None and mask.sum() > max_features:
+            keep = np.flatnonzero(mask)[(-tfs[mask]).argsort()[:max_features]]
+            mask = np.zeros(len(terms), dtype=bool)
+            mask[keep] = True
+        vocabulary = {str(term): idx for idx, term in enumerate(terms[mask])}
+
+        counts = vstack(parallel_map(
+            _shard_counts, [(shard, count_params, vocabulary) for shard in shards], workers
+        ), format='csr')
+        transformer = TfidfTransformer(
+            norm=params['norm'], use_idf=params['use_idf'],
+            smooth_idf=params['smooth_idf'], sublinear_tf=params['sublinear_tf'],
+        )
+        vectors = transformer.fit_transform(counts)
+
+        self.vectorizer.set_params(vocabulary=vocabulary)
+        self.vectorizer.idf_ = transformer.idf_
+        return vectors
+
+    def build_dense_index(self, embeddings=None, embedder=None, **index_params):
+        """
+        Zbuduj indeks gęstych wektorów (backend 'dense').
+
+        Args:
+            embeddings: Gotowe embeddingi chunków (n x d, float32/float16); domyślnie LSA z macierzy TF-IDF
+            embedder: Obiekt z metodą encode(texts) liczący embeddingi zapytań tym samym modelem
+            index_params: Parametry DenseIndex.build (nlist, m, nprobe, rerank)
+        """
+        if embeddings is None:
+            self.embedder = LsaEmbedder.fit(self.vectorizer, self.vectors)
+            embeddings = self.embedder.embed_vectors(self.vectors)
+        else:
+            if embedder is None:
+                raise ValueError("Do własnych embeddingów potrzebny jest embedder (encode(texts)) dla zapytań")
+            self.embedder = embedder
+
+        self.dense = DenseIndex.build(embeddings, **index_params)
+        print(f"✅ Indeks IVF-PQ zbudowany: {len(self.dense.centroids)} list, {self.dense.codes.shape[1]} B/wektor")
+        return self.dense
+
     def save(self, output_dir='./vectors_db'):
         """
         Zapisz wektory i metadane do pliku.
 
+        Pliki są najpierw zapisywane w katalogu tymczasowym i przenoszone
+        przez os.replace, więc procesy, które mają starą bazę zmapowaną
+        w pamięci, dalej czytają stare pliki. Segmenty (update()) są usuwane -
+        zapisana baza zawiera wszystkie chunki.
+
         Args:
             output_dir: Katalog do zapisu
         """
@@ -115,31 +516,66 @@ class DocumentVectorizer:
 
         output_path = Path(output_dir)
         output_path.mkdir(exist_ok=True)
-
-        # Zapisz wektory
-        vectors_file = output_path / 'vectors.pkl'
-        with open(vectors_file, 'wb') as f:
-            pickle.dump(self.vectors, f)
-        print(f"✅ Wektory zapisane: {vectors_file}")
-
-        # Zapisz wektoryzator
-        vectorizer_file = output_path / 'vectorizer.pkl'
-        with open(vectorizer_file, 'wb') as f:
-            pickle.dump(self.vectorizer, f)
-        print(f"✅ Wektoryzator zapisany: {vectorizer_file}")
-
-        # Zapisz metadane jako CSV
-        metadata_file = output_path / 'metadata.csv'
-        df_metadata = pd.DataFrame(self.metadata)
-        df_metadata.to_csv(metadata_file, index=False)
-        print(f"✅ Metadane zapisane: {metadata_file}")
+        staging = Path(tempfile.mkdtemp(prefix='.staging-', dir=output_path))
+
+        # Zapisz wektory (macierz CSR jako trzy surowe tablice, wczytywane przez mmap),
+        # metadane jako typowaną tabelę i teksty chunków (load() nie czyta plików źródłowych)
+        vectors = csr_matrix(self.vectors)
+        _write_part(staging, vectors, self.metadata, self.documents)
+        print(f"✅ Wektory, metadane i teksty chunków zapisane: {output_path}")
+
+        # Zapisz słownik (termy w kolejności kolumn) i wagi idf
+        PackedTexts.write(self.get_feature_names(), staging / 'vocabulary.bin', staging / 'vocabulary_offsets.npy')
+        np.save(staging / 'idf.npy', self.vectorizer.idf_.astype(np.float64), allow_pickle=False)
+        print(f"✅ Słownik i idf zapisane: {output_path / 'vocabulary.bin'}")
+
+        params = self.vectorizer.get_params()
+        manifest = {
+            'version': FORMAT_VERSION,
+            'shape': list(vectors.shape),
+            'vectorizer': {name: params[name] for name in VECTORIZER_PARAMS},
+            'files': self.file_hashes,
+            'segments': [],
+            'chunker': self.chunker.params(),
+        }
+
+        # Zapisz indeks odwrócony BM25 (listy postingów)
+        if self.bm25 is not None:
+            for name, array in self.bm25.arrays().items():
+                np.save(staging / f'bm25_{name}.npy', array, allow_pickle=False)
+            PackedTexts.write(self.bm25.terms, staging / 'bm25_vocabulary.bin',
+                              staging / 'bm25_vocabulary_offsets.npy')
+            manifest['bm25'] = {'n_docs': self.bm25.n_docs, 'k1': self.bm25.k1, 'b': self.bm25.b}
+            print(f"✅ Indeks BM25 zapisany: {output_path / 'bm25_*.npy'}")
+
+        # Zapisz indeks gęstych wektorów (embeddingi LSA można odtworzyć, własny embedder nie jest zapisywany)
+        if self.dense is not None:
+            for name, array in self.dense.arrays().items():
+                np.save(staging / f'dense_{name}.npy', array, allow_pickle=False)
+            lsa = isinstance(self.embedder, LsaEmbedder)
+            if lsa:
+                np.save(staging / 'dense_lsa_components.npy', self.embedder.components, allow_pickle=False)
+            manifest['dense'] = {
+                'embedder': 'lsa' if lsa else 'external',
+                'nprobe': self.dense.nprobe,
+                'rerank': self.dense.rerank,
+            }
+            print(f"✅ Indeks IVF-PQ zapisany: {output_path / 'dense_*.npy'}")
+
+        for file in staging.iterdir():
+            os.replace(file, output_path / file.name)
+        staging.rmdir()
+        # Nowy manifest podmieniany atomowo dopiero, gdy wszystkie pliki są na miejscu
+        # (stary nie jest wcześniej usuwany); segmenty starej bazy usuwane po nim
+        _write_manifest(output_path, manifest)
+        shutil.rmtree(output_path / 'segments', ignore_errors=True)
 
         # Zapisz statystykę
         stats_file = output_path / 'stats.txt'
         with open(stats_file, 'w', encoding='utf-8') as f:
             f.write(f"Liczba dokumentów: {len(self.documents)}\n")
             f.write(f"Wymiary wektorów: {self.vectors.shape}\n")
-            f.write(f"Liczba cech (features): {self.vectorizer.get_feature_names()}\n")
+            f.write(f"Liczba cech (features): {len(self.get_feature_names())}\n")
         print(f"✅ Statystyka zapisana: {stats_file}")
 
         return output_path
@@ -148,120 +584,594 @@ class DocumentVectorizer:
         """
         Wczytaj wektory z pliku.
 
+        Bez segmentów wszystkie tablice są mapowane z pliku (bez kopii).
+        Z segmentami (update()) baza i segmenty są łączone w pamięci,
+        a wiersze plików zmienionych lub usuniętych w późniejszych
+        segmentach są pomijane.
+
         Args:
             vectors_dir: Katalog z zapisanymi wektorami
         """
         vectors_dir = Path(vectors_dir)
+        manifest, self.index_version = _read_manifest(vectors_dir)
+        self.vectors_dir = vectors_dir
+        self._reset_caches()
+
+        # Wczytaj wektory - tablice są mapowane z pliku, strony dzielą wszystkie procesy (workery)
+        self.vectors, self.metadata, self.documents = _read_part(vectors_dir, manifest['shape'])
+
+        # Odtwórz wektoryzator ze słownika i idf (bez ponownego fit)
+        params = manifest['vectorizer']
+        params['ngram_range'] = tuple(params['ngram_range'])
+        terms = PackedTexts(vectors_dir / 'vocabulary.bin', vectors_dir / 'vocabulary_offsets.npy')
+        self.vectorizer = TfidfVectorizer(**params, vocabulary={term: idx for idx, term in enumerate(terms)})
+        self.vectorizer.idf_ = np.load(vectors_dir / 'idf.npy', allow_pickle=False)
+
+        # Wczytaj indeks BM25 (starsze bazy go nie mają - wtedy budowany przy pierwszym użyciu)
+        self.bm25 = None
+        if 'bm25' in manifest:
+            arrays = {
+                name: np.load(vectors_dir / f'bm25_{name}.npy', mmap_mode='r', allow_pickle=False)
+                for name in BM25Index.ARRAYS
+            }
+            terms = PackedTexts(vectors_dir / 'bm25_vocabulary.bin', vectors_dir / 'bm25_vocabulary_offsets.npy')
+            self.bm25 = BM25Index(arrays, terms, analyzer=self.vectorizer.build_analyzer(), **manifest['bm25'])
+
+        # Wczytaj indeks gęstych wektorów
+        self.dense = None
+        self.embedder = None
+        if 'dense' in manifest:
+            arrays = {
+                name: np.load(vectors_dir / f'dense_{name}.npy', mmap_mode='r', allow_pickle=False)
+                for name in DenseIndex.ARRAYS
+            }
+            dense = manifest['dense']
+            self.dense = DenseIndex(arrays, nprobe=dense['nprobe'], rerank=dense['rerank'])
+            if dense['embedder'] == 'lsa':
+                components = np.load(vectors_dir / 'dense_lsa_components.npy', allow_pickle=False)
+                self.embedder = LsaEmbedder(self.vectorizer, components)
+
+        # Starsze bazy nie mają skrótów plików - update() potraktuje wtedy każdy plik jako zmieniony
+        # Starsze bazy były dzielone na okna słów
+        self.chunker = make_chunker(manifest.get('chunker', {'type': 'words'}))
+
+        self.file_hashes = dict(manifest.get('files') or {
+            str(name): None for name in np.unique(self.metadata['filename'])
+        })
+        self.segments = manifest.get('segments', [])
+        if self.segments:
+            self._merge_segments(vectors_dir)
 
-        # Wczytaj wektory
-        with open(vectors_dir / 'vectors.pkl', 'rb') as f:
-            self.vectors = pickle.load(f)
+        print(f"✅ Wektory wczytane z {vectors_dir}")
+        return self.vectors
 
-        # Wczytaj wektoryzator
-        with open(vectors_dir / 'vectorizer.pkl', 'rb') as f:
-            self.vectorizer = pickle.load(f)
+    def _merge_segments(self, vectors_dir):
+        """Połącz bazę z segmentami; dla każdego pliku obowiązuje najnowsza część, która go zawiera."""
+        parts = [(self.vectors, self.metadata, self.documents)]
+        owner = {name: 0 for name in self.file_hashes}
+        for number, segment in enumerate(self.segments, 1):
+            shape = (segment['rows'], self.vectors.shape[1])
+            parts.append(_read_part(vectors_dir / 'segments' / segment['id'], shape))
+            for name in segment['removed']:
+                owner.pop(name, None)
+                self.file_hashes.pop(name, None)
+            for name, digest in segment['files'].items():
+                owner[name] = number
+                self.file_hashes[name] = digest
+
+        vectors, tables, part_ids, rows = [], [], [], []
+        for number, (part_vectors, part_metadata, _) in enumerate(parts):
+            live = np.flatnonzero([owner.get(str(name)) == number for name in part_metadata['filename']])
+            vectors.append(part_vectors[live])
+            tables.append(np.asarray(part_metadata[live]))
+            part_ids.append(np.full(len(live), number, dtype=np.int32))
+            rows.append(live)
+
+        self.vectors = vstack(vectors, format='csr')
+        self.metadata = concat_tables(tables)
+        self.documents = ConcatTexts([part[2] for part in parts], np.concatenate(part_ids), np.concatenate(rows))
+
+        # Zapisane indeksy BM25 i IVF-PQ obejmują tylko bazę - przy pierwszym użyciu budowane są od nowa
+        self.bm25 = None
+        self.dense = None
+        print(f"✅ Dołączono {len(self.segments)} segment(ów): {len(self.documents)} chunków")
+
+    def update(self, folder_path, vectors_dir='./vectors_db', max_segments=MAX_SEGMENTS, workers=1):
+        """
+        Indeksowanie przyrostowe: dopisz do bazy tylko nowe, zmienione i usunięte pliki.
 
-        # Wczytaj metadane
-        self.metadata = pd.read_csv(vectors_dir / 'metadata.csv').to_dict('records')
+        Zmiany są wykrywane po skrócie SHA-256 plików. Chunki nowych
+        i zmienionych plików są wektoryzowane istniejącym słownikiem i idf
+        (bez ponownego fit) i zapisywane jako nowy segment; baza nie jest
+        przepisywana, więc czas zależy od wielkości zmiany, nie korpusu.
+        Termy spoza słownika są pomijane do czasu compact(refit=True).
+        Gdy segmentów jest co najmniej max_segments, wykonywany jest compact().
 
-        # Wczytaj dokumenty (opcjonalnie)
-        # self.documents = self.load_documents(...)
+        Args:
+            folder_path: Folder z plikami txt
+            vectors_dir: Katalog bazy wektorów
+            max_segments: Próg automatycznego compact()
+            workers: Liczba procesów dzielących zmienione pliki
 
-        print(f"✅ Wektory wczytane z {vectors_dir}")
+        Returns:
+            Słownik z listami dodanych, zmienionych i usuniętych plików
+        """
+        start = time.perf_counter()
+        vectors_dir = Path(vectors_dir)
+        self.load(vectors_dir)
+
+        current = {path.name: path for path in sorted(Path(folder_path).glob("*.txt"))}
+        digests = {name: file_digest(path) for name, path in current.items()}
+        added = [name for name in current if name not in self.file_hashes]
+        changed = [name for name in current if name in self.file_hashes and self.file_hashes[name] != digests[name]]
+        removed = [name for name in self.file_hashes if name not in current]
+        summary = {'added': added, 'changed': changed, 'removed': removed, 'chunks': 0}
+
+        if not (added or changed or removed):
+            print("✅ Brak zmian w dokumentach")
+            return summary
+
+        documents, metadata = [], []
+        for chunks, chunk_metadata, _ in parallel_map(partial(ingest_file, chunker=self.chunker),
+                                                         [current[name] for name in added + changed], workers):
+            documents.extend(chunks)
+            metadata.extend(chunk_metadata)
+        summary['chunks'] = len(documents)
+
+        manifest, _ = _read_manifest(vectors_dir)
+        segment_id = f"{manifest.get('segment_seq', 0) + 1:06d}"
+        vectors = self.vectorizer.transform(documents) if documents else csr_matrix((0, self.vectors.shape[1]))
+        _write_part(vectors_dir / 'segments' / segment_id, vectors, metadata_table(metadata) if metadata
+                    else self.metadata[:0], documents)
+
+        manifest['segment_seq'] = manifest.get('segment_seq', 0) + 1
+        manifest.setdefault('segments', []).append({
+            'id': segment_id,
+            'rows': len(documents),
+            'files': {name: digests[name] for name in added + changed},
+            'removed': removed,
+        })
+        _write_manifest(vectors_dir, manifest)
+        print(f"✅ Segment {segment_id}: +{len(added)} / ~{len(changed)} / -{len(removed)} plik(ów), "
+              f"{len(documents)} chunk(ów) w {time.perf_counter() - start:.2f} s")
+
+        self._reset_caches()
+        if len(manifest['segments']) >= max_segments:
+            self.compact(vectors_dir)
+        return summary
+
+    def compact(self, vectors_dir='./vectors_db', refit=False):
+        """
+        Połącz bazę i segmenty w jedną bazę (jak po pełnym zbudowaniu).
+
+        Args:
+            vectors_dir: Katalog bazy wektorów
+            refit: Dopasuj od nowa słownik i idf (z zapisanych tekstów chunków, bez plików źródłowych)
+        """
+        start = time.perf_counter()
+        self.load(vectors_dir)
+        if refit:
+            self.vectorize()
+        else:
+            self.bm25 = BM25Index.build(self.documents, self.vectorizer.build_analyzer())
+            self.build_dense_index()
+        self._reset_caches()
+        self.save(vectors_dir)
+        print(f"✅ Baza scalona: {len(self.documents)} chunków w {time.perf_counter() - start:.2f} s")
         return self.vectors
 
-    def search(self, query, top_k=5):
+    def warm_up(self):
+        """Zbuduj struktury liczone przy pierwszym zapytaniu dla aktywnego backendu (przed podmianą bazy)."""
+        self.file_ranges()
+        if self.backend == 'tfidf':
+            self._unit_vectors()
+        elif self.backend == 'bm25':
+            self._bm25_index().vocabulary
+        elif self.dense is None:
+            print("⚠️  Baza wektorów nie zawiera indeksu IVF-PQ - buduję go w pamięci")
+            self.build_dense_index()
+
+    def _reset_caches(self):
+        """Zapomnij struktury liczone z poprzednich wektorów (po load/update/compact)."""
+        self._unit = self._unit_source = None
+        self._unit_t = self._unit_t_source = None
+        self._ranges = self._ranges_source = None
+
+    def _unit_vectors(self):
         """
-        Szukaj podobnych dokumentów za pomocą cosine similarity.
+        Macierz dokumentów ze znormalizowanymi (L2) wierszami, liczona raz.
+
+        TfidfVectorizer z norm='l2' zapisuje już znormalizowane wiersze - wtedy
+        używana jest sama self.vectors (np. mapowana z pliku), bez kopii.
+        """
+        if self._unit is None or self._unit_source is not self.vectors:
+            vectors = csr_matrix(self.vectors)
+            norms = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel())
+            if not np.allclose(norms[norms > 0], 1.0):
+                vectors = normalize(vectors, norm='l2')
+            self._unit = vectors
+            self._unit_source = self.vectors
+        return self._unit
+
+    def _unit_vectors_t(self):
+        """Transpozycja _unit_vectors() w formacie CSR (termy x chunki), liczona raz."""
+        unit = self._unit_vectors()
+        if self._unit_t is None or self._unit_t_source is not unit:
+            self._unit_t = unit.T.tocsr()
+            self._unit_t_source = unit
+        return self._unit_t
+
+    def file_ranges(self):
+        """
+        Zakresy wierszy plików {nazwa pliku: (start, stop)}, liczone raz.
+
+        Chunki pliku zajmują kolejne wiersze (pliki są wczytywane po kolei,
+        a _merge_segments dołącza każdy plik z jednej części bazy), więc
+        filtr po pliku to wycinek macierzy, a nie przegląd metadanych.
+        """
+        if self.metadata is None:
+            raise ValueError("Brak metadanych. Wczytaj lub wektoryzuj dokumenty najpierw.")
+        if self._ranges is None or self._ranges_source is not self.metadata:
+            names = np.asarray(self.metadata['filename'])
+            starts = np.flatnonzero(np.append(True, names[1:] != names[:-1])) if len(names) else np.empty(0, int)
+            stops = np.append(starts[1:], len(names))
+            ranges = {}
+            for start, stop in zip(starts.tolist(), stops.tolist()):
+                name = str(names[start])
+                if name in ranges:
+                    raise ValueError(f"Chunki pliku {name} nie zajmują kolejnych wierszy")
+                ranges[name] = (start, stop)
+            self._ranges = ranges
+            self._ranges_source = self.metadata
+        return self._ranges
+
+    def _query_vector(self, query):
+        """Znormalizowany (L2) wektor TF-IDF zapytania lub dokumentu o danym indeksie."""
+        if isinstance(query, (int, np.integer)):
+            return self._unit_vectors()[query].toarray().ravel()
+        query_vector = self.vectorizer.transform([query]).toarray().ravel()
+        norm = np.linalg.norm(query_vector)
+        if norm > 0:
+            query_vector /= norm
+        return query_vector
+
+    def _scores(self, query):
+        """
+        Cosine similarity zapytania do wszystkich dokumentów.
 
         Args:
             query: Tekst zapytania lub indeks dokumentu
-            top_k: Liczba zwracanych wyników
 
         Returns:
-            DataFrame z wynikami (nazwa pliku, score, indeks)
+            Tablica podobieństw (po jednym dla każdego dokumentu)
         """
         if self.vectors is None:
             raise ValueError("Brak wektorów. Wczytaj lub wektoryzuj dokumenty najpierw.")
 
-        # Jeśli query to indeks dokumentu
-        if isinstance(query, int):
-            query_vector = self.vectors[query]
-            print(f"🔍 Szukam podobnych do dokumentu: {self.metadata[query]['filename']}")
+        # Jedno mnożenie macierz rzadka x wektor zamiast cosine_similarity
+        return self._unit_vectors() @ self._query_vector(query)
+
+    @staticmethod
+    def _select_top_k(scores, top_k=5, min_score=MIN_SIMILARITY):
+        """
+        Wybierz top_k najlepszych wyników bez sortowania całej tablicy.
+
+        Returns:
+            (indeksy, podobieństwa) - malejąco, tylko wyniki >= min_score
+        """
+        k = min(top_k, len(scores))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=scores.dtype)
+
+        candidates = np.argpartition(scores, -k)[-k:] if k < len(scores) else np.arange(len(scores))
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        candidates = candidates[scores[candidates] >= min_score]
+        return candidates, scores[candidates]
+
+    def _bm25_index(self):
+        if self.bm25 is None:
+            if self.documents is None:
+                raise ValueError("Brak dokumentów. Wczytaj lub wektoryzuj dokumenty najpierw.")
+            print("⚠️  Baza wektorów nie zawiera indeksu BM25 - buduję go w pamięci")
+            self.bm25 = BM25Index.build(self.documents, self.vectorizer.build_analyzer())
+        return self.bm25
+
+    @staticmethod
+    def _bm25_similarity(scores):
+        """
+        Wynik BM25 w skali 0-1: wynik / (wynik + BM25_SCORE_HALF).
+
+        Skala nie zależy od zapytania (dzielenie przez maksymalny wynik
+        zapytania dawało 1.0 każdemu trafieniu jednego termu), więc próg
+        min_score oddziela słabe trafienia od dobrych.
+        """
+        return scores / (scores + BM25_SCORE_HALF)
+
+    def _bm25_top_k(self, query, top_k, min_score):
+        """Top k z indeksu BM25 (similarity_score z _bm25_similarity)."""
+        if isinstance(query, (int, np.integer)):
+            query = self.documents[query]
+        indices, scores, _ = self._bm25_index().top_k(query, top_k)
+        scores = self._bm25_similarity(scores)
+        keep = scores >= min_score
+        return indices[keep], scores[keep]
+
+    def _dense_top_k(self, query, top_k, min_score):
+        """Top k z indeksu IVF-PQ (cosine similarity embeddingów, przybliżone)."""
+        if self.dense is None:
+            print("⚠️  Baza wektorów nie zawiera indeksu IVF-PQ - buduję go w pamięci")
+            self.build_dense_index()
+        if isinstance(query, (int, np.integer)):
+            query_vector = self.dense.vector(query)
         else:
-            # Jeśli query to tekst
-            query_vector = self.vectorizer.transform([query])
-            print(f"🔍 Szukam podobnych do zapytania: '{query[:50]}...'")
+            if self.embedder is None:
+                raise ValueError("Brak embeddera zapytań - ustaw self.embedder (encode(texts))")
+            query_vector = self.embedder.encode([query])[0]
+        indices, scores = self.dense.search(query_vector, top_k)
+        keep = scores >= min_score
+        return indices[keep], scores[keep].astype(np.float64)
+
+    def _filtered_top_k(self, query, top_k, min_score, files):
+        """
+        Top k tylko wśród chunków podanych plików.
 
-        # Oblicz cosine similarity
-        similarities = cosine_similarity(query_vector, self.vectors)[0]
+        Wszystkie silniki liczą podobieństwa wyłącznie dla wycinków wierszy
+        tych plików: TF-IDF i dense (dokładnie, bez IVF-PQ) wycinają wiersze
+        macierzy, BM25 zawęża listy postingów do zakresów wyszukiwaniem binarnym.
+        """
+        file_ranges = self.file_ranges()
+        ranges = [file_ranges[name] for name in dict.fromkeys(files) if name in file_ranges]
+        if not ranges:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        if self.backend == 'bm25':
+            if isinstance(query, (int, np.integer)):
+                query = self.documents[query]
+            rows, scores = self._bm25_index().range_scores(query, ranges)
+            candidates, candidate_scores = self._select_top_k(self._bm25_similarity(scores), top_k, min_score)
+            return rows[candidates], candidate_scores
+
+        if self.backend == 'dense':
+            if self.dense is None:
+                print("⚠️  Baza wektorów nie zawiera indeksu IVF-PQ - buduję go w pamięci")
+                self.build_dense_index()
+            if isinstance(query, (int, np.integer)):
+                query_vector = self.dense.vector(query)
+            else:
+                if self.embedder is None:
+                    raise ValueError("Brak embeddera zapytań - ustaw self.embedder (encode(texts))")
+                query_vector = self.embedder.encode([query])[0]
+            scores = np.concatenate([self.dense.range_scores(query_vector, start, stop) for start, stop in ranges])
+            scores = scores.astype(np.float64)
+        else:
+            unit = self._unit_vectors()
+            query_vector = self._query_vector(query)
+            scores = np.concatenate([unit[start:stop] @ query_vector for start, stop in ranges])
 
-        top_indices = np.argsort(similarities)[::-1]
+        rows = np.concatenate([np.arange(start, stop) for start, stop in ranges])
+        candidates, candidate_scores = self._select_top_k(scores, top_k, min_score)
+        return rows[candidates], candidate_scores
 
-        results = []
-        for idx in top_indices:
-            score = similarities[idx]
-            if score < 0.1:  # similarity threshold
-                continue
+    def top_k(self, query, top_k=5, min_score=None, files=None):
+        """
+        Szybkie wyszukiwanie: indeksy i podobieństwa top_k dokumentów.
+
+        Args:
+            min_score: Próg similarity_score; None - self.min_similarity
+            files: Szukaj tylko w chunkach tych plików (np. ['LOT.txt']); nieznane nazwy są pomijane
 
+        Returns:
+            (indeksy, podobieństwa) jako tablice numpy, malejąco
+        """
+        if min_score is None:
+            min_score = self.min_similarity
+        if files is not None:
+            return self._filtered_top_k(query, top_k, min_score, files)
+        if self.backend == 'bm25':
+            return self._bm25_top_k(query, top_k, min_score)
+        if self.backend == 'dense':
+            return self._dense_top_k(query, top_k, min_score)
+        return self._select_top_k(self._scores(query), top_k, min_score)
+
+    def mmr_top_k(self, query, top_k=5, min_score=None, files=None, mmr_lambda=MMR_LAMBDA):
+        """
+        Top k z re-rankingiem MMR (maximal marginal relevance).
+
+        Z puli MMR_POOL * top_k najlepszych kandydatów wybierany jest po kolei
+        ten, który maksymalizuje mmr_lambda * trafność - (1 - mmr_lambda) *
+        największe podobieństwo do już wybranych (cosine TF-IDF chunków).
+        Sąsiednie, nakładające się chunki tego samego fragmentu nie zajmują
+        wtedy kilku miejsc w wyniku.
+
+        Returns:
+            (indeksy, podobieństwa) w kolejności wyboru; podobieństwa to
+            oryginalna trafność (similarity_score), nie wynik MMR
+        """
+        indices, scores = self.top_k(query, top_k * MMR_POOL, min_score, files)
+        if len(indices) <= 1 or mmr_lambda >= 1:
+            return indices[:top_k], scores[:top_k]
+
+        unit = self._unit_vectors()[indices]
+        similarity = (unit @ unit.T).toarray()
+        selected = [0]
+        redundancy = similarity[0].copy()
+        while len(selected) < min(top_k, len(indices)):
+            mmr = mmr_lambda * scores - (1 - mmr_lambda) * redundancy
+            mmr[selected] = -np.inf
+            best = int(np.argmax(mmr))
+            selected.append(best)
+            np.maximum(redundancy, similarity[best], out=redundancy)
+        return indices[selected], scores[selected]
+
+    def _results(self, indices, scores):
+        """Zamień indeksy i podobieństwa na listę słowników z metadanymi."""
+        results = []
+        for idx, score in zip(indices.tolist(), scores.tolist()):
+            meta = self.metadata[idx]
             results.append({
-                'index': int(idx),
-                'filename': self.metadata[idx]['filename'],
-                'chunk_id': self.metadata[idx]['chunk_id'],
-                'similarity_score': float(score),
-                'size': self.metadata[idx]['size']
+                'index': idx,
+                'filename': str(meta['filename']),
+                'chunk_id': int(meta['chunk_id']),
+                'similarity_score': score,
+                'size': int(meta['size'])
             })
+        return results
+
+    def search_records(self, query, top_k=5, files=None, mmr_lambda=None):
+        """
+        Szukaj podobnych dokumentów, wynik jako lista słowników (bez DataFrame).
 
-            if len(results) >= top_k:
-                break
+        Args:
+            query: Tekst zapytania lub indeks dokumentu
+            top_k: Liczba zwracanych wyników
+            files: Szukaj tylko w chunkach tych plików
+            mmr_lambda: Re-ranking MMR z tą wagą trafności (None - bez MMR)
+
+        Returns:
+            Lista słowników (index, filename, chunk_id, similarity_score, size)
+        """
+        if mmr_lambda is not None:
+            return self._results(*self.mmr_top_k(query, top_k, files=files, mmr_lambda=mmr_lambda))
+        return self._results(*self.top_k(query, top_k, files=files))
+
+    def search_batch(self, queries, top_k=5, min_score=None):
+        """
+        Szukaj dla wielu zapytań naraz.
+
+        Wszystkie zapytania są transformowane jednym wywołaniem
+        vectorizer.transform, a podobieństwa liczone jednym mnożeniem
+        macierz rzadka x macierz rzadka (blokami po BATCH_BLOCK_SIZE zapytań).
+
+        Args:
+            queries: Lista tekstów zapytań
+            top_k: Liczba wyników na zapytanie
 
-        df_results = pd.DataFrame(results)
-        return df_results
+        Returns:
+            Lista wyników (jak w search_records) w kolejności zapytań
+        """
+        if self.vectors is None:
+            raise ValueError("Brak wektorów. Wczytaj lub wektoryzuj dokumenty najpierw.")
+        if not queries:
+            return []
+        if min_score is None:
+            min_score = self.min_similarity
+        if self.backend != 'tfidf':
+            # Indeksy BM25 i IVF-PQ czytają tylko fragment danych dla zapytania - zapytania osobno
+            return [self._results(*self.top_k(query, top_k, min_score)) for query in queries]
+
+        unit_t = self._unit_vectors_t()
+        query_vectors = normalize(self.vectorizer.transform(queries), norm='l2')
+        k = min(top_k, unit_t.shape[1])
+
+        results = []
+        for start in range(0, len(queries), BATCH_BLOCK_SIZE):
+            scores = (query_vectors[start:start + BATCH_BLOCK_SIZE] @ unit_t).toarray()
+            if k <= 0:
+                results.extend([] for _ in range(len(scores)))
+                continue
+
+            if k < scores.shape[1]:
+                candidates = np.argpartition(scores, -k, axis=1)[:, -k:]
+            else:
+                candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+            candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+            order = np.argsort(-candidate_scores, axis=1, kind='stable')
+            candidates = np.take_along_axis(candidates, order, axis=1)
+            candidate_scores = np.take_along_axis(candidate_scores, order, axis=1)
+
+            for indices, row_scores in zip(candidates, candidate_scores):
+                keep = row_scores >= min_score
+                results.append(self._results(indices[keep], row_scores[keep]))
+        return results
+
+    def search(self, query, top_k=5, files=None, mmr_lambda=None):
+        """
+        Szukaj podobnych dokumentów za pomocą cosine similarity.
+
+        Args:
+            query: Tekst zapytania lub indeks dokumentu
+            top_k: Liczba zwracanych wyników
+            files: Szukaj tylko w chunkach tych plików
+            mmr_lambda: Re-ranking MMR z tą wagą trafności (None - bez MMR)
+
+        Returns:
+            DataFrame z wynikami (nazwa pliku, score, indeks)
+        """
+        if self.vectors is None:
+            raise ValueError("Brak wektorów. Wczytaj lub wektoryzuj dokumenty najpierw.")
+
+        if isinstance(query, int):
+            print(f"🔍 Szukam podobnych do dokumentu: {self.metadata[query]['filename']}")
+        else:
+            print(f"🔍 Szukam podobnych do zapytania: '{query[:50]}...'")
+
+        return pd.DataFrame(self.search_records(query, top_k, files, mmr_lambda))
 
     def get_feature_names(self):
         """Zwróć nazwy cech (słowa)."""
         return self.vectorizer.get_feature_names_out()
 
-    def chunk_text(self, text, chunk_size=100, overlap=50):
+    @staticmethod
+    def chunk_text(text, chunk_size=100, overlap=50):
         """
-        Split text into overlapping chunks.
+        Split text into overlapping chunks (the old fixed word windows, see WordWindowChunker).
         """
-        words = text.split()
-        chunks = []
-
-        for i in range(0, len(words), chunk_size - overlap):
-            chunk = " ".join(words[i:i + chunk_size])
-            if len(chunk.strip()) > 0:
-                chunks.append(chunk)
-
-        return chunks
+        return list(WordWindowChunker(chunk_size, overlap).chunks(text))
 
 
 # ============================================================================
 # GŁÓWNA FUNKCJA - PRZYKŁAD UŻYCIA
 # ============================================================================
 
-def main():
-    """Przykład użycia klasy DocumentVectorizer."""
-
-    # Ścieżka do folderu z dokumentami
-    documents_folder = r"C:\Users\Albert\Desktop\STUDIA\Sem2\Zastosowanie AI\Regulaminy\txts"
-    output_folder = "./vectors_db"
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Wektoryzacja regulaminów linii lotniczych (TF-IDF, BM25, IVF-PQ) i zapis bazy wektorów."
+    )
+    parser.add_argument('documents_folder', help="Folder z plikami txt")
+    parser.add_argument('-o', '--output', default='./vectors_db', help="Katalog bazy wektorów (domyślnie ./vectors_db)")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="Liczba procesów do wczytywania i wektoryzacji (domyślnie liczba rdzeni)")
+    parser.add_argument('--max-features', type=int, default=5000, help="Maksymalna liczba cech TF-IDF")
+    parser.add_argument('--chunker', choices=sorted(CHUNKERS), default='sentence',
+                        help="Podział na chunki: całe zdania z budżetem tokenów lub dawne okna słów")
+    parser.add_argument('--max-tokens', type=int, default=SentenceChunker().max_tokens,
+                        help="Budżet chunku w tokenach (chunker sentence)")
+    parser.add_argument('--overlap-tokens', type=int, default=SentenceChunker().overlap_tokens,
+                        help="Maksymalna zakładka między chunkami w tokenach (chunker sentence)")
+    parser.add_argument('--update', action='store_true',
+                        help="Indeksowanie przyrostowe - dopisz tylko nowe, zmienione i usunięte pliki (chunker zapisany w bazie)")
+    parser.add_argument('--no-search', action='store_true', help="Pomiń przykładowe wyszukiwanie")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Zbuduj (lub zaktualizuj) bazę wektorów z wiersza poleceń."""
+    args = parse_args(argv)
+    documents_folder = args.documents_folder
+    output_folder = args.output
 
     # Stwórz wektoryzator
-    vectorizer = DocumentVectorizer(max_features=5000, ngram_range=(1, 2))
+    if args.chunker == 'sentence':
+        chunker = SentenceChunker(max_tokens=args.max_tokens, overlap_tokens=args.overlap_tokens)
+    else:
+        chunker = WordWindowChunker()
+    vectorizer = DocumentVectorizer(max_features=args.max_features, ngram_range=(1, 2), chunker=chunker)
+
+    if args.update:
+        vectorizer.update(documents_folder, output_folder, workers=args.workers)
+        return
 
     # Wczytaj dokumenty
     print("=" * 60)
     print("KROK 1: WCZYTYWANIE DOKUMENTÓW")
     print("=" * 60)
-    vectorizer.load_documents(documents_folder)
+    vectorizer.load_documents(documents_folder, workers=args.workers)
 
     # Wektoryzuj dokumenty
     print("\n" + "=" * 60)
     print("KROK 2: WEKTORYZACJA DOKUMENTÓW")
     print("=" * 60)
-    vectorizer.vectorize()
+    vectorizer.vectorize(workers=args.workers)
 
     # Zapisz wektory
     print("\n" + "=" * 60)
@@ -269,6 +1179,9 @@ def main():
     print("=" * 60)
     vectorizer.save(output_folder)
 
+    if args.no_search:
+        return
+
     # Przykład wyszukiwania
     print("\n" + "=" * 60)
     print("KROK 4: PRZYKŁAD WYSZUKIWANIA")
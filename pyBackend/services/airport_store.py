@@ -0,0 +1,222 @@
+"""
+Columnar, memory-mapped storage for airports.json.
+
+The JSON file is a list of ~7k dicts that repeat every key and keep lat/lon
+as strings. AirportStore keeps one NumPy column per field instead:
+float64 coordinates (NaN when missing), small integer codes for the
+categorical fields and a single UTF-8 blob for names. The columns are
+written once as plain .npy files and memory-mapped on later startups.
+
+Run from pyBackend/ to (re)build the binary store by hand:
+    python -m services.airport_store
+"""
+
+import hashlib
+import json
+import numpy as np
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+AIRPORTS_JSON = Path(__file__).parent.parent / "routers" / "airports.json"
+AIRPORTS_DB_DIR = Path(__file__).parent.parent / "routers" / "airports_db"
+
+FORMAT_VERSION = 1
+CATEGORICAL_FIELDS = ("iso", "continent", "type", "size")
+MISSING_CODE = -1
+
+
+def _file_digest(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+class AirportStore:
+    """
+    Read-only columnar view of the airports table.
+
+    Indexing a store (`store[i]`) or calling `records(ids)` rebuilds the
+    original JSON records, so callers that need dicts (API responses) get
+    exactly what airports.json contains, while indexes are built straight
+    from the columns.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], categories: Dict[str, List[str]]):
+        self.iata = columns["iata"]
+        self.status = columns["status"]
+        self.lat = columns["lat"]
+        self.lon = columns["lon"]
+        self.codes = {field: columns[f"{field}_codes"] for field in CATEGORICAL_FIELDS}
+        self.categories = categories
+
+        blob = bytes(columns["name_blob"])
+        offsets = columns["name_offsets"].tolist()
+        has_name = columns["has_name"].tolist()
+        self.names: List[Optional[str]] = [
+            sys.intern(blob[offsets[i]:offsets[i + 1]].decode("utf-8")) if has_name[i] else None
+            for i in range(len(has_name))
+        ]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, idx: int) -> Dict[str, Any]:
+        return self.records([idx])[0]
+
+    def records(self, ids: Sequence[int]) -> List[Dict[str, Any]]:
+        """Rebuild the JSON records for ids, gathering each column once for the whole batch."""
+        ids = np.asarray(ids, dtype=np.int64)
+        lat = self.lat[ids].tolist()
+        lon = self.lon[ids].tolist()
+        fields = {
+            field: [None if code == MISSING_CODE else self.categories[field][code]
+                    for code in self.codes[field][ids].tolist()]
+            for field in CATEGORICAL_FIELDS
+        }
+
+        records = []
+        for pos, (idx, iata, status) in enumerate(zip(ids.tolist(), self.iata[ids].tolist(),
+                                                      self.status[ids].tolist())):
+            record: Dict[str, Any] = {"iata": iata}
+            has_coords = lat[pos] == lat[pos]  # NaN marks missing coordinates
+            if has_coords:
+                record["lon"] = repr(lon[pos])
+            record["iso"] = fields["iso"][pos]
+            record["status"] = status
+            record["name"] = self.names[idx]
+            record["continent"] = fields["continent"][pos]
+            record["type"] = fields["type"][pos]
+            if has_coords:
+                record["lat"] = repr(lat[pos])
+            record["size"] = fields["size"][pos]
+            records.append(record)
+        return records
+
+    def category(self, field: str, idx: int) -> Optional[str]:
+        code = int(self.codes[field][idx])
+        return None if code == MISSING_CODE else self.categories[field][code]
+
+    @staticmethod
+    def to_columns(airports: List[Dict[str, Any]]):
+        """Convert a list of airport dicts into NumPy columns and category tables."""
+        count = len(airports)
+        columns: Dict[str, np.ndarray] = {
+            "iata": np.array([a.get("iata") or "" for a in airports], dtype="<U3"),
+            "status": np.array([a.get("status") or 0 for a in airports], dtype=np.int8),
+            "lat": np.full(count, np.nan, dtype=np.float64),
+            "lon": np.full(count, np.nan, dtype=np.float64),
+            "has_name": np.zeros(count, dtype=np.bool_),
+        }
+
+        for idx, airport in enumerate(airports):
+            try:
+                lat, lon = float(airport["lat"]), float(airport["lon"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            columns["lat"][idx] = lat
+            columns["lon"][idx] = lon
+
+        categories: Dict[str, List[str]] = {}
+        for field in CATEGORICAL_FIELDS:
+            values = sorted({a[field] for a in airports if isinstance(a.get(field), str)})
+            lookup = {value: code for code, value in enumerate(values)}
+            categories[field] = values
+            columns[f"{field}_codes"] = np.array(
+                [lookup.get(a.get(field), MISSING_CODE) for a in airports], dtype=np.int16
+            )
+
+        encoded = []
+        offsets = np.zeros(count + 1, dtype=np.int64)
+        for idx, airport in enumerate(airports):
+            name = airport.get("name")
+            data = name.encode("utf-8") if isinstance(name, str) else b""
+            columns["has_name"][idx] = isinstance(name, str)
+            encoded.append(data)
+            offsets[idx + 1] = offsets[idx] + len(data)
+        columns["name_blob"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        columns["name_offsets"] = offsets
+
+        return columns, categories
+
+    @classmethod
+    def from_json(cls, path: Path = AIRPORTS_JSON) -> "AirportStore":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(*cls.to_columns(json.load(f)))
+
+    @staticmethod
+    def convert(json_path: Path = AIRPORTS_JSON, db_dir: Path = AIRPORTS_DB_DIR) -> Path:
+        """
+        Write the binary store for json_path into db_dir (one .npy file per column).
+
+        The files are written to a staging directory first and moved in with
+        os.replace, so other workers that have the old columns memory-mapped
+        keep reading the old files instead of ones truncated under them.
+        """
+        with open(json_path, "r", encoding="utf-8") as f:
+            columns, categories = AirportStore.to_columns(json.load(f))
+
+        db_dir = Path(db_dir)
+        db_dir.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=".staging-", dir=db_dir))
+        try:
+            for name, column in columns.items():
+                np.save(staging / f"{name}.npy", column, allow_pickle=False)
+
+            manifest = {
+                "version": FORMAT_VERSION,
+                "source_sha256": _file_digest(Path(json_path)),
+                "count": len(columns["iata"]),
+                "categories": categories,
+            }
+            with open(staging / "manifest.json", "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False)
+
+            for name in columns:
+                os.replace(staging / f"{name}.npy", db_dir / f"{name}.npy")
+            # Manifest last: it only describes the new columns once they are all in place
+            os.replace(staging / "manifest.json", db_dir / "manifest.json")
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        return db_dir
+
+    @classmethod
+    def load(cls, db_dir: Path = AIRPORTS_DB_DIR) -> "AirportStore":
+        """Memory-map a store previously written by convert()."""
+        db_dir = Path(db_dir)
+        with open(db_dir / "manifest.json", "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        columns = {
+            path.stem: np.load(path, mmap_mode="r", allow_pickle=False)
+            for path in db_dir.glob("*.npy")
+        }
+        return cls(columns, manifest["categories"])
+
+    @staticmethod
+    def is_current(json_path: Path = AIRPORTS_JSON, db_dir: Path = AIRPORTS_DB_DIR) -> bool:
+        manifest_path = Path(db_dir) / "manifest.json"
+        if not manifest_path.exists():
+            return False
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        return (manifest.get("version") == FORMAT_VERSION
+                and manifest.get("source_sha256") == _file_digest(Path(json_path)))
+
+
+def load_airport_store(json_path: Path = AIRPORTS_JSON, db_dir: Path = AIRPORTS_DB_DIR) -> AirportStore:
+    """Load the memory-mapped store, converting airports.json first if the store is missing or stale."""
+    if not AirportStore.is_current(json_path, db_dir):
+        try:
+            AirportStore.convert(json_path, db_dir)
+        except OSError as e:
+            print(f"⚠️ Could not write airport store to {db_dir}: {e}")
+            return AirportStore.from_json(json_path)
+    return AirportStore.load(db_dir)
+
+
+if __name__ == "__main__":
+    out = AirportStore.convert()
+    print(f"✅ Airport store written to {out}")
@@ -0,0 +1,180 @@
+import numpy as np
+import unicodedata
+from bisect import bisect_left
+from pathlib import Path
+from services.airport_store import AIRPORTS_DB_DIR, AIRPORTS_JSON, AirportStore, load_airport_store
+from sklearn.neighbors import BallTree
+from typing import Any, Dict, List, Optional, Tuple
+
+# Typeahead ranking: lower sorts first
+SIZE_RANK = {"large": 0, "medium": 1, "small": 2}
+RANK_EXACT_IATA = 0
+RANK_PREFIX = 1
+RANK_WORD_PREFIX = 2
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def normalize(text: str) -> str:
+    """Casefold text and strip diacritics so 'Kraków' matches 'krakow'."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return stripped.casefold()
+
+
+class AirportIndex:
+    """
+    In-memory search index over the airports table, built once at startup
+    from the columnar AirportStore.
+
+    Names are normalized and every suffix of every name is kept in one sorted
+    list, so a substring query is a binary search for the first suffix that
+    starts with the query followed by a walk over the matching run. IATA
+    codes are kept in a separate exact-match map.
+    """
+
+    def __init__(self, store: AirportStore):
+        self.airports = store
+        self._by_iata: Dict[str, List[int]] = {}
+        suffixes = []
+        prefix_keys = []
+
+        size_categories = store.categories["size"]
+        size_rank = np.array(
+            [SIZE_RANK.get(size, len(SIZE_RANK)) for size in size_categories] + [len(SIZE_RANK)],
+            dtype=np.int8,
+        )
+        # MISSING_CODE (-1) picks the trailing "unknown size" rank
+        self._size_rank = size_rank[store.codes["size"]]
+
+        for idx in range(len(store)):
+            iata = str(store.iata[idx])
+            if iata:
+                self._by_iata.setdefault(iata.upper(), []).append(idx)
+                prefix_keys.append((iata.casefold(), RANK_PREFIX, idx))
+
+            iso = store.category("iso", idx)
+            if iso:
+                prefix_keys.append((iso.casefold(), RANK_WORD_PREFIX, idx))
+
+            name = store.names[idx]
+            # skip missing names
+            if name is None:
+                continue
+
+            normalized = normalize(name)
+            for start in range(len(normalized)):
+                suffixes.append((normalized[start:], idx))
+
+            prefix_keys.append((normalized, RANK_PREFIX, idx))
+            for word in normalized.split()[1:]:
+                prefix_keys.append((word, RANK_WORD_PREFIX, idx))
+
+        suffixes.sort()
+        self._suffixes = [suffix for suffix, _ in suffixes]
+        self._suffix_ids = [idx for _, idx in suffixes]
+
+        prefix_keys.sort()
+        self._prefix_keys = [key for key, _, _ in prefix_keys]
+        self._prefix_entries = [(rank, idx) for _, rank, idx in prefix_keys]
+
+        lat = np.asarray(store.lat)
+        lon = np.asarray(store.lon)
+        valid = ~np.isnan(lat) & ~np.isnan(lon) & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+        self._geo_ids = np.flatnonzero(valid)
+        coords = np.radians(np.column_stack([lat[valid], lon[valid]]))
+        self._geo_tree = BallTree(coords, metric="haversine") if len(coords) else None
+
+    @classmethod
+    def from_json(cls, path: Path = AIRPORTS_JSON) -> "AirportIndex":
+        return cls(AirportStore.from_json(path))
+
+    @classmethod
+    def load(cls, json_path: Path = AIRPORTS_JSON, db_dir: Path = AIRPORTS_DB_DIR) -> "AirportIndex":
+        """Build the index from the memory-mapped store, converting airports.json on first use."""
+        return cls(load_airport_store(json_path, db_dir))
+
+    def __len__(self) -> int:
+        return len(self.airports)
+
+    def search_ids(self, query: str) -> List[int]:
+        """Return ids of airports whose name contains query or whose IATA code equals it, in file order."""
+        needle = normalize(query)
+        if not needle:
+            return []
+
+        matches = set(self._by_iata.get(query.strip().upper(), []))
+
+        pos = bisect_left(self._suffixes, needle)
+        while pos < len(self._suffixes) and self._suffixes[pos].startswith(needle):
+            matches.add(self._suffix_ids[pos])
+            pos += 1
+
+        return sorted(matches)
+
+    def search(self, query: str) -> List[Dict[str, Any]]:
+        return self.airports.records(self.search_ids(query))
+
+    def typeahead(self, query: str, limit: int = 10, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Rank airports for an autocomplete box.
+
+        Order: exact IATA match, then name/IATA prefix match, then word or
+        country-code prefix match; ties are broken by airport size and name.
+
+        Returns:
+            The requested page of airports and the total number of matches
+        """
+        needle = normalize(query).strip()
+        if not needle:
+            return [], 0
+
+        best_rank: Dict[int, int] = {}
+        for idx in self._by_iata.get(needle.upper(), []):
+            best_rank[idx] = RANK_EXACT_IATA
+
+        pos = bisect_left(self._prefix_keys, needle)
+        while pos < len(self._prefix_keys) and self._prefix_keys[pos].startswith(needle):
+            rank, idx = self._prefix_entries[pos]
+            if rank < best_rank.get(idx, rank + 1):
+                best_rank[idx] = rank
+            pos += 1
+
+        ranked = sorted(best_rank, key=lambda idx: (
+            best_rank[idx],
+            self._size_rank[idx],
+            self.airports.names[idx] or "",
+            idx,
+        ))
+        page = ranked[offset:offset + limit]
+        return self.airports.records(page), len(ranked)
+
+    def nearby(self, lat: float, lon: float, radius_km: Optional[float] = None,
+               k: int = 10) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Find the k airports closest to a point (haversine distance).
+
+        Args:
+            lat: Latitude in degrees
+            lon: Longitude in degrees
+            radius_km: Optional search radius; airports further away are skipped
+            k: Maximum number of airports to return
+
+        Returns:
+            (airport, distance_km) pairs, closest first
+        """
+        if self._geo_tree is None:
+            return []
+
+        point = np.radians([[lat, lon]])
+
+        # The k nearest, then the ones beyond the radius dropped: a radius query
+        # would collect and sort every airport in the circle to keep k of them
+        distances, positions = self._geo_tree.query(point, k=min(k, len(self._geo_ids)))
+        distances, positions = distances[0], positions[0]
+        if radius_km is not None:
+            within = distances <= radius_km / EARTH_RADIUS_KM
+            distances, positions = distances[within], positions[within]
+
+        airports = self.airports.records(self._geo_ids[positions])
+        return [(airport, float(dist) * EARTH_RADIUS_KM) for airport, dist in zip(airports, distances)]
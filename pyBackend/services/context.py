@@ -0,0 +1,136 @@
+"""
+Assembly of the retrieved context and conversation for the final completion.
+
+- Retrieved chunks of one file with consecutive chunk_ids overlap (the
+  chunker repeats the end of a chunk at the start of the next one); they
+  are merged into one passage and the shared text is sent once.
+- Passages with the same text, or contained in a passage already packed,
+  are dropped.
+- Passages are packed best-first until the token budget is spent. Tokens
+  are estimated locally with the chunker's count_tokens, no tokenizer call.
+- Conversation turns beyond the history budget are dropped oldest first;
+  the last message and the client's system messages are always kept.
+"""
+
+from typing import Any, Dict, List, Sequence, Tuple
+
+from scripts.chunker import count_tokens
+
+# Per-message overhead of the chat format (role, separators), in tokens
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class Passage:
+    """Consecutive chunks of one file merged into one piece of context."""
+
+    def __init__(self, filename: str, chunk_ids: List[int], words: List[str], score: float):
+        self.filename = filename
+        self.chunk_ids = chunk_ids
+        self.words = words
+        self.score = score
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.words)
+
+    @property
+    def header(self) -> str:
+        first, last = self.chunk_ids[0], self.chunk_ids[-1]
+        chunks = f"chunk {first}" if first == last else f"chunks {first}-{last}"
+        return f"[Source: {self.filename} | {chunks}]"
+
+    def tokens(self) -> int:
+        return count_tokens(self.header) + count_tokens(self.text) + 1
+
+
+def _overlap(left: List[str], right: List[str]) -> int:
+    """Number of words of the longest suffix of `left` that is a prefix of `right`."""
+    for start in range(max(0, len(left) - len(right)), len(left)):
+        if left[start] == right[0] and left[start:] == right[:len(left) - start]:
+            return len(left) - start
+    return 0
+
+
+def merge_chunks(results: Sequence[Dict[str, Any]], documents: Sequence[str]) -> List[Passage]:
+    """
+    Merge search results (search_records) of neighbouring chunks.
+
+    Returns:
+        Passages sorted by their best similarity score
+    """
+    by_file: Dict[str, List[Dict[str, Any]]] = {}
+    for result in results:
+        by_file.setdefault(result["filename"], []).append(result)
+
+    passages = []
+    for filename, file_results in by_file.items():
+        current = None
+        for result in sorted(file_results, key=lambda r: r["chunk_id"]):
+            words = documents[result["index"]].split()
+            if current is not None and result["chunk_id"] == current.chunk_ids[-1] + 1:
+                current.words.extend(words[_overlap(current.words, words):])
+                current.chunk_ids.append(result["chunk_id"])
+                current.score = max(current.score, result["similarity_score"])
+                continue
+            current = Passage(filename, [result["chunk_id"]], words, result["similarity_score"])
+            passages.append(current)
+
+    return sorted(passages, key=lambda passage: passage.score, reverse=True)
+
+
+def pack_passages(passages: Sequence[Passage], max_tokens: int) -> List[Passage]:
+    """
+    Best-first passages that fit in `max_tokens`, duplicates dropped. A first
+    passage longer than the whole budget is cut to it rather than dropped.
+    """
+    packed: List[Passage] = []
+    texts: List[str] = []
+    used = 0
+    for passage in passages:
+        text = passage.text
+        if any(text in other for other in texts):
+            continue
+        tokens = passage.tokens()
+        if used + tokens > max_tokens:
+            if packed:
+                continue
+            budget = max_tokens - count_tokens(passage.header) - 1
+            words, size = [], 0
+            for word in passage.words:
+                size += count_tokens(word) + 1
+                if size > budget:
+                    break
+                words.append(word)
+            passage = Passage(passage.filename, passage.chunk_ids, words, passage.score)
+            text, tokens = passage.text, passage.tokens()
+        packed.append(passage)
+        texts.append(text)
+        used += tokens
+    return packed
+
+
+def trim_history(messages: Sequence[Dict[str, Any]], max_tokens: int) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Drop the oldest user/assistant turns that do not fit in `max_tokens`.
+
+    Returns:
+        The kept messages in their order and the number of dropped ones
+    """
+    keep = [False] * len(messages)
+    used = 0
+    for i in range(len(messages) - 1, -1, -1):
+        tokens = count_tokens(messages[i]["content"]) + MESSAGE_OVERHEAD_TOKENS
+        if i == len(messages) - 1 or messages[i]["role"] == "system":
+            keep[i] = True
+        elif used + tokens <= max_tokens:
+            keep[i] = True
+        else:
+            # Older turns are not kept once one is dropped, so the conversation has no gaps
+            break
+        used += tokens
+    for i in range(len(messages)):
+        if messages[i]["role"] == "system":
+            keep[i] = True
+
+    kept = [message for message, kept_flag in zip(messages, keep) if kept_flag]
+    return kept, len(messages) - len(kept)
@@ -0,0 +1,156 @@
+import asyncio
+import httpx
+import json
+from fastapi import HTTPException
+from services.cache import AsyncTTLCache
+from services.intent import normalize_flight_number
+from typing import Any, Dict, List, Tuple
+
+FLIGHT_DETAILS_SYSTEM_PROMPT = """
+Jesteś systemem informacji lotniskowej.
+
+Użytkownik podaje numer lotu (np. "LO123", "FR4567").
+Twoim zadaniem jest zwrócić szczegółowe informacje o locie.
+
+ZASADY:
+- Jeśli numer lotu wygląda poprawnie, ZAWSZE zwróć dane
+- Dane mogą być symulowane, ale muszą być realistyczne
+- Odpowiadaj WYŁĄCZNIE w formacie JSON
+- Nie dodawaj żadnego tekstu poza JSON
+
+FORMAT JSON:
+{
+  "flightNumber": string,
+  "airline": string,
+  "from": string,
+  "to": string,
+  "departureTime": string,
+  "arrivalTime": string,
+  "gate": string,
+  "terminal": string,
+  "status": "On Time" | "Delayed" | "Boarding" | "Cancelled",
+  "delayMinutes": number | null
+}
+"""
+
+
+class FlightService:
+    """
+    Single entry point for flight data, shared by /chat and the
+    /flight-details endpoints.
+
+    - `details()`: flight details generated by gpt-4o-mini (the
+      /flight-details payload). Upstream failures raise HTTPException(502).
+    - `status()`: live status from aerodatabox, used as chat context.
+      Failures return {}.
+
+    Both are cached per normalized flight number, so 'lo 123' via GET and
+    'LO123' via POST share one cache entry and one upstream call.
+    """
+
+    def __init__(self, openai_api_key: str, rapidapi_key: str,
+                 details_cache: AsyncTTLCache, status_cache: AsyncTTLCache):
+        self.openai_api_key = openai_api_key
+        self.rapidapi_key = rapidapi_key
+        self.details_cache = details_cache
+        self.status_cache = status_cache
+
+    async def details(self, flight_number: str, client: httpx.AsyncClient) -> Dict[str, Any]:
+        flight_number = normalize_flight_number(flight_number)
+        return await self.details_cache.get_or_load(
+            flight_number, lambda: self._fetch_details(flight_number, client)
+        )
+
+    async def details_batch(self, flight_numbers: List[str], client: httpx.AsyncClient,
+                            max_concurrency: int = 5) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Resolve several flight numbers concurrently, at most max_concurrency upstream calls at a time.
+
+        Returns:
+            (flights, errors), both keyed by normalized flight number
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        unique = list(dict.fromkeys(normalize_flight_number(number) for number in flight_numbers))
+
+        async def resolve(flight_number: str):
+            async with semaphore:
+                return await self.details(flight_number, client)
+
+        results = await asyncio.gather(*(resolve(number) for number in unique), return_exceptions=True)
+
+        flights, errors = {}, {}
+        for flight_number, result in zip(unique, results):
+            if isinstance(result, HTTPException):
+                errors[flight_number] = result.detail
+            elif isinstance(result, Exception):
+                errors[flight_number] = str(result)
+            else:
+                flights[flight_number] = result
+        return flights, errors
+
+    async def status(self, flight_number: str, client: httpx.AsyncClient) -> Dict[str, Any]:
+        flight_number = normalize_flight_number(flight_number)
+        return await self.status_cache.get_or_load(
+            flight_number, lambda: self._fetch_status(flight_number, client)
+        )
+
+    async def _fetch_details(self, flight_number: str, client: httpx.AsyncClient) -> Dict[str, Any]:
+        url = "https://api.openai.com/v1/chat/completions"
+        headers = {
+            "Authorization": f"Bearer {self.openai_api_key}",
+            "Content-Type": "application/json",
+        }
+        body = {
+            "model": "gpt-4o-mini",
+            "messages": [
+                {"role": "system", "content": FLIGHT_DETAILS_SYSTEM_PROMPT},
+                {"role": "user", "content": flight_number},
+            ],
+            "temperature": 0.7,
+            "max_tokens": 1024,
+        }
+
+        try:
+            resp = await client.post(url, json=body, headers=headers, timeout=30.0)
+        except httpx.RequestError as e:
+            raise HTTPException(status_code=502, detail=f"Error contacting OpenAI: {e}")
+
+        if resp.status_code != 200:
+            try:
+                detail = resp.json()
+            except Exception:
+                detail = resp.text
+            raise HTTPException(status_code=502, detail={"openai_error": detail})
+
+        data = resp.json()
+
+        # Extract the assistant reply (first choice)
+        try:
+            reply = data["choices"][0]["message"]["content"]
+            return json.loads(reply)
+        except json.JSONDecodeError as e:
+            raise HTTPException(status_code=502, detail=f"Failed to parse flight data from AI response: {e}")
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Error processing flight details: {e}")
+
+    async def _fetch_status(self, flight_number: str, client: httpx.AsyncClient) -> Dict[str, Any]:
+        url = f"https://aerodatabox.p.rapidapi.com/flights/number/{flight_number}"
+
+        headers = {
+            "x-rapidapi-key": self.rapidapi_key,
+            "x-rapidapi-host": "aerodatabox.p.rapidapi.com",
+        }
+
+        params = {
+            "withAircraftImage": False,
+            "withLocation": True,
+            "withFlightPlan": False,
+        }
+
+        resp = await client.get(url, headers=headers, params=params, timeout=20.0)
+
+        if resp.status_code != 200:
+            return {}
+
+        data = resp.json()
+        return data[0] if data else {}
@@ -0,0 +1,78 @@
+import httpx
+import os
+import time
+from fastapi import Request
+from services.metrics import REGISTRY
+
+UPSTREAM_RESPONSES = REGISTRY.counter(
+    "upstream_responses_total", "Responses from upstream APIs by status code", ["upstream", "status"])
+UPSTREAM_SECONDS = REGISTRY.histogram(
+    "upstream_response_seconds", "Time until upstream response headers", ["upstream"])
+
+
+def _http2_available() -> bool:
+    """HTTP/2 in httpx needs the optional `h2` package (httpx[http2])."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _limits(prefix: str, max_connections: int, max_keepalive: int) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=int(os.getenv(f"{prefix}_MAX_CONNECTIONS", max_connections)),
+        max_keepalive_connections=int(os.getenv(f"{prefix}_MAX_KEEPALIVE", max_keepalive)),
+        keepalive_expiry=float(os.getenv(f"{prefix}_KEEPALIVE_EXPIRY", 60.0)),
+    )
+
+
+def _metric_hooks(upstream: str):
+    """httpx event hooks counting status codes and timing requests of one upstream."""
+    async def on_request(request: httpx.Request):
+        request.extensions["metrics_start"] = time.perf_counter()
+
+    async def on_response(response: httpx.Response):
+        UPSTREAM_RESPONSES.inc(upstream=upstream, status=str(response.status_code))
+        start = response.request.extensions.get("metrics_start")
+        if start is not None:
+            UPSTREAM_SECONDS.observe(time.perf_counter() - start, upstream=upstream)
+
+    return {"request": [on_request], "response": [on_response]}
+
+
+class UpstreamClients:
+    """
+    Application-scoped HTTP clients, one connection pool per upstream.
+
+    Created once in the app lifespan (see main.py) so every request reuses
+    warm keep-alive connections instead of paying a new TCP+TLS handshake.
+    Separate pools keep a burst of slow OpenAI completions from starving
+    aerodatabox lookups and vice versa. Per-call timeouts are still passed
+    by the callers. Response status codes and time to response headers are
+    recorded per upstream (upstream_responses_total, upstream_response_seconds).
+    """
+
+    def __init__(self):
+        http2 = _http2_available()
+        self.openai = httpx.AsyncClient(
+            http2=http2,
+            limits=_limits("OPENAI", max_connections=50, max_keepalive=20),
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            event_hooks=_metric_hooks("openai"),
+        )
+        self.aerodatabox = httpx.AsyncClient(
+            http2=http2,
+            limits=_limits("AERODATABOX", max_connections=20, max_keepalive=10),
+            timeout=httpx.Timeout(20.0, connect=5.0),
+            event_hooks=_metric_hooks("aerodatabox"),
+        )
+
+    async def aclose(self):
+        await self.openai.aclose()
+        await self.aerodatabox.aclose()
+
+
+def get_upstream_clients(request: Request) -> UpstreamClients:
+    """FastAPI dependency returning the clients created in the app lifespan."""
+    return request.app.state.http
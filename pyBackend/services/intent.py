@@ -0,0 +1,188 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# IATA airline designator (two characters, at least one a letter, or a
+# three-letter ICAO code) followed by a 1-4 digit flight number: LO123, FR4567, W62215.
+# Matched case-insensitively; extract_flight_number decides which candidates count.
+FLIGHT_NUMBER_RE = re.compile(
+    r"(?i)\b((?:[A-Z]{2}|[A-Z]\d|\d[A-Z])|[A-Z]{3})\s?(\d{1,4}[A-Z]?)\b"
+)
+
+# Aircraft types that look like flight numbers ("A320", "B737")
+AIRCRAFT_TYPE_RE = re.compile(r"^(?:A3\d{2}|B7\d{2})$")
+
+# A number followed by a unit is a quantity, not a flight: "do 8 kg", "na 2 osoby", "to 2 years"
+UNIT_RE = re.compile(
+    r"(?i)\s?(?:%|(?:kg|g|cm|mm|m|l|ml|kilo\w*|lata?|rok\w*|years?|yrs|months?|miesi\w*|dni|days?|tygod\w*|weeks?"
+    r"|h|godz\w*|hours?|min\w*|os\.?|osob\w*|osób|person\w*|people|pax|szt\w*|pcs|pieces?|bags?"
+    r"|baga\w*|walizk\w*|x|zł|pln|eur\w*|usd|€|\$)(?!\w))"
+)
+
+# Words that say the message is about a particular flight
+FLIGHT_CONTEXT_RE = re.compile(
+    r"(?i)\b(?:flight\w*|lot(?:u|em|y|ów|ach)?|rejs\w*|nr|numer\w*|odlot\w*|przylot\w*|departure\w*"
+    r"|arrival\w*|gate|bramk\w*|terminal\w*|status|opóźni\w*|delay\w*|boarding)\b"
+)
+
+# Designators of the airlines users of this app fly with and of the other
+# large European and long-haul carriers (IATA and ICAO)
+AIRLINE_CODES = frozenset("""
+    LO LOT FR RYR RK RUK DLH LH E4 ENT W6 W4 W9 WZZ WMT WAZ U2 EC EJU EZY EZS BA BAW AF AFR KL KLM
+    LX SWR OS AUA SN BEL IB IBE VY VLG UX AEA TP TAP SK SAS AY FIN DY NAX D8 NSZ EW EWG 4U GWI
+    X3 TUI HV TRA TO TVF LS EXS BY TOM A3 AEE OA OAL TK THY PC PGT EK UAE QR QTR EY ETD
+    AA AAL DL DAL UA UAL AC ACA LY ELY SU AFL PS AUI B2 BRU FB LZB RO ROT JU ASL OU CTN
+    JP ADR OK CSA QS TVS BT BTI 0B BMS SM SXS 6H ISR
+""".split())
+
+
+def normalize_flight_number(flight_number: str) -> str:
+    """Uppercase and drop whitespace: ' lo 123 ' -> 'LO123'."""
+    return re.sub(r"\s+", "", flight_number).upper()
+
+
+def has_flight_context(text: str) -> bool:
+    """Whether text talks about a flight (flight, lot, rejs, gate, delay...)."""
+    return FLIGHT_CONTEXT_RE.search(text) is not None
+
+
+def extract_flight_number(text: str) -> Optional[str]:
+    """
+    Return the flight number mentioned in text, normalized, or None.
+
+    A candidate counts when its designator is a known airline code written
+    in capitals ("LO123"), or is written in capitals or is a known code in
+    a message about a flight ("status lotu XY 12", "flight fr 4567").
+    Numbers followed by a unit ("do 8 kg") and aircraft types are skipped.
+    Of several candidates the last one with a known airline code wins,
+    then the last one.
+    """
+    context = None
+    best, best_known = None, False
+    for match in FLIGHT_NUMBER_RE.finditer(text):
+        designator, number = match.group(1), match.group(2)
+        flight_number = (designator + number).upper()
+        if AIRCRAFT_TYPE_RE.match(flight_number) or UNIT_RE.match(text, match.end()):
+            continue
+        known = designator.upper() in AIRLINE_CODES
+        capitals = designator.isupper() or designator.isdigit()
+        if not (known and capitals):
+            if context is None:
+                context = has_flight_context(text)
+            if not (context and (known or capitals)):
+                continue
+        if known or not best_known:
+            best, best_known = flight_number, known
+    return best
+
+
+# Terms & conditions file of each airline and the ways users name the airline.
+# "LOT" only matches in capitals: "lot" is the Polish word for a flight.
+AIRLINE_DOCUMENTS = {
+    "LOT.txt": re.compile(r"\bLOT(?:-?(?:em|u|owi|ie))?\b|(?i:\bpolskie linie lotnicze|\bpll lot\b)"),
+    "LUFTHANSA.txt": re.compile(r"(?i)\blufthans"),
+    "RayanAir.txt": re.compile(r"(?i)\bra?y[ae]?n\s?air"),
+    "EnterAir.txt": re.compile(r"(?i)\benter\s?air"),
+}
+
+
+def extract_airline_documents(text: str) -> List[str]:
+    """Terms & conditions files of the airlines named in text (empty when none is named)."""
+    return [filename for filename, pattern in AIRLINE_DOCUMENTS.items() if pattern.search(text)]
+
+
+# Same tokenization as TfidfVectorizer's default token_pattern
+TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")
+
+
+# Best retrieval similarity that counts as a knowledge-base hit, per retrieval
+# backend: TF-IDF cosine, calibrated BM25 and LSA cosine have different scales.
+# LSA cosine stays around 0.6-0.7 even for off-topic questions, so on dense
+# only strong hits are decided locally and the rest go to the LLM router.
+KB_HIT_SIMILARITY = {"tfidf": 0.15, "bm25": 0.42, "dense": 0.75}
+
+
+class LocalIntentRouter:
+    """
+    Decide the chat intent locally, without the gpt-4o-mini routing call.
+
+    Flight lookups are decided by extract_flight_number. Whether the knowledge
+    base is needed is scored from the TF-IDF index itself: the share of
+    query words that occur in the index vocabulary and the best retrieval
+    similarity. Clear cases come back with high confidence; anything in
+    between gets a low confidence so the caller can fall back to the LLM.
+    """
+
+    def __init__(self, vocabulary, confidence_threshold: float = 0.75,
+                 min_similarity: float = 0.15, min_coverage: float = 0.2):
+        """
+        Args:
+            vocabulary: Terms of the fitted TF-IDF vectorizer (vocabulary_ keys)
+            confidence_threshold: Decisions below this confidence should go to the LLM
+            min_similarity: Best chunk similarity that counts as a knowledge-base hit
+                (KB_HIT_SIMILARITY of the retrieval backend)
+            min_coverage: Share of query words in the vocabulary below which the
+                query is treated as off-topic
+        """
+        self.vocabulary = frozenset(term for term in vocabulary if " " not in term)
+        self.confidence_threshold = confidence_threshold
+        self.min_similarity = min_similarity
+        self.min_coverage = min_coverage
+
+    def coverage(self, text: str) -> float:
+        tokens = TOKEN_RE.findall(text.lower())
+        if not tokens:
+            return 0.0
+        return sum(token in self.vocabulary for token in tokens) / len(tokens)
+
+    def classify(self, text: str, top_similarity: float) -> Tuple[Dict[str, Any], float]:
+        """
+        Args:
+            text: User message
+            top_similarity: Best similarity score of the retrieval for text (0 if none)
+
+        Returns:
+            Intent dict in the classify_user_intent format, and a confidence in [0, 1]
+        """
+        flight_number = extract_flight_number(text)
+        coverage = self.coverage(text)
+
+        if top_similarity >= self.min_similarity:
+            needs_vector_search = True
+            confidence = min(1.0, 0.75 + top_similarity)
+        elif coverage == 0.0 or (coverage < self.min_coverage and top_similarity == 0.0):
+            needs_vector_search = False
+            confidence = 0.9 if coverage == 0.0 else 0.8
+        else:
+            needs_vector_search = top_similarity > 0.0
+            confidence = 0.5
+
+        # A flight number in a message about a flight is reliable. A bare
+        # code-and-number ("LO123 ile kg?") goes to the LLM; without one the
+        # message may still spell the flight out in words, so leave a little
+        # room for the LLM
+        if flight_number:
+            flight_confidence = 0.95 if has_flight_context(text) else 0.5
+        else:
+            flight_confidence = 0.85
+
+        intent = {
+            "needs_vector_search": needs_vector_search,
+            "needs_flight_lookup": flight_number is not None,
+            "flight_number": flight_number,
+        }
+        return intent, min(confidence, flight_confidence)
+
+    def likely_confident(self, text: str) -> bool:
+        """
+        Guess, before the retrieval, whether classify() will be confident, so
+        the caller can start the LLM router alongside the retrieval when not.
+        A flight number outside a message about a flight never is; a message
+        with only a few index words usually lands in the uncertain band.
+        """
+        if not has_flight_context(text) and extract_flight_number(text):
+            return False
+        coverage = self.coverage(text)
+        return coverage == 0.0 or coverage >= self.min_coverage
+
+    def is_confident(self, confidence: float) -> bool:
+        return confidence >= self.confidence_threshold
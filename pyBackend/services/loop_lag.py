@@ -0,0 +1,56 @@
+"""
+Event-loop lag monitor.
+
+A background task sleeps for `interval` seconds in a loop; how much later
+than requested it wakes up is the time the loop was blocked by something
+else (CPU work in a coroutine, a synchronous call in an async endpoint).
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+class LoopLagMonitor:
+    """
+    Samples the event-loop lag every `interval` seconds.
+
+    Args:
+        interval: Seconds between samples
+        window: Number of recent samples kept for the percentiles
+    """
+
+    def __init__(self, interval: float = 0.05, window: int = 1200):
+        self.interval = interval
+        self._samples: deque = deque(maxlen=window)
+        self.max_ms = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, time.perf_counter() - start - self.interval) * 1000
+            self._samples.append(lag_ms)
+            self.max_ms = max(self.max_ms, lag_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        samples = list(self._samples)
+        return {
+            "interval_ms": self.interval * 1000,
+            "samples": len(samples),
+            "last_ms": round(samples[-1], 2) if samples else 0.0,
+            "p50_ms": round(float(np.percentile(samples, 50)), 2) if samples else 0.0,
+            "p99_ms": round(float(np.percentile(samples, 99)), 2) if samples else 0.0,
+            "max_ms": round(self.max_ms, 2),
+        }
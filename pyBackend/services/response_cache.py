@@ -0,0 +1,172 @@
+"""
+Cache of final chat completions for repeated knowledge-base questions.
+
+An entry is keyed on the normalized last user message within a scope: the
+chunk IDs that went into the context, the completion parameters and the
+earlier turns of the conversation. A lookup first tries the exact
+normalized message; with `similarity` below 1 it then accepts the most
+similar cached message of the same scope (cosine of the TF-IDF query
+vectors), so paraphrases that retrieve the same chunks share an answer.
+
+Entries expire after `ttl` seconds and the least recently used ones are
+evicted above `max_bytes`. Every entry belongs to one vector index
+version; the cache is cleared when a different version is seen.
+"""
+
+import re
+import sys
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+WORD_RE = re.compile(r"\w+")
+
+
+def normalize_message(text: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive form of a user message."""
+    return " ".join(WORD_RE.findall(unicodedata.normalize("NFKC", text).casefold()))
+
+
+def _vector_bytes(vector) -> int:
+    if vector is None:
+        return 0
+    return vector.data.nbytes + vector.indices.nbytes + vector.indptr.nbytes
+
+
+class CachedResponse:
+    """One cached completion."""
+
+    def __init__(self, value: Any, vector, size: int):
+        self.value = value
+        self.vector = vector
+        self.size = size
+        self.stored_at = time.monotonic()
+
+
+class ResponseCache:
+    """
+    LRU/TTL cache of chat responses with a byte budget and paraphrase lookup.
+
+    Args:
+        ttl: Seconds an entry is served
+        max_bytes: Least recently used entries are evicted above this (approximate) size
+        similarity: Minimum cosine similarity of query vectors for a paraphrase hit; 1 disables it
+    """
+
+    def __init__(self, ttl: float, max_bytes: int = 16 * 1024 * 1024, similarity: float = 1.0):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.similarity = similarity
+        self.index_version: Optional[str] = None
+        self._entries: "OrderedDict[Tuple[Hashable, str], CachedResponse]" = OrderedDict()
+        self._scopes: Dict[Hashable, Set[str]] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _check_version(self, version: str):
+        if version != self.index_version:
+            if self._entries:
+                self.invalidations += 1
+            self.clear()
+            self.index_version = version
+
+    def lookup(self, version: str, scope: Hashable, message: str, vector=None) -> Tuple[Optional[Any], Optional[str]]:
+        """
+        Return (value, "exact" | "semantic") for a cached answer, or (None, None).
+
+        Args:
+            version: Vector index version the request was answered from
+            scope: Everything besides the message the answer depends on
+            message: Normalized user message (normalize_message)
+            vector: L2-normalized sparse query vector, for the paraphrase lookup
+        """
+        self._check_version(version)
+
+        entry = self._get((scope, message))
+        if entry is not None:
+            self.hits += 1
+            return entry.value, "exact"
+
+        if vector is not None and self.similarity < 1.0:
+            best, best_score = None, self.similarity
+            for other in list(self._scopes.get(scope, ())):
+                candidate = self._get((scope, other))
+                if candidate is None or candidate.vector is None:
+                    continue
+                score = vector.multiply(candidate.vector).sum()
+                if score >= best_score:
+                    best, best_score = candidate, score
+            if best is not None:
+                self.semantic_hits += 1
+                return best.value, "semantic"
+
+        self.misses += 1
+        return None, None
+
+    def store(self, version: str, scope: Hashable, message: str, value: Any, size: int, vector=None):
+        """Cache `value` (`size`: its approximate size in bytes)."""
+        self._check_version(version)
+        key = (scope, message)
+        self._remove(key)
+        entry = CachedResponse(value, vector, size + sys.getsizeof(message) + _vector_bytes(vector))
+        if entry.size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._scopes.setdefault(scope, set()).add(message)
+        self.bytes += entry.size
+        while self.bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _get(self, key: Tuple[Hashable, str]) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.stored_at >= self.ttl:
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _remove(self, key: Tuple[Hashable, str]):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.bytes -= entry.size
+        scope, message = key
+        messages = self._scopes[scope]
+        messages.discard(message)
+        if not messages:
+            del self._scopes[scope]
+
+    def clear(self):
+        self._entries.clear()
+        self._scopes.clear()
+        self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.semantic_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "index_version": self.index_version,
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "hit_ratio": round((self.hits + self.semantic_hits) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,179 @@
+"""
+Executor-backed retrieval: vector searches run off the event loop in a
+dedicated pool with bounded queueing.
+
+- "thread" (default): a small thread pool. The sparse/dense products in
+  NumPy/SciPy release the GIL, and the GIL switch interval keeps the event
+  loop responsive during the Python parts (query tokenization).
+- "process": a spawn-started process pool for large indexes, where the
+  Python parts of scoring would still compete with the loop for the GIL.
+  Each worker memory-maps the same vectors_db and keeps it loaded per
+  index version; a call for a version the worker cannot load (the DB on
+  disk changed before this process swapped it in) falls back to the
+  thread pool, which searches the in-process index.
+
+At most `max_workers + max_queue` searches are admitted at once; callers
+beyond that get RetrievalOverloaded instead of an unbounded backlog. A
+search holds its slot until the pool is done with it, also when the
+request that awaited it was cancelled meanwhile.
+"""
+
+import asyncio
+import contextlib
+import io
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from scripts.vektorizer import DocumentVectorizer, index_version
+
+EXECUTORS = ("thread", "process")
+
+# Index loaded in a process-pool worker: (index version, DocumentVectorizer)
+_worker_index: Optional[Tuple[str, DocumentVectorizer]] = None
+
+
+class RetrievalOverloaded(Exception):
+    """All workers are busy and the queue is full."""
+
+
+class StaleIndexError(Exception):
+    """A process worker could not load the index version it was asked for."""
+
+
+def _timed_call(fn: Callable, *args) -> Tuple[Any, float, float]:
+    # Start/end are taken inside the worker so queue wait and run time can be told apart
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, started, time.perf_counter()
+
+
+def _search_in_worker(vectors_dir: str, backend: str, min_similarity: float, version: str,
+                      dense_params: Optional[Tuple[int, int]], method: str, *args) -> Any:
+    """Run `method` on the index loaded in this worker process (loaded once per version)."""
+    global _worker_index
+    if _worker_index is None or _worker_index[0] != version:
+        # Reading the manifest hash is cheap; loading a DB that is then rejected is not
+        on_disk = index_version(vectors_dir)
+        if on_disk != version:
+            raise StaleIndexError(f"index on disk is {on_disk}, requested {version}")
+        db = DocumentVectorizer(backend=backend, min_similarity=min_similarity)
+        with contextlib.redirect_stdout(io.StringIO()):
+            db.load(vectors_dir)
+            if db.index_version != version:
+                raise StaleIndexError(f"index on disk is {db.index_version}, requested {version}")
+            if db.dense is not None and dense_params is not None:
+                db.dense.nprobe, db.dense.rerank = dense_params
+            db.warm_up()
+        _worker_index = (version, db)
+    return getattr(_worker_index[1], method)(*args)
+
+
+def _percentile(samples, q: float) -> float:
+    return round(float(np.percentile(samples, q)), 2) if samples else 0.0
+
+
+class RetrievalService:
+    """
+    Bounded executor for DocumentVectorizer searches.
+
+    Args:
+        max_workers: Threads or processes running searches
+        max_queue: Searches allowed to wait for a worker; beyond that RetrievalOverloaded is raised
+        executor: "thread" or "process"
+        window: Number of recent calls kept for the latency percentiles
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 32, executor: str = "thread", window: int = 1000):
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown retrieval executor: {executor} (expected one of {', '.join(EXECUTORS)})")
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor = executor
+        self._threads = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="retrieval")
+        self._processes = (
+            ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+            if executor == "process" else None
+        )
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.errors = 0
+        self.stale_fallbacks = 0
+        # Index version the process workers could not load: its searches go to the threads
+        self._stale_version: Optional[str] = None
+        self._queue_ms: deque = deque(maxlen=window)
+        self._run_ms: deque = deque(maxlen=window)
+
+    def _release(self, future: Future):
+        with self._in_flight_lock:
+            self._in_flight -= 1
+
+    def _submit(self, executor: Executor, call: Callable) -> "asyncio.Future":
+        # The slot is released when the pool finishes (or drops) the call, not
+        # when the awaiting coroutine goes away: a cancelled await leaves the
+        # search running in its worker
+        future = executor.submit(call)
+        with self._in_flight_lock:
+            self._in_flight += 1
+        future.add_done_callback(self._release)
+        return asyncio.wrap_future(future)
+
+    async def search(self, db: DocumentVectorizer, method: str, *args) -> Any:
+        """Run `db.<method>(*args)` (search_records, search_batch, top_k...) in the pool."""
+        if self._in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise RetrievalOverloaded(f"{self._in_flight} searches in flight")
+
+        submitted = time.perf_counter()
+        thread_call = partial(_timed_call, getattr(db, method), *args)
+        try:
+            if self._processes is None or db.vectors_dir is None:
+                result, started, finished = await self._submit(self._threads, thread_call)
+            elif db.index_version == self._stale_version:
+                self.stale_fallbacks += 1
+                result, started, finished = await self._submit(self._threads, thread_call)
+            else:
+                dense = (db.dense.nprobe, db.dense.rerank) if db.dense is not None else None
+                call = partial(_timed_call, _search_in_worker, str(db.vectors_dir), db.backend,
+                               db.min_similarity, db.index_version, dense, method, *args)
+                try:
+                    result, started, finished = await self._submit(self._processes, call)
+                except StaleIndexError:
+                    self._stale_version = db.index_version
+                    self.stale_fallbacks += 1
+                    result, started, finished = await self._submit(self._threads, thread_call)
+        except Exception:
+            self.errors += 1
+            raise
+
+        self.completed += 1
+        self._queue_ms.append(max(0.0, started - submitted) * 1000)
+        self._run_ms.append((finished - started) * 1000)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "executor": self.executor,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "stale_fallbacks": self.stale_fallbacks,
+            "queue_wait_ms": {"p50": _percentile(self._queue_ms, 50), "p99": _percentile(self._queue_ms, 99)},
+            "run_ms": {"p50": _percentile(self._run_ms, 50), "p99": _percentile(self._run_ms, 99)},
+        }
+
+    def shutdown(self):
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,65 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class StageTimer:
+    """
+    Collect wall-clock durations (ms) of named pipeline stages for one request.
+
+    Stages may overlap when they run concurrently, so the sum of stages can
+    exceed `elapsed_ms()`; the difference is the time saved by parallelism.
+    Marks are points in time since the request started (e.g. time to first
+    token) and are reported but not counted as stages.
+
+    `observer`, when given, is called with (stage, ms) as each stage ends,
+    e.g. to feed a metrics histogram. Cancelled stages are not recorded.
+    """
+
+    def __init__(self, observer: Optional[Callable[[str, float], None]] = None):
+        self._start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.marks: Dict[str, float] = {}
+        self.observer = observer
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        cancelled = False
+        try:
+            yield
+        except asyncio.CancelledError:
+            # A cancelled speculative call never finished; it is not a stage
+            cancelled = True
+            raise
+        finally:
+            if not cancelled:
+                self.record(name, (time.perf_counter() - start) * 1000)
+
+    def record(self, name: str, ms: float):
+        """Record a stage measured by the caller."""
+        self.stages[name] = ms
+        if self.observer is not None:
+            self.observer(name, ms)
+
+    async def timed(self, name: str, awaitable: Awaitable[T]) -> T:
+        with self.stage(name):
+            return await awaitable
+
+    def mark(self, name: str):
+        """Record the elapsed time under name, once."""
+        self.marks.setdefault(name, self.elapsed_ms())
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    def summary(self) -> Dict[str, float]:
+        total = self.elapsed_ms()
+        summary = {name: round(ms, 2) for name, ms in self.stages.items()}
+        summary.update({name: round(ms, 2) for name, ms in self.marks.items()})
+        summary["total"] = round(total, 2)
+        summary["saved_by_parallelism"] = round(max(0.0, sum(self.stages.values()) - total), 2)
+        return summary
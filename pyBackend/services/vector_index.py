@@ -0,0 +1,159 @@
+"""
+Hot-swappable holder for the loaded vector DB.
+
+Requests take a lease on the active index version for as long as they use
+it (`with manager.acquire() as index:`). `reload()` loads and warms a new
+version next to the active one, swaps the reference in one step and
+retires the old version; a retired version is released once its last
+lease ends, so in-flight requests finish on the index they started with.
+
+Reloads are triggered explicitly (admin endpoint) or by `watch()`, which
+polls the on-disk version (the manifest digest) of the vectors_db directory.
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class IndexVersion:
+    """One loaded index version and its lease count."""
+
+    def __init__(self, version: str, value: Any, load_ms: float):
+        self.version = version
+        self.value = value
+        self.load_ms = load_ms
+        self.loaded_at = time.time()
+        self.readers = 0
+        self.retired = False
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "load_ms": round(self.load_ms, 2),
+            "readers": self.readers,
+        }
+
+
+class VectorIndexManager:
+    """
+    Atomic swap of index versions with reader leases.
+
+    Args:
+        loader: Loads and warms a version, returns (version id, value); runs in a worker thread on reload
+        probe: Cheap check of the on-disk version id (None while no complete index is on disk)
+        on_release: Called with the value of a retired version once its last reader is done
+    """
+
+    def __init__(self, loader: Callable[[], Tuple[str, Any]], probe: Callable[[], Optional[str]],
+                 on_release: Optional[Callable[[Any], None]] = None):
+        self.loader = loader
+        self.probe = probe
+        self.on_release = on_release
+        self._active: Optional[IndexVersion] = None
+        self._draining: List[IndexVersion] = []
+        # Guards the active reference and the lease counters (acquired from the loop and from threads)
+        self._lock = threading.Lock()
+        # One reload at a time
+        self._reload_lock = threading.Lock()
+        self.reloads = 0
+        self.reload_errors = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._active.version if self._active is not None else None
+
+    def load(self) -> IndexVersion:
+        """Initial (blocking) load; raises when the index cannot be loaded."""
+        with self._reload_lock:
+            return self._swap(self._load())
+
+    def _load(self) -> IndexVersion:
+        start = time.perf_counter()
+        version, value = self.loader()
+        return IndexVersion(version, value, (time.perf_counter() - start) * 1000)
+
+    def _swap(self, new: IndexVersion) -> IndexVersion:
+        with self._lock:
+            old, self._active = self._active, new
+            if old is not None:
+                old.retired = True
+                self._draining.append(old)
+        self._release_idle()
+        return new
+
+    @contextmanager
+    def acquire(self) -> Iterator[Any]:
+        """Lease the active version for the duration of the block."""
+        with self._lock:
+            if self._active is None:
+                raise RuntimeError("Vector index is not loaded")
+            held = self._active
+            held.readers += 1
+        try:
+            yield held.value
+        finally:
+            with self._lock:
+                held.readers -= 1
+            if held.retired:
+                self._release_idle()
+
+    def _release_idle(self):
+        with self._lock:
+            idle = [held for held in self._draining if held.readers == 0]
+            self._draining = [held for held in self._draining if held.readers > 0]
+        for held in idle:
+            if self.on_release is not None:
+                self.on_release(held.value)
+            held.value = None
+
+    def reload(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Load the on-disk index and swap it in (blocking; run it in a worker thread).
+
+        Without `force` nothing is loaded when the on-disk version is the
+        active one. A failed load keeps the active version.
+        """
+        with self._reload_lock:
+            previous = self.version
+            if not force and self.probe() == previous:
+                return {"reloaded": False, "version": previous}
+            try:
+                new = self._load()
+            except Exception as e:
+                self.reload_errors += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                raise
+            self._swap(new)
+            self.reloads += 1
+            self.last_error = None
+            return {"reloaded": True, "version": new.version, "previous_version": previous,
+                    "load_ms": round(new.load_ms, 2)}
+
+    async def watch(self, interval: float):
+        """Poll the on-disk version every `interval` seconds and reload when it changes."""
+        while True:
+            await asyncio.sleep(interval)
+            on_disk = self.probe()
+            if on_disk is None or on_disk == self.version:
+                continue
+            try:
+                result = await asyncio.to_thread(self.reload)
+                if result["reloaded"]:
+                    print(f"🔄 Vector DB reloaded: {result['previous_version']} -> {result['version']}")
+            except Exception as e:
+                print(f"⚠️ Vector DB reload failed, keeping {self.version}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "active": self._active.info() if self._active is not None else None,
+                "draining": [held.info() for held in self._draining],
+                "reloads": self.reloads,
+                "reload_errors": self.reload_errors,
+                "last_error": self.last_error,
+            }
@@ -0,0 +1,68 @@
+"""
+Shared fixtures: the app with its upstream clients replaced by an
+httpx.MockTransport, so tests make no network calls. Every upstream
+request is recorded in `upstream.calls`.
+"""
+
+import json
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("XRAPID_KEY", "test")
+# Cached answers would hide the upstream calls the tests count
+os.environ["CHAT_CACHE_TTL"] = "0"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+
+
+class FakeUpstream:
+    """OpenAI and aerodatabox stand-in answering every request with canned JSON."""
+
+    def __init__(self):
+        self.calls = []
+        self.intent_calls = 0
+        # Body of streamed completions (/chat/stream) and its status code
+        self.stream_body = b'data: {"choices": [{"delta": {"content": "ok"}}]}\n\ndata: [DONE]\n\n'
+        self.stream_status = 200
+
+    def aerodatabox_calls(self):
+        return [url for url in self.calls if "aerodatabox" in url]
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls.append(str(request.url))
+        if "aerodatabox" in request.url.host:
+            number = request.url.path.rsplit("/", 1)[-1]
+            return httpx.Response(200, json=[{"number": number, "status": "Expected"}])
+
+        body = json.loads(request.content)
+        system = body["messages"][0]["content"]
+        if "routing assistant" in system:
+            self.intent_calls += 1
+            content = json.dumps({"needs_vector_search": True, "needs_flight_lookup": False, "flight_number": None})
+        elif body.get("stream"):
+            return httpx.Response(self.stream_status, content=self.stream_body,
+                                  headers={"content-type": "text/event-stream"})
+        else:
+            content = "ok"
+        return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+
+@pytest.fixture
+def upstream():
+    return FakeUpstream()
+
+
+@pytest.fixture
+def client(upstream):
+    with TestClient(main.app) as test_client:
+        transport = httpx.MockTransport(upstream)
+        main.app.state.http.openai = httpx.AsyncClient(transport=transport)
+        main.app.state.http.aerodatabox = httpx.AsyncClient(transport=transport)
+        yield test_client
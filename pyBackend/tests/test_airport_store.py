@@ -0,0 +1,26 @@
+import json
+
+from services.airport_store import AirportStore, load_airport_store
+
+
+def _write_airports(path, names, prefix):
+    airports = [{"iata": f"{prefix}{i:02d}", "name": name, "lat": "52.1", "lon": "20.9", "iso": "PL",
+                 "status": 1, "continent": "EU", "type": "airport", "size": "large"}
+                for i, name in enumerate(names)]
+    path.write_text(json.dumps(airports), encoding="utf-8")
+
+
+def test_reconvert_leaves_mapped_columns_intact(tmp_path):
+    json_path, db_dir = tmp_path / "airports.json", tmp_path / "airports_db"
+    _write_airports(json_path, ["Chopin", "Modlin"], "A")
+    old = load_airport_store(json_path, db_dir)
+
+    _write_airports(json_path, ["Balice", "Pyrzowice", "Ławica"], "B")
+    new = load_airport_store(json_path, db_dir)
+
+    assert [old[i]["name"] for i in range(len(old))] == ["Chopin", "Modlin"]
+    assert old.iata.tolist() == ["A00", "A01"]
+    assert [new[i]["name"] for i in range(len(new))] == ["Balice", "Pyrzowice", "Ławica"]
+    assert new.iata.tolist() == ["B00", "B01", "B02"]
+    assert AirportStore.is_current(json_path, db_dir)
+    assert sorted(p.name for p in db_dir.iterdir() if p.is_dir()) == []
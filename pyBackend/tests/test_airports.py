@@ -0,0 +1,13 @@
+def _nearby(client, **params):
+    response = client.get("/api/openai/airports/nearby", params={"lat": 52.17, "lon": 20.97, **params})
+    assert response.status_code == 200
+    return [airport["distance_km"] for airport in response.json()["airports"]]
+
+
+def test_nearby_radius_keeps_the_k_closest_within_it(client):
+    closest = _nearby(client, k=20)
+    assert closest == sorted(closest)
+
+    radius = (closest[4] + closest[5]) / 2
+    assert _nearby(client, k=20, radius_km=radius) == closest[:5]
+    assert _nearby(client, k=3, radius_km=radius) == closest[:3]
@@ -0,0 +1,16 @@
+import pytest
+
+
+@pytest.mark.parametrize("path, field, limit", [
+    ("/api/openai/flight-details/batch", "flight_numbers", 50),
+    ("/api/openai/search/batch", "queries", 5000),
+])
+def test_empty_and_oversized_batches_are_rejected(client, upstream, path, field, limit):
+    assert client.post(path, json={field: []}).status_code == 422
+    assert client.post(path, json={field: ["LO123"] * (limit + 1)}).status_code == 422
+    assert upstream.calls == []
+
+
+def test_message_role_is_validated(client):
+    response = client.post("/api/openai/chat", json={"messages": [{"role": "robot", "content": "hi"}]})
+    assert response.status_code == 422
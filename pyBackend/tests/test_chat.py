@@ -0,0 +1,35 @@
+import pytest
+
+
+def _chat(client, text):
+    response = client.post("/api/openai/chat", json={"messages": [{"role": "user", "content": text}]})
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.parametrize("text", [
+    "Can I take a bag of 10 kg?",
+    "Can I take a bag of 10 kg on LO123?",
+    "Czy mogę zabrać bagaż podręczny do 8 kg w LOT?",
+])
+def test_no_flight_lookup_for_baggage_questions(client, upstream, text):
+    _chat(client, text)
+    assert upstream.aerodatabox_calls() == []
+
+
+def test_flight_question_looks_the_flight_up(client, upstream):
+    _chat(client, "Jaki jest status lotu LO123?")
+    assert len(upstream.aerodatabox_calls()) == 1
+    assert "/flights/number/LO123?" in upstream.aerodatabox_calls()[0]
+
+
+def test_confident_local_intent_skips_the_router_llm(client, upstream):
+    body = _chat(client, "Jaki jest status lotu LO123?")
+    assert upstream.intent_calls == 0
+    assert "intent" not in body["timings"]
+
+
+def test_unsure_local_intent_asks_the_router_llm(client, upstream):
+    body = _chat(client, "Can I take a bag of 10 kg on LO123?")
+    assert upstream.intent_calls == 1
+    assert "intent" in body["timings"]
@@ -0,0 +1,37 @@
+import json
+
+
+def _events(client, text):
+    response = client.post("/api/openai/chat/stream", json={"messages": [{"role": "user", "content": text}]})
+    assert response.status_code == 200
+    events = []
+    for raw in response.text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in raw.split("\n"))
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_invalid_upstream_lines_are_skipped(client, upstream):
+    upstream.stream_body = (
+        b'data: {"choices": [{"delta": {"content": "Hel"}}]}\n\n'
+        b'data: {"choices": [{"delta": \n\n'
+        b'data: {"choices": [{"delta": {"content": "lo"}}]}\n\n'
+        b'data: [DONE]\n\n'
+    )
+    events = _events(client, "Streaming test: invalid lines")
+    assert "".join(data["content"] for name, data in events if name == "token") == "Hello"
+    assert events[-1][0] == "done"
+
+
+def test_upstream_failure_is_an_error_event(client, upstream):
+    upstream.stream_status = 500
+    upstream.stream_body = b'{"error": {"message": "boom"}}'
+    events = _events(client, "Streaming test: upstream failure")
+    assert events[-1][0] == "error"
+    assert events[-1][1]["status_code"] == 500
+
+
+def test_error_inside_the_stream_is_an_error_event(client, upstream):
+    upstream.stream_body = b'data: {"error": {"message": "overloaded"}}\n\n'
+    events = _events(client, "Streaming test: error chunk")
+    assert events[-1] == ("error", {"detail": {"message": "overloaded"}})
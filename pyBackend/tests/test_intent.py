@@ -0,0 +1,59 @@
+import pytest
+
+from services.intent import LocalIntentRouter, extract_flight_number
+
+
+@pytest.mark.parametrize("text", [
+    "Czy mogę zabrać bagaż podręczny do 8 kg w LOT?",
+    "Jaki jest limit bagażu na 2 osoby",
+    "Is there a fee for 23 kg?",
+    "Children up to 2 years fly free",
+    "Czy lot na 2 dni wymaga wizy?",
+    "Can I take an A320 seat map?",
+])
+def test_quantities_are_not_flight_numbers(text):
+    assert extract_flight_number(text) is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Can I take a bag of 10 kg on LO123?", "LO123"),
+    ("Status lotu LO 123", "LO123"),
+    ("flight fr 4567 delayed?", "FR4567"),
+    ("Gdzie jest W6 2215?", "W62215"),
+    ("my flight XY12 is late", "XY12"),
+    ("LO123 czy FR4567?", "FR4567"),
+])
+def test_flight_numbers(text, expected):
+    assert extract_flight_number(text) == expected
+
+
+@pytest.fixture
+def router():
+    return LocalIntentRouter(["bagaż", "limit", "podręczny"])
+
+
+@pytest.mark.parametrize("text", [
+    "Czy mogę zabrać bagaż podręczny do 8 kg w LOT?",
+    "Jaki jest limit bagażu na 2 osoby",
+])
+def test_quantities_do_not_trigger_a_flight_lookup(router, text):
+    intent, _ = router.classify(text, top_similarity=0.4)
+    assert not intent["needs_flight_lookup"]
+
+
+def test_flight_number_with_flight_context_is_confident(router):
+    intent, confidence = router.classify("Jaki jest status lotu LO123?", top_similarity=0.0)
+    assert intent["flight_number"] == "LO123"
+    assert router.is_confident(confidence)
+
+
+def test_flight_number_without_flight_context_goes_to_the_llm(router):
+    intent, confidence = router.classify("Can I take a bag of 10 kg on LO123?", top_similarity=0.4)
+    assert intent["flight_number"] == "LO123"
+    assert not router.is_confident(confidence)
+
+
+def test_likely_confident(router):
+    assert router.likely_confident("Jaki jest status lotu LO123?")
+    assert router.likely_confident("Jaki jest limit bagażu podręczny?")
+    assert not router.likely_confident("Can I take a bag of 10 kg on LO123?")
@@ -0,0 +1,98 @@
+import asyncio
+import contextlib
+import io
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from scripts.vektorizer import DocumentVectorizer
+from services import retrieval
+from services.retrieval import RetrievalOverloaded, RetrievalService, StaleIndexError
+
+VECTORS_DB_DIR = Path(__file__).parent.parent / "scripts" / "vectors_db"
+
+
+class SlowIndex:
+    vectors_dir = None
+
+    def wait(self, seconds):
+        time.sleep(seconds)
+        return seconds
+
+
+def test_cancelled_search_keeps_its_slot_until_the_worker_finishes():
+    async def scenario():
+        service = RetrievalService(max_workers=1, max_queue=0)
+        try:
+            task = asyncio.create_task(service.search(SlowIndex(), "wait", 0.3))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            await asyncio.sleep(0.01)
+            assert service.stats()["in_flight"] == 1
+            with pytest.raises(RetrievalOverloaded):
+                await service.search(SlowIndex(), "wait", 0.0)
+
+            await asyncio.sleep(0.4)
+            assert service.stats()["in_flight"] == 0
+            assert await service.search(SlowIndex(), "wait", 0.0) == 0.0
+        finally:
+            service.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_retrieval_pool_is_recreated_when_the_app_restarts():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    for _ in range(2):
+        with TestClient(main.app) as client:
+            response = client.post("/api/openai/search/batch", json={"queries": ["bagaż podręczny"]})
+            assert response.status_code == 200
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    """Thread pool standing in for the process pool, counting the calls it gets."""
+
+    def __init__(self):
+        super().__init__(max_workers=1)
+        self.submitted = 0
+
+    def submit(self, fn, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(fn, *args, **kwargs)
+
+
+def test_stale_index_version_falls_back_without_reloading(tmp_path):
+    vectors_dir = tmp_path / "vectors_db"
+    shutil.copytree(VECTORS_DB_DIR, vectors_dir)
+    db = DocumentVectorizer()
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.load(vectors_dir)
+    # The DB on disk changes before this process swaps it in
+    manifest = vectors_dir / "manifest.json"
+    manifest.write_text(manifest.read_text(encoding="utf-8") + "\n", encoding="utf-8")
+
+    with pytest.raises(StaleIndexError):
+        retrieval._search_in_worker(str(vectors_dir), db.backend, db.min_similarity, db.index_version, None,
+                                     "top_k", "bagaż", 3)
+    assert retrieval._worker_index is None
+
+    async def scenario():
+        service = RetrievalService(max_workers=1, max_queue=4)
+        service._processes = CountingExecutor()
+        try:
+            first = await service.search(db, "search_records", "bagaż podręczny", 3)
+            second = await service.search(db, "search_records", "bagaż podręczny", 3)
+        finally:
+            service._processes.shutdown()
+            service.shutdown()
+        assert first == second and first
+        assert service._processes.submitted == 1
+        assert service.stats()["stale_fallbacks"] == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,92 @@
+import contextlib
+import io
+
+import pytest
+
+import routers.openai as openai_router
+from scripts.vektorizer import DocumentVectorizer
+
+OFF_TOPIC = ["What is the weather in Paris today?", "Jaka jest dziś pogoda w Krakowie?"]
+ON_TOPIC = "jaki jest limit bagażu podręcznego w LOT"
+
+
+@pytest.fixture(scope="module")
+def bm25_index():
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(openai_router, "RETRIEVAL_BACKEND", "bm25")
+        _, index = openai_router._load_retrieval_index()
+    return index
+
+
+@pytest.fixture(scope="module")
+def dense_index():
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(openai_router, "RETRIEVAL_BACKEND", "dense")
+        _, index = openai_router._load_retrieval_index()
+    return index
+
+
+def _route(index, text):
+    results = index.db.search_records(text, 5)
+    top_similarity = results[0]["similarity_score"] if results else 0.0
+    return index.intent_router.classify(text, top_similarity)
+
+
+@pytest.mark.parametrize("text", OFF_TOPIC)
+def test_bm25_off_topic_query_is_not_a_confident_kb_hit(bm25_index, text):
+    intent, confidence = _route(bm25_index, text)
+    assert not (intent["needs_vector_search"] and bm25_index.intent_router.is_confident(confidence))
+
+
+def test_bm25_on_topic_query_is_a_confident_kb_hit(bm25_index):
+    intent, confidence = _route(bm25_index, ON_TOPIC)
+    assert intent["needs_vector_search"] and bm25_index.intent_router.is_confident(confidence)
+
+
+def test_bm25_weak_matches_score_low(bm25_index):
+    # Scores used to be divided by the query's own maximum, so one matched term scored 1.0
+    scores = bm25_index.db.top_k(OFF_TOPIC[0], 5, min_score=0.0)[1]
+    assert len(scores) and scores.max() < 0.4
+
+
+@pytest.mark.parametrize("text", OFF_TOPIC)
+def test_dense_off_topic_query_is_not_a_confident_kb_hit(dense_index, text):
+    # LSA cosine of an unrelated question is still ~0.7, above the TF-IDF thresholds
+    intent, confidence = _route(dense_index, text)
+    assert not (intent["needs_vector_search"] and dense_index.intent_router.is_confident(confidence))
+
+
+def test_intent_threshold_env_override(monkeypatch):
+    monkeypatch.setattr(openai_router, "RETRIEVAL_BACKEND", "dense")
+    monkeypatch.setattr(openai_router, "RETRIEVAL_MIN_SIMILARITY", "0.5")
+    monkeypatch.setattr(openai_router, "INTENT_MIN_SIMILARITY", "0.9")
+    _, index = openai_router._load_retrieval_index()
+    assert index.db.min_similarity == 0.5
+    assert index.intent_router.min_similarity == 0.9
+
+
+def test_bm25_file_filter_finds_chunks_ranked_below_the_overfetch_window(tmp_path):
+    # 40 short files match the query better than the one long file being filtered for
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    for i in range(40):
+        (docs_dir / f"noise_{i:02d}.txt").write_text(f"Limit bagażu numer {i}: bagaż podręczny.", encoding="utf-8")
+    (docs_dir / "target.txt").write_text("Regulamin przewozu. " * 20 + "Limit bagażu rejestrowanego.", encoding="utf-8")
+    db = DocumentVectorizer(backend="bm25")
+    with contextlib.redirect_stdout(io.StringIO()):
+        builder = DocumentVectorizer(backend="bm25")
+        builder.load_documents(docs_dir)
+        builder.vectorize()
+        builder.save(tmp_path / "vectors_db")
+        db.load(tmp_path / "vectors_db")
+
+    top_k = 3
+    start, stop = db.file_ranges()["target.txt"]
+    ranked, _ = db.top_k("limit bagażu", len(db.documents), min_score=0.0)
+    target_ranks = [rank for rank, row in enumerate(ranked) if start <= row < stop]
+    assert target_ranks and target_ranks[0] >= top_k * 10
+
+    indices, scores = db.top_k("limit bagażu", top_k, min_score=0.0, files=["target.txt"])
+    expected = db._bm25_index().scores("limit bagażu")[start:stop]
+    assert len(indices) and all(start <= row < stop for row in indices)
+    assert scores[0] == pytest.approx(db._bm25_similarity(expected.max()))
@@ -1,6 +1,6 @@
-import React, { useEffect, useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import { useLocation } from "react-router";
-import { getChatResponse } from "../services/openai.js";
+import { streamChatResponse } from "../services/openai.js";
 import Text from "../components/Inputs/Text.jsx";
 import Primary from "../components/Buttons/Primary.jsx";
 
@@ -8,22 +8,61 @@ const Chat = () => {
   const location = useLocation();
   const [response, setResponse] = useState(null);
   const [loading, setLoading] = useState(true);
+  const streamController = useRef(null);
+
+  // Keeps whatever was streamed so far and shows the error below it
+  const showError = (detail) => {
+    setLoading(false);
+    setResponse((previous) => ({
+      reply: "",
+      sources: [],
+      ...previous,
+      error:
+        typeof detail === "string" && detail
+          ? `Something went wrong: ${detail}`
+          : "Something went wrong while answering. Please try again.",
+    }));
+  };
+
+  const streamAnswer = (question) => {
+    // Cancel the previous answer, the backend stops its completion as well
+    streamController.current?.abort();
+    const controller = new AbortController();
+    streamController.current = controller;
+
+    setLoading(true);
+    setResponse(null);
+    streamChatResponse(question, {
+      signal: controller.signal,
+      onSources: (sources) => {
+        setResponse({ reply: "", sources });
+      },
+      onToken: (_, reply) => {
+        setLoading(false);
+        setResponse((previous) => ({ ...previous, reply }));
+      },
+      onError: (error) => {
+        console.error("Error streaming chat response:", error);
+        showError(error?.detail?.message ?? error?.detail);
+      },
+    })
+      .catch((error) => {
+        if (error.name === "AbortError") return;
+        console.error("Error fetching chat response:", error);
+        showError(error.message);
+      })
+      .finally(() => {
+        if (streamController.current === controller) {
+          setLoading(false);
+        }
+      });
+  };
 
   useEffect(() => {
     if (location.state?.chatInput) {
-      setLoading(true);
-      getChatResponse(location.state.chatInput)
-        .then((result) => {
-          setResponse(result);
-        })
-        .catch((error) => {
-          console.error("Error fetching chat response:", error);
-          setResponse(null);
-        })
-        .finally(() => {
-          setLoading(false);
-        });
+      streamAnswer(location.state.chatInput);
     }
+    return () => streamController.current?.abort();
   }, [location.state?.chatInput]);
 
   const handleChatInput = (e) => {
@@ -34,17 +73,7 @@ const Chat = () => {
   const [chatInput, setChatInput] = useState("");
 
   const askQuestion = () => {
-    setLoading(true);
-    setResponse(null);
-    getChatResponse(chatInput)
-      .then((result) => {
-        setResponse(result);
-      })
-      .catch((error) => {
-        console.error("Error fetching chat response:", error);
-        setResponse(null);
-      })
-      .finally(setLoading(false));
+    streamAnswer(chatInput);
   };
 
   return (
@@ -62,9 +91,14 @@ const Chat = () => {
                   Assistant
                 </p>
                 <pre className="whitespace-pre-wrap text-sm text-gray-800">
-                  {JSON.stringify(response.reply, null, 2)}
+                  {response.reply}
                 </pre>
               </div>
+              {response.error && (
+                <p className="rounded-xl bg-red-50 p-4 text-sm text-red-700">
+                  {response.error}
+                </p>
+              )}
               <div className="space-y-3 border-t pt-4">
                 <Text
                   placeholder="Ask another question"
@@ -201,6 +201,45 @@ export const getAirPortInformation = async (airportName) => {
 */
 };
 
+export const getAirportSuggestions = async (query, limit = 10, offset = 0) => {
+  try {
+    const result = await axios.get(
+      "http://127.0.0.1:8000/api/openai/airports/typeahead",
+      {
+        params: {
+          q: query,
+          limit: limit,
+          offset: offset,
+        },
+      }
+    );
+
+    return result.data;
+  } catch (error) {
+    console.error("Error calling airports typeahead API:", error);
+    throw error;
+  }
+};
+export const getNearbyAirports = async (lat, lon, radiusKm = null, k = 10) => {
+  try {
+    const result = await axios.get(
+      "http://127.0.0.1:8000/api/openai/airports/nearby",
+      {
+        params: {
+          lat: lat,
+          lon: lon,
+          k: k,
+          ...(radiusKm !== null && { radius_km: radiusKm }),
+        },
+      }
+    );
+
+    return result.data;
+  } catch (error) {
+    console.error("Error calling nearby airports API:", error);
+    throw error;
+  }
+};
 
 export const getChatResponse = async (chatInput) => {
   try {
@@ -223,6 +262,73 @@ export const getChatResponse = async (chatInput) => {
   }
 
 };
+const parseSSEEvent = (rawEvent) => {
+  let event = "message";
+  const dataLines = [];
+
+  for (const line of rawEvent.split("\n")) {
+    if (line.startsWith("event:")) {
+      event = line.slice("event:".length).trim();
+    } else if (line.startsWith("data:")) {
+      dataLines.push(line.slice("data:".length).trim());
+    }
+  }
+
+  return { event, data: dataLines.length ? JSON.parse(dataLines.join("\n")) : null };
+};
+
+// Streams /chat/stream (Server-Sent Events over POST, so fetch instead of EventSource).
+// Pass an AbortController signal to cancel; the backend stops the completion too.
+export const streamChatResponse = async (
+  chatInput,
+  { onSources, onToken, onDone, onError, signal } = {}
+) => {
+  const response = await fetch("http://127.0.0.1:8000/api/openai/chat/stream", {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+    },
+    body: JSON.stringify({
+      messages: [{ role: "user", content: chatInput }],
+    }),
+    signal,
+  });
+
+  if (!response.ok) {
+    throw new Error(`Chat stream failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let reply = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+
+    buffer += decoder.decode(value, { stream: true });
+    const rawEvents = buffer.split("\n\n");
+    buffer = rawEvents.pop();
+
+    for (const rawEvent of rawEvents) {
+      const { event, data } = parseSSEEvent(rawEvent);
+
+      if (event === "sources") {
+        onSources?.(data.sources);
+      } else if (event === "token") {
+        reply += data.content;
+        onToken?.(data.content, reply);
+      } else if (event === "done") {
+        onDone?.(reply, data.timings);
+      } else if (event === "error") {
+        onError?.(data);
+      }
+    }
+  }
+
+  return reply;
+};
 
 export const getNearestFlights = async (from, to) => {
   try {